@@ -1,3 +1,4 @@
+import uuid
 from datetime import datetime
 
 import jwt
@@ -6,11 +7,33 @@ from django.contrib.auth import get_user_model
 from rest_framework import authentication
 from rest_framework.exceptions import AuthenticationFailed, ParseError
 
+from account.principals import get_principal
+from account.revocation import is_revoked, start_refresh_family
+
 User = get_user_model()
 
+ACCESS_TOKEN = 'access'
+REFRESH_TOKEN = 'refresh'
+
 
 class JWTAuthentication(authentication.BaseAuthentication):
     def authenticate(self, request):
+        payload = JWTAuthentication.get_payload(request)
+        if payload is None:
+            return None
+
+        user = JWTAuthentication.get_user(payload)
+        if user is None or user.email != payload['user_identifier']:
+            raise AuthenticationFailed('User not found')
+
+        if not user.is_active:
+            raise AuthenticationFailed('User not active')
+
+        return user, payload
+
+    @classmethod
+    def get_payload(cls, request):
+        """The verified claims of the bearer token, ``None`` without one."""
         jwt_token = request.META.get('HTTP_AUTHORIZATION')
         if jwt_token is None:
             return None
@@ -25,34 +48,78 @@ class JWTAuthentication(authentication.BaseAuthentication):
             raise AuthenticationFailed('Invalid token signature')
         except jwt.exceptions.DecodeError:
             raise AuthenticationFailed('Invalid token format')
+        except jwt.exceptions.InvalidTokenError:
+            raise AuthenticationFailed('Invalid token')
 
-        email = payload.get('user_identifier')
-        if email is None:
+        if payload.get('user_identifier') is None:
             raise AuthenticationFailed('User identifier not found in JWT')
 
-        user = User.objects.filter(email=email).first()
-        if user is None:
-            raise AuthenticationFailed('User not found')
-
-        if not user.is_active:
-            raise AuthenticationFailed('User not active')
-
         current_time = datetime.now().timestamp()
         if 'exp' in payload and payload['exp'] < current_time:
             raise AuthenticationFailed('Token has expired')
 
-        return user, payload
+        if payload.get('type', ACCESS_TOKEN) != ACCESS_TOKEN or JWTAuthentication.is_legacy_refresh(payload):
+            raise AuthenticationFailed('Invalid token type')
+
+        if is_revoked(payload):
+            raise AuthenticationFailed('Token has been revoked')
+
+        return payload
+
+    @classmethod
+    def is_legacy_refresh(cls, payload) -> bool:
+        """Refresh tokens issued before the rotation have no type, and unlike access tokens of the time no iat."""
+        return 'type' not in payload and 'iat' not in payload
+
+    @classmethod
+    def get_refresh_payload(cls, token):
+        """The verified claims of a refresh token, issued with a rotation family or before the rotation."""
+        try:
+            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=['HS256'])
+        except jwt.exceptions.ExpiredSignatureError:
+            raise AuthenticationFailed('Token has expired')
+        except jwt.exceptions.InvalidTokenError:
+            raise AuthenticationFailed('Invalid token')
+
+        if JWTAuthentication.is_legacy_refresh(payload):
+            if payload.get('user_identifier') is None or payload.get('exp') is None:
+                raise AuthenticationFailed('Invalid token type')
+        elif payload.get('type') != REFRESH_TOKEN or payload.get('family') is None or payload.get('user_id') is None:
+            raise AuthenticationFailed('Invalid token type')
+
+        if is_revoked(payload):
+            raise AuthenticationFailed('Token has been revoked')
+
+        return payload
 
     def authenticate_header(self, request):
         return 'Bearer'
 
+    @classmethod
+    def get_user(cls, payload):
+        """
+        Tokens with the user id resolve from the principal cache, older ones still look the email up
+        and are checked against the watermark of the user found.
+        """
+        user_id = payload.get('user_id')
+        if user_id is not None:
+            return get_principal(user_id)
+
+        user = User.objects.filter(email=payload['user_identifier']).first()
+        if user is not None and is_revoked(payload, user.pk):
+            raise AuthenticationFailed('Token has been revoked')
+        return user
+
     @classmethod
     def create_jwt(cls, user):
         payload = {
             'user_identifier': user.email,
+            'user_id': user.pk,
             'exp': int((datetime.now() + settings.SIMPLE_JWT['ACCESS_TOKEN_LIFETIME']).timestamp()),
             'iat': datetime.now().timestamp(),
-            'email': user.email
+            'email': user.email,
+            'jti': uuid.uuid4().hex,
+            'type': ACCESS_TOKEN,
         }
 
         jwt_token = jwt.encode(payload, settings.SECRET_KEY, algorithm='HS256')
@@ -60,14 +127,22 @@ class JWTAuthentication(authentication.BaseAuthentication):
         return jwt_token
 
     @classmethod
-    def create_refresh_token(cls, user):
+    def create_refresh_token(cls, user, family=None, jti=None):
+        """A token without a family starts one, rotations pass the family and the jti it was rotated to."""
         payload = {
             'user_identifier': user.email,
+            'user_id': user.pk,
             'exp': int((datetime.now() + settings.SIMPLE_JWT['REFRESH_TOKEN_LIFETIME']).timestamp()),
-            'email': user.email
+            'iat': datetime.now().timestamp(),
+            'email': user.email,
+            'jti': jti or uuid.uuid4().hex,
+            'family': family or uuid.uuid4().hex,
+            'type': REFRESH_TOKEN,
         }
 
         jwt_token = jwt.encode(payload, settings.SECRET_KEY, algorithm='HS256')
+        if family is None:
+            start_refresh_family(payload['family'], payload['jti'])
 
         return jwt_token
 
@@ -75,3 +150,35 @@ class JWTAuthentication(authentication.BaseAuthentication):
     def get_the_token_from_header(cls, token):
         token = token.replace('Bearer', '').replace(' ', '')
         return token
+
+
+class OptionalJWTAuthentication(JWTAuthentication):
+    """
+    Never fails the request: a missing, malformed, expired or revoked token, or a user that is gone, is anonymous.
+    The token is verified once per request, the result is kept on the underlying ``HttpRequest``.
+    """
+
+    @classmethod
+    def get_optional_payload(cls, request):
+        request = getattr(request, '_request', request)
+        if not hasattr(request, '_optional_jwt_payload'):
+            try:
+                request._optional_jwt_payload = JWTAuthentication.get_payload(request)
+            except AuthenticationFailed:
+                request._optional_jwt_payload = None
+        return request._optional_jwt_payload
+
+    @classmethod
+    def get_user_id(cls, request):
+        """Only the id, so tokens with the ``user_id`` claim need no user lookup at all."""
+        payload = OptionalJWTAuthentication.get_optional_payload(request)
+        if payload is None:
+            return None
+        if payload.get('user_id') is not None:
+            return payload['user_id']
+
+        try:
+            user = JWTAuthentication.get_user(payload)
+        except AuthenticationFailed:
+            return None
+        return user.pk if user is not None else None
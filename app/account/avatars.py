@@ -0,0 +1,30 @@
+import uuid
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+from helpers.constants import ORIGINAL_QUALITY
+from helpers.storage import queue_delete
+from product.encoding import WEBP, encode
+from product.images import decode_image
+
+AVATAR_NAME = 'avatar/{token}.webp'
+
+
+def register_avatar(user, key) -> None:
+    """
+    The uploaded object only becomes the avatar re-encoded: it has to decode as an image, and the metadata
+    (camera, location) is dropped with the EXIF. The uploaded object itself is dropped either way.
+    Raises CorruptImage when the object isn't an image.
+    """
+    try:
+        with default_storage.open(key, 'rb') as f:
+            im = decode_image(f.read())
+        content = ContentFile(encode(im, WEBP, ORIGINAL_QUALITY))
+        name = default_storage.save(AVATAR_NAME.format(token=uuid.uuid4().hex), content)
+    finally:
+        queue_delete(key)
+
+    queue_delete(user.avatar.name)
+    user.avatar.name = name
+    user.save(update_fields=['avatar'])
@@ -0,0 +1,113 @@
+import asyncio
+import statistics
+import time
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.hashers import make_password, verify_password
+from django.core.management.base import BaseCommand
+
+from account.models import User
+from account.passwords import HashingUnavailable, check_password
+from helpers.constants import PASSWORD_HASH_QUEUE
+
+PASSWORD = 'benchmark-password'
+
+
+def noop():
+    return None
+
+
+class Command(BaseCommand):
+    help = (
+        'Event loop lag and the latency of a light sync request during a login burst, '
+        'for each way of running the password check'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--logins', type=int, default=200, help='Logins in the burst')
+        parser.add_argument(
+            '--concurrency', type=int, default=PASSWORD_HASH_QUEUE,
+            help='Logins in flight at once, the executor rejects the ones past its admission limit',
+        )
+        parser.add_argument('--interval', type=float, default=5, help='Lag probe interval, ms')
+
+    def handle(self, *args, **options):
+        user = User(email='benchmark@example.com', password=make_password(PASSWORD), is_active=True)
+        modes = {
+            # How the DRF view ran under ASGI: on the thread every sync view of the worker shares.
+            'sync': lambda: sync_to_async(verify_password)(PASSWORD, user.password),
+            # Django's own acheck_password, the hash runs on the event loop.
+            'inline': self.inline(user),
+            'executor': lambda: check_password(user, PASSWORD),
+        }
+
+        self.stdout.write(
+            f'{options["logins"]} logins, {options["concurrency"]} in flight, probe every {options["interval"]}ms'
+        )
+        self.stdout.write(
+            f'{"mode":<9} {"logins/s":>9} {"rejected":>9} {"lag p50":>8} {"lag p99":>8} {"lag max":>8} '
+            f'{"sync p50":>9} {"sync p99":>9}'
+        )
+        for mode, login in modes.items():
+            result = asyncio.run(self.burst(login, options['logins'], options['concurrency'], options['interval']))
+            self.stdout.write(
+                f'{mode:<9} {result["throughput"]:>9.1f} {result["rejected"]:>9} '
+                f'{result["lag"][0]:>8.1f} {result["lag"][1]:>8.1f} {result["lag"][2]:>8.1f} '
+                f'{result["sync"][0]:>9.1f} {result["sync"][1]:>9.1f}'
+            )
+        self.stdout.write('lag and sync latency in ms')
+
+    @staticmethod
+    def inline(user):
+        async def login():
+            return verify_password(PASSWORD, user.password)
+        return login
+
+    async def burst(self, login, logins, concurrency, interval) -> dict:
+        done = asyncio.Event()
+        lags, syncs = [], []
+        rejected = 0
+        slots = asyncio.Semaphore(concurrency)
+
+        async def probe_lag():
+            while not done.is_set():
+                started = time.perf_counter()
+                await asyncio.sleep(interval / 1000)
+                lags.append((time.perf_counter() - started) * 1000 - interval)
+
+        async def probe_sync():
+            while not done.is_set():
+                started = time.perf_counter()
+                await sync_to_async(noop)()
+                syncs.append((time.perf_counter() - started) * 1000)
+                await asyncio.sleep(interval / 1000)
+
+        async def one():
+            nonlocal rejected
+            async with slots:
+                try:
+                    await login()
+                except HashingUnavailable:
+                    rejected += 1
+
+        probes = [asyncio.create_task(probe_lag()), asyncio.create_task(probe_sync())]
+        await asyncio.sleep(interval / 1000)
+        started = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(logins)))
+        elapsed = time.perf_counter() - started
+        done.set()
+        await asyncio.gather(*probes)
+
+        return {
+            'throughput': (logins - rejected) / elapsed,
+            'rejected': rejected,
+            'lag': self.percentiles(lags),
+            'sync': self.percentiles(syncs),
+        }
+
+    @staticmethod
+    def percentiles(values) -> tuple:
+        if len(values) < 2:
+            return (values[0], values[0], values[0]) if values else (0.0, 0.0, 0.0)
+        cuts = statistics.quantiles(values, n=100, method='inclusive')
+        return cuts[49], cuts[98], max(values)
@@ -1,11 +1,10 @@
 from django.utils.translation import gettext_lazy as _
 from django.contrib.auth.base_user import BaseUserManager
-from django.core.cache import cache
 from django.conf import settings
 
+from account.otp import ACTIVATION, SENT, send_code
 from account.tasks import send_created_account_notification, send_email
 from helpers.logger import log_exception
-from helpers.utils import generate_activation_code
 
 
 class UserManager(BaseUserManager):
@@ -17,11 +16,7 @@ class UserManager(BaseUserManager):
         user.set_password(password)
         user.save()
 
-        activation_code = generate_activation_code()
-        cache_key = f'activation_code:{user.id}'
-        cache.set(cache_key, activation_code)
-
-        self.send_activation_code(user.email, activation_code)
+        self.send_activation_code(user)
         return user
 
     def create_superuser(self, email, password, **extra_fields):
@@ -37,11 +32,14 @@ class UserManager(BaseUserManager):
 
         return self.create_user(email, password, **extra_fields)
 
-    def send_activation_code(self, email, code: str) -> None:
+    def send_activation_code(self, user) -> None:
         try:
+            sent, code = send_code(ACTIVATION, user.id)
+            if sent != SENT:
+                return
             send_email.delay(
                 "Код активации",
-                [email],
+                [user.email],
                 'email/registration_code.html',
                 {'text': code, 'from_email': 'info@example.com', 'domain': settings.ACTIVATE_URL},
             )
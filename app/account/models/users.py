@@ -2,17 +2,22 @@ import string
 import secrets
 from datetime import datetime
 
+from asgiref.sync import sync_to_async
 from django.db import models
+from django.db.models.signals import post_save, post_delete
 from django.utils.translation import gettext_lazy as _
 from django.contrib.auth.models import AbstractUser
 from phonenumber_field.modelfields import PhoneNumberField
 
 from account import RoleType
 from account.models.managers import UserManager
+from account.passwords import set_password
 from account.tasks import send_password_reset_notification
+from account.signals import user_changed, user_credentials_changed
 
 from helpers.logger import log_exception
 from helpers.models import TimestampMixin
+from helpers.storage import files_deleted
 
 
 class User(
@@ -71,6 +76,13 @@ class User(
         self.send_mail_invitation(password)
         return password
 
+    async def areset_password(self):
+        password = self.generate_password()
+        await set_password(self, password)
+        await self.asave()
+        await sync_to_async(self.send_mail_invitation)(password)
+        return password
+
     def send_mail_invitation(self, password: str) -> None:
         try:
             send_password_reset_notification.delay(self.email, password)
@@ -79,4 +91,10 @@ class User(
 
     def set_last_login_now(self):
         self.last_login = datetime.now()
-        self.save()
+        self.save(update_fields=['last_login'])
+
+
+post_delete.connect(files_deleted, sender=User)
+post_save.connect(user_changed, sender=User)
+post_save.connect(user_credentials_changed, sender=User)
+post_delete.connect(user_changed, sender=User)
@@ -0,0 +1,103 @@
+import time
+
+from django_redis import get_redis_connection
+
+from helpers.constants import OTP_TTL, OTP_RESEND_INTERVAL, OTP_MAX_SENDS, OTP_MAX_ATTEMPTS, OTP_ATTEMPT_WINDOW
+from helpers.utils import generate_activation_code
+
+ACTIVATION = 'activation'
+CONFIRMATION = 'confirmation'
+
+OTP_KEY = 'otp:{flow}:{user_id}'
+
+SENT, COOLDOWN, EXHAUSTED = 1, 0, -1
+VERIFIED, MISMATCH, LOCKED = 1, 0, -1
+
+# Every flow shares the policy below, its whole state is one hash that expires OTP_TTL after the last code was sent:
+# a code can be resent once per OTP_RESEND_INTERVAL, up to OTP_MAX_SENDS times, and checked OTP_MAX_ATTEMPTS times
+# within OTP_ATTEMPT_WINDOW.
+SEND_SCRIPT = """
+local now = tonumber(ARGV[1])
+local state = redis.call('hmget', KEYS[1], 'sent_at', 'sends')
+local sent_at, sends = tonumber(state[1]), tonumber(state[2]) or 0
+if sent_at and now - sent_at < tonumber(ARGV[3]) then
+    return {0, tonumber(ARGV[3]) - (now - sent_at)}
+end
+if sends >= tonumber(ARGV[4]) then
+    return {-1, redis.call('ttl', KEYS[1])}
+end
+redis.call('hset', KEYS[1], 'code', ARGV[2], 'sent_at', now, 'sends', sends + 1)
+redis.call('hdel', KEYS[1], 'verified')
+redis.call('expire', KEYS[1], ARGV[5])
+return {1, 0}
+"""
+
+VERIFY_SCRIPT = """
+local now = tonumber(ARGV[1])
+local state = redis.call('hmget', KEYS[1], 'code', 'attempts', 'attempts_at')
+if not state[1] then
+    return 0
+end
+local attempts, attempts_at = tonumber(state[2]) or 0, tonumber(state[3])
+if not attempts_at or now - attempts_at >= tonumber(ARGV[4]) then
+    attempts, attempts_at = 0, now
+end
+if attempts >= tonumber(ARGV[3]) then
+    return -1
+end
+if state[1] == ARGV[2] then
+    redis.call('hdel', KEYS[1], 'code', 'attempts', 'attempts_at')
+    redis.call('hset', KEYS[1], 'verified', 1)
+    return 1
+end
+redis.call('hset', KEYS[1], 'attempts', attempts + 1, 'attempts_at', attempts_at)
+return 0
+"""
+
+CONSUME_SCRIPT = """
+if redis.call('hget', KEYS[1], 'verified') == '1' then
+    redis.call('del', KEYS[1])
+    return 1
+end
+return 0
+"""
+
+
+def get_key(flow, user_id) -> str:
+    return OTP_KEY.format(flow=flow, user_id=user_id)
+
+
+def send_code(flow, user_id) -> tuple:
+    """
+    Stores a new code if the policy allows a send, in one round trip.
+    Returns the status with the code when it was sent, or with the seconds to wait otherwise.
+    """
+    code = generate_activation_code()
+    client = get_redis_connection('default')
+    sent, wait = client.register_script(SEND_SCRIPT)(
+        keys=[get_key(flow, user_id)],
+        args=[int(time.time()), code, OTP_RESEND_INTERVAL, OTP_MAX_SENDS, OTP_TTL],
+    )
+    return (SENT, code) if sent == SENT else (sent, wait)
+
+
+def verify_code(flow, user_id, code) -> int:
+    """
+    Checks the code and counts the attempt together, concurrent guesses can't run past the limit.
+    The code may come from unvalidated JSON, a missing or empty one is a mismatch that isn't counted.
+    """
+    code = '' if code is None else str(code).strip()
+    if not code:
+        return MISMATCH
+
+    client = get_redis_connection('default')
+    return client.register_script(VERIFY_SCRIPT)(
+        keys=[get_key(flow, user_id)],
+        args=[int(time.time()), code, OTP_MAX_ATTEMPTS, OTP_ATTEMPT_WINDOW],
+    )
+
+
+def consume_verified(flow, user_id) -> bool:
+    """A verified flow can be used once, the state is dropped with it."""
+    client = get_redis_connection('default')
+    return client.register_script(CONSUME_SCRIPT)(keys=[get_key(flow, user_id)]) == 1
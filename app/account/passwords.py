@@ -0,0 +1,85 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from django.contrib.auth.hashers import make_password, verify_password
+from django.db import close_old_connections
+from django.utils.crypto import get_random_string
+
+from helpers.constants import PASSWORD_HASH_WORKERS, PASSWORD_HASH_QUEUE
+from helpers.logger import log_exception
+
+# Hashing runs on its own threads, the hashers release the GIL so the event loop keeps serving while they work.
+# The semaphore bounds the hashes running or waiting for a thread, a burst past it is refused instead of queued.
+executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix='password-hash')
+admission = threading.BoundedSemaphore(PASSWORD_HASH_QUEUE)
+
+
+class HashingUnavailable(Exception):
+    pass
+
+
+def submit(func, *args):
+    """
+    Raises HashingUnavailable when the executor is full.
+    The slot is freed when the hash ends, not when the caller stops waiting for it.
+    """
+    if not admission.acquire(blocking=False):
+        raise HashingUnavailable('Too many password checks in progress')
+    try:
+        future = executor.submit(func, *args)
+    except Exception:
+        admission.release()
+        raise
+    future.add_done_callback(lambda _: admission.release())
+    return future
+
+
+@lru_cache(maxsize=1)
+def get_dummy_hash() -> str:
+    return make_password(get_random_string(32))
+
+
+def check_dummy(password) -> tuple:
+    """Costs what checking a real password with the default hasher does, unknown emails answer in the same time."""
+    verify_password(password, get_dummy_hash())
+    return False, False
+
+
+def upgrade_hash(user_id, encoded, password) -> None:
+    """Rehashes with the default hasher unless the password was changed since it was checked."""
+    from account.models import User
+
+    close_old_connections()
+    try:
+        User.objects.filter(pk=user_id, password=encoded).update(password=make_password(password))
+    except Exception as e:
+        log_exception(e, f'Password hash upgrade error {str(e)}')
+    finally:
+        close_old_connections()
+
+
+async def check_password(user, password) -> bool:
+    """
+    ``user`` is None for an unknown email. A hash made with an outdated hasher or work factor is upgraded
+    after the answer, on a free slot only, the next login retries it otherwise.
+    """
+    if user is None:
+        await asyncio.wrap_future(submit(check_dummy, password))
+        return False
+
+    encoded = user.password
+    is_correct, must_update = await asyncio.wrap_future(submit(verify_password, password, encoded))
+    if is_correct and must_update:
+        try:
+            submit(upgrade_hash, user.pk, encoded, password)
+        except HashingUnavailable:
+            pass
+    return is_correct
+
+
+async def set_password(user, password) -> None:
+    """``AbstractBaseUser.set_password`` with the hash made on the executor."""
+    user.password = await asyncio.wrap_future(submit(make_password, password))
+    user._password = password
@@ -0,0 +1,136 @@
+import json
+import time
+import threading
+from collections import OrderedDict
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django_redis import get_redis_connection
+
+from helpers.constants import PRINCIPAL_CACHE_TIMEOUT, PRINCIPAL_LOCAL_TTL, PRINCIPAL_LOCAL_SIZE
+
+User = get_user_model()
+
+PRINCIPAL_FIELDS = ('id', 'email', 'role', 'is_active', 'is_staff', 'is_superuser')
+VERSION_KEY = 'principal:{user_id}:version'
+PRINCIPAL_KEY = 'principal:{user_id}:v{version}'
+
+# Reads the auth version and the snapshot stored for it in one round trip.
+READ_SCRIPT = """
+local version = redis.call('get', KEYS[1]) or '0'
+return {version, redis.call('get', ARGV[1] .. version)}
+"""
+
+
+class Principal:
+    """
+    The user a token authenticates, built from the snapshot without a query. It is read only, the views that read
+    other fields or write load the ``User`` with ``get_request_user``.
+    """
+    __slots__ = PRINCIPAL_FIELDS
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, snapshot):
+        for name in PRINCIPAL_FIELDS:
+            object.__setattr__(self, name, snapshot[name])
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f'{type(self).__name__} is read only')
+
+    def __delattr__(self, name):
+        raise AttributeError(f'{type(self).__name__} is read only')
+
+    def __str__(self):
+        return self.email
+
+    @property
+    def pk(self):
+        return self.id
+
+
+class LocalPrincipals:
+    """A per-process LRU, its entries expire so a revoked user is only served from it for a bounded time."""
+
+    def __init__(self, size=PRINCIPAL_LOCAL_SIZE, ttl=PRINCIPAL_LOCAL_TTL):
+        self.size, self.ttl = size, ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, user_id):
+        with self.lock:
+            entry = self.entries.get(user_id)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self.entries[user_id]
+                return None
+            self.entries.move_to_end(user_id)
+            return entry[1]
+
+    def set(self, user_id, snapshot) -> None:
+        with self.lock:
+            self.entries[user_id] = (time.monotonic() + self.ttl, snapshot)
+            self.entries.move_to_end(user_id)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+    def discard(self, user_id) -> None:
+        with self.lock:
+            self.entries.pop(user_id, None)
+
+
+local_principals = LocalPrincipals()
+
+
+def get_snapshot(user_id):
+    """
+    The snapshot of the user at the current auth version, read from the database on a miss.
+    A snapshot read before the version was bumped is stored under the old version, nobody reads it again.
+    """
+    snapshot = local_principals.get(user_id)
+    if snapshot is not None:
+        return snapshot
+
+    client = get_redis_connection('default')
+    version, data = client.register_script(READ_SCRIPT)(
+        keys=[VERSION_KEY.format(user_id=user_id)], args=[PRINCIPAL_KEY.format(user_id=user_id, version='')],
+    )
+    if data is not None:
+        snapshot = json.loads(data)
+    else:
+        snapshot = User.objects.filter(pk=user_id).values(*PRINCIPAL_FIELDS).first()
+        if snapshot is None:
+            return None
+        client.set(
+            PRINCIPAL_KEY.format(user_id=user_id, version=int(version)), json.dumps(snapshot),
+            ex=PRINCIPAL_CACHE_TIMEOUT,
+        )
+
+    local_principals.set(user_id, snapshot)
+    return snapshot
+
+
+def get_principal(user_id):
+    """A ``Principal`` from the snapshot, ``None`` for a deleted user."""
+    snapshot = get_snapshot(user_id)
+    if snapshot is None:
+        return None
+    return Principal(snapshot)
+
+
+def get_request_user(request):
+    """The ``User`` of the request, loaded when the authentication gave a principal."""
+    if isinstance(request.user, Principal):
+        return User.objects.get(pk=request.user.pk)
+    return request.user
+
+
+def bump_auth_version(user_id) -> None:
+    get_redis_connection('default').incr(VERSION_KEY.format(user_id=user_id))
+    local_principals.discard(user_id)
+
+
+def invalidate_principal(user_id) -> None:
+    """Bumps the version once the change commits, the other processes drop their copy within the local TTL."""
+    transaction.on_commit(lambda: bump_auth_version(user_id))
@@ -0,0 +1,179 @@
+import time
+import hashlib
+import threading
+
+from django.conf import settings
+from django.db import transaction
+from django_redis import get_redis_connection
+
+from helpers.constants import REVOCATION_SYNC_INTERVAL, REVOCATION_BLOOM_BITS, REVOCATION_BLOOM_HASHES
+from helpers.logger import log_exception
+
+REVOKED_KEY = 'auth:revoked'
+NOT_BEFORE_KEY = 'auth:not_before'
+GENERATION_KEY = 'auth:revocations:generation'
+FAMILY_KEY = 'auth:refresh:{family}'
+LEGACY_REFRESH_KEY = 'auth:refresh:legacy:{digest}'
+
+# 1 rotates the family to the new jti, 0 means the family is gone (logged out, reused or expired),
+# -1 means an already rotated token came back, the family is dropped so neither copy works again.
+ROTATE_SCRIPT = """
+local current = redis.call('get', KEYS[1])
+if not current then
+    return 0
+end
+if current ~= ARGV[1] then
+    redis.call('del', KEYS[1])
+    return -1
+end
+redis.call('set', KEYS[1], ARGV[2], 'EX', ARGV[3])
+return 1
+"""
+
+
+class BloomFilter:
+    def __init__(self, bits=REVOCATION_BLOOM_BITS, hashes=REVOCATION_BLOOM_HASHES):
+        self.bits, self.hashes = bits, hashes
+        self.array = bytearray(bits // 8)
+
+    def positions(self, item):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], 'big'), int.from_bytes(digest[8:], 'big') | 1
+        return ((first + i * second) % self.bits for i in range(self.hashes))
+
+    def add(self, item) -> None:
+        for position in self.positions(item):
+            self.array[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item) -> bool:
+        return all(self.array[position >> 3] & (1 << (position & 7)) for position in self.positions(item))
+
+
+class Revocations:
+    """
+    A per-process Bloom filter of the revoked jtis and of the users with a watermark.
+    It is rebuilt when the generation in Redis moves, which is read at most once per sync interval,
+    so a token nobody revoked is accepted without a round trip and only a match is confirmed in Redis.
+    """
+
+    def __init__(self):
+        self.bloom = BloomFilter()
+        self.generation = None
+        self.synced_at = 0
+        self.lock = threading.Lock()
+
+    def sync(self, client) -> None:
+        if time.monotonic() - self.synced_at < REVOCATION_SYNC_INTERVAL:
+            return
+
+        with self.lock:
+            if time.monotonic() - self.synced_at < REVOCATION_SYNC_INTERVAL:
+                return
+            try:
+                generation = client.get(GENERATION_KEY)
+                if generation != self.generation:
+                    # The generation is read first, a revocation racing the rebuild moves it again.
+                    pipe = client.pipeline(transaction=False)
+                    pipe.zrangebyscore(REVOKED_KEY, time.time(), '+inf')
+                    pipe.zrange(NOT_BEFORE_KEY, 0, -1)
+                    jtis, user_ids = pipe.execute()
+                    bloom = BloomFilter()
+                    for jti in jtis:
+                        bloom.add(jti.decode())
+                    for user_id in user_ids:
+                        bloom.add(f'user:{user_id.decode()}')
+                    self.bloom, self.generation = bloom, generation
+                self.synced_at = time.monotonic()
+            except Exception as e:
+                log_exception(e, f'Token revocations sync error {str(e)}')
+
+    def add(self, item) -> None:
+        self.bloom.add(item)
+
+    def might_be_revoked(self, jti, user_id) -> bool:
+        return (jti is not None and jti in self.bloom) or f'user:{user_id}' in self.bloom
+
+
+revocations = Revocations()
+
+
+def get_refresh_lifetime() -> int:
+    return int(settings.SIMPLE_JWT['REFRESH_TOKEN_LIFETIME'].total_seconds())
+
+
+def is_revoked(payload, user_id=None) -> bool:
+    """
+    ``user_id`` is the resolved user of a token issued before the user id claim, without it such a token can't be
+    matched to a watermark. Tokens without an iat are older than any watermark.
+    """
+    jti, user_id = payload.get('jti'), payload.get('user_id', user_id)
+    if user_id is None:
+        return False
+
+    client = get_redis_connection('default')
+    revocations.sync(client)
+    if not revocations.might_be_revoked(jti, user_id):
+        return False
+
+    pipe = client.pipeline(transaction=False)
+    pipe.zscore(REVOKED_KEY, jti or '')
+    pipe.zscore(NOT_BEFORE_KEY, user_id)
+    revoked_until, not_before = pipe.execute()
+    if revoked_until is not None and revoked_until > time.time():
+        return True
+    return not_before is not None and payload.get('iat', 0) < not_before
+
+
+def publish(pipe, item) -> None:
+    pipe.incr(GENERATION_KEY)
+    pipe.execute()
+    revocations.add(item)
+
+
+def revoke_token(payload) -> None:
+    """Denies the jti until the token would have expired anyway, expired entries are dropped on the way."""
+    if payload.get('jti') is None:
+        return
+
+    pipe = get_redis_connection('default').pipeline(transaction=True)
+    pipe.zremrangebyscore(REVOKED_KEY, '-inf', time.time())
+    pipe.zadd(REVOKED_KEY, {payload['jti']: payload['exp']})
+    publish(pipe, payload['jti'])
+
+
+def revoke_user_tokens(user_id) -> None:
+    """Every token of the user issued until now stops working, watermarks older than any live token are dropped."""
+    now = time.time()
+    pipe = get_redis_connection('default').pipeline(transaction=True)
+    pipe.zremrangebyscore(NOT_BEFORE_KEY, '-inf', now - get_refresh_lifetime())
+    pipe.zadd(NOT_BEFORE_KEY, {user_id: now})
+    publish(pipe, f'user:{user_id}')
+
+
+def user_tokens_changed(user_id) -> None:
+    transaction.on_commit(lambda: revoke_user_tokens(user_id))
+
+
+def start_refresh_family(family, jti) -> None:
+    get_redis_connection('default').set(FAMILY_KEY.format(family=family), jti, ex=get_refresh_lifetime())
+
+
+def rotate_refresh_family(family, jti, new_jti) -> int:
+    client = get_redis_connection('default')
+    return client.register_script(ROTATE_SCRIPT)(
+        keys=[FAMILY_KEY.format(family=family)], args=[jti, new_jti, get_refresh_lifetime()],
+    )
+
+
+def end_refresh_family(family) -> None:
+    get_redis_connection('default').delete(FAMILY_KEY.format(family=family))
+
+
+def claim_legacy_refresh(token, exp) -> bool:
+    """
+    A refresh token issued before the rotation has no jti, the token itself is remembered until it expires.
+    Only the first claim succeeds.
+    """
+    digest = hashlib.sha256(token.encode()).hexdigest()
+    ttl = max(int(exp - time.time()), 1)
+    return bool(get_redis_connection('default').set(LEGACY_REFRESH_KEY.format(digest=digest), 1, nx=True, ex=ttl))
@@ -213,3 +213,12 @@ class UserAvatarUploadSerializer(serializers.ModelSerializer):
         fields = (
             "avatar",
         )
+
+
+class RefreshTokenSerializer(serializers.Serializer):
+    refresh = serializers.CharField()
+
+
+class LogoutSerializer(serializers.Serializer):
+    refresh = serializers.CharField(required=False)
+    all = serializers.BooleanField(default=False)
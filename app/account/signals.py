@@ -0,0 +1,25 @@
+from helpers.logger import log_exception
+
+
+def user_changed(sender, instance, update_fields=None, **kwargs):
+    from account.principals import invalidate_principal, PRINCIPAL_FIELDS
+
+    # A save that touches none of the snapshot fields, like the last login on every token, keeps the principal.
+    if update_fields and not set(update_fields) & set(PRINCIPAL_FIELDS):
+        return
+
+    try:
+        invalidate_principal(instance.pk)
+    except Exception as e:
+        log_exception(e, f'User principal cache error {str(e)}')
+
+
+def user_credentials_changed(sender, instance, created, **kwargs):
+    from account.revocation import user_tokens_changed
+
+    try:
+        # AbstractBaseUser keeps the raw password until the save completes, so it is only set here on a change.
+        if not created and (instance._password is not None or not instance.is_active):
+            user_tokens_changed(instance.pk)
+    except Exception as e:
+        log_exception(e, f'User tokens revocation error {str(e)}')
@@ -0,0 +1,76 @@
+import time
+from datetime import date
+
+import jwt
+import pytest
+from django.conf import settings
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APIRequestFactory
+
+from account.authentication import JWTAuthentication, OptionalJWTAuthentication
+from account.models import User
+from account.revocation import revoke_user_tokens
+
+factory = APIRequestFactory()
+
+
+@pytest.fixture
+def user(redis, db):
+    return User.objects.create(email='legacy@example.com', date_of_birth=date(1990, 1, 1), is_active=True)
+
+
+def encode(**claims):
+    return jwt.encode({'exp': int(time.time()) + 3600, **claims}, settings.SECRET_KEY, algorithm='HS256')
+
+
+def bearer(token):
+    return factory.get('/products', HTTP_AUTHORIZATION=f'Bearer {token}')
+
+
+def legacy_access(user, issued_at=None):
+    """What create_jwt issued before the user id claim."""
+    return encode(user_identifier=user.email, email=user.email, iat=issued_at or time.time())
+
+
+def test_current_access_token(user):
+    authenticated, payload = JWTAuthentication().authenticate(bearer(JWTAuthentication.create_jwt(user)))
+
+    assert authenticated.pk == user.pk
+
+
+def test_legacy_access_token(user):
+    authenticated, _ = JWTAuthentication().authenticate(bearer(legacy_access(user)))
+
+    assert authenticated.pk == user.pk
+
+
+@pytest.mark.parametrize('with_user_id', [False, True])
+def test_legacy_refresh_token_is_not_a_bearer_token(user, with_user_id):
+    # Refresh tokens issued before the rotation had no type and no iat.
+    claims = {'user_id': user.pk} if with_user_id else {}
+    token = encode(user_identifier=user.email, email=user.email, **claims)
+
+    with pytest.raises(AuthenticationFailed, match='Invalid token type'):
+        JWTAuthentication().authenticate(bearer(token))
+
+
+def test_refresh_token_is_not_a_bearer_token(user):
+    with pytest.raises(AuthenticationFailed, match='Invalid token type'):
+        JWTAuthentication().authenticate(bearer(JWTAuthentication.create_refresh_token(user)))
+
+
+def test_legacy_access_token_is_checked_against_the_watermark(user):
+    token = legacy_access(user, issued_at=time.time() - 10)
+    revoke_user_tokens(user.pk)
+
+    with pytest.raises(AuthenticationFailed, match='revoked'):
+        JWTAuthentication().authenticate(bearer(token))
+    assert OptionalJWTAuthentication.get_user_id(bearer(token)) is None
+
+
+def test_legacy_access_token_issued_after_the_watermark(user):
+    revoke_user_tokens(user.pk)
+    time.sleep(0.01)
+    token = legacy_access(user)
+
+    assert OptionalJWTAuthentication.get_user_id(bearer(token)) == user.pk
@@ -0,0 +1,88 @@
+import pytest
+
+from account import otp
+from account.otp import (
+    ACTIVATION, CONFIRMATION, COOLDOWN, EXHAUSTED, LOCKED, MISMATCH, SENT, VERIFIED,
+    consume_verified, send_code, verify_code,
+)
+from helpers.constants import OTP_ATTEMPT_WINDOW, OTP_MAX_ATTEMPTS, OTP_MAX_SENDS, OTP_RESEND_INTERVAL
+
+
+@pytest.fixture
+def clock(redis, monkeypatch):
+    class Clock:
+        now = 1_700_000_000
+
+        def advance(self, seconds):
+            self.now += seconds
+
+    clock = Clock()
+    codes = iter(f'{n:06}' for n in range(100000, 1000000, 111111))
+    monkeypatch.setattr(otp.time, 'time', lambda: clock.now)
+    monkeypatch.setattr(otp, 'generate_activation_code', lambda: next(codes))
+    return clock
+
+
+def test_resend_waits_for_the_interval(clock):
+    assert send_code(ACTIVATION, 1)[0] == SENT
+
+    clock.advance(OTP_RESEND_INTERVAL - 30)
+    assert send_code(ACTIVATION, 1) == (COOLDOWN, 30)
+
+    clock.advance(30)
+    assert send_code(ACTIVATION, 1)[0] == SENT
+    # Every flow of every user has its own state.
+    assert send_code(CONFIRMATION, 1)[0] == SENT
+    assert send_code(ACTIVATION, 2)[0] == SENT
+
+
+def test_sends_are_exhausted(clock):
+    for _ in range(OTP_MAX_SENDS):
+        assert send_code(ACTIVATION, 1)[0] == SENT
+        clock.advance(OTP_RESEND_INTERVAL)
+
+    assert send_code(ACTIVATION, 1)[0] == EXHAUSTED
+
+
+def test_only_the_latest_code_verifies(clock):
+    _, first = send_code(ACTIVATION, 1)
+    clock.advance(OTP_RESEND_INTERVAL)
+    _, latest = send_code(ACTIVATION, 1)
+
+    assert verify_code(ACTIVATION, 1, first) == MISMATCH
+    assert verify_code(ACTIVATION, 1, latest) == VERIFIED
+    # The verified code is dropped, it can't be checked again.
+    assert verify_code(ACTIVATION, 1, latest) == MISMATCH
+
+
+def test_missing_code_is_an_uncounted_mismatch(clock):
+    _, code = send_code(ACTIVATION, 1)
+
+    for _ in range(OTP_MAX_ATTEMPTS):
+        assert verify_code(ACTIVATION, 1, None) == MISMATCH
+        assert verify_code(ACTIVATION, 1, ' ') == MISMATCH
+
+    assert verify_code(ACTIVATION, 1, code) == VERIFIED
+
+
+def test_attempts_lock_until_the_window_passes(clock):
+    _, code = send_code(ACTIVATION, 1)
+    for _ in range(OTP_MAX_ATTEMPTS):
+        assert verify_code(ACTIVATION, 1, '000000') == MISMATCH
+
+    assert verify_code(ACTIVATION, 1, code) == LOCKED
+
+    clock.advance(OTP_ATTEMPT_WINDOW)
+    assert verify_code(ACTIVATION, 1, code) == VERIFIED
+
+
+def test_verified_flow_is_consumed_once(clock):
+    _, code = send_code(CONFIRMATION, 1)
+    assert not consume_verified(CONFIRMATION, 1)
+
+    verify_code(CONFIRMATION, 1, code)
+
+    assert consume_verified(CONFIRMATION, 1)
+    assert not consume_verified(CONFIRMATION, 1)
+    # The state went with it, a new code can be sent right away.
+    assert send_code(CONFIRMATION, 1)[0] == SENT
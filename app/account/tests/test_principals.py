@@ -0,0 +1,93 @@
+from datetime import date
+from unittest import mock
+
+import pytest
+
+from account.models import User
+from account.principals import LocalPrincipals, Principal, PRINCIPAL_FIELDS, VERSION_KEY
+
+SNAPSHOT = {
+    'id': 1, 'email': 'user@example.com', 'role': 'CLIENT', 'is_active': True, 'is_staff': False, 'is_superuser': False,
+}
+
+
+@pytest.fixture
+def clock():
+    with mock.patch('account.principals.time') as time:
+        time.monotonic.return_value = 100.0
+        yield time.monotonic
+
+
+def test_entry_expires_after_the_ttl(clock):
+    principals = LocalPrincipals(size=4, ttl=15)
+    principals.set(1, SNAPSHOT)
+
+    clock.return_value = 115.0
+    assert principals.get(1) == SNAPSHOT
+
+    clock.return_value = 115.5
+    assert principals.get(1) is None
+    assert 1 not in principals.entries
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    principals = LocalPrincipals(size=2, ttl=15)
+    principals.set(1, 'first')
+    principals.set(2, 'second')
+    principals.get(1)
+
+    principals.set(3, 'third')
+
+    assert principals.get(2) is None
+    assert principals.get(1) == 'first'
+    assert principals.get(3) == 'third'
+
+
+def test_set_renews_the_entry(clock):
+    principals = LocalPrincipals(size=2, ttl=15)
+    principals.set(1, 'old')
+    clock.return_value = 110.0
+    principals.set(1, 'new')
+
+    clock.return_value = 120.0
+    assert principals.get(1) == 'new'
+    assert len(principals.entries) == 1
+
+
+def test_discard(clock):
+    principals = LocalPrincipals(size=2, ttl=15)
+    principals.set(1, SNAPSHOT)
+    principals.discard(1)
+    principals.discard(2)
+
+    assert principals.get(1) is None
+
+
+def test_principal_is_read_only():
+    principal = Principal(SNAPSHOT)
+
+    assert principal.pk == principal.id == 1
+    assert principal.is_authenticated and not principal.is_anonymous
+    assert {name: getattr(principal, name) for name in PRINCIPAL_FIELDS} == SNAPSHOT
+    with pytest.raises(AttributeError):
+        principal.is_staff = True
+    with pytest.raises(AttributeError):
+        principal.first_name = 'Name'
+    with pytest.raises(AttributeError):
+        principal.save()
+
+
+@pytest.mark.django_db
+def test_login_keeps_the_principal(redis, django_capture_on_commit_callbacks):
+    user = User.objects.create(email='login@example.com', date_of_birth=date(1990, 1, 1), is_active=True)
+    version_key = VERSION_KEY.format(user_id=user.pk)
+    redis.delete(version_key)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        user.set_last_login_now()
+    assert redis.get(version_key) is None
+
+    with django_capture_on_commit_callbacks(execute=True):
+        user.is_staff = True
+        user.save(update_fields=['is_staff'])
+    assert redis.get(version_key) == b'1'
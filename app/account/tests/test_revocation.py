@@ -0,0 +1,63 @@
+import time
+from unittest import mock
+
+from account import revocation
+from account.revocation import BloomFilter, rotate_refresh_family, start_refresh_family, FAMILY_KEY
+
+
+def test_bloom_filter_membership():
+    bloom = BloomFilter(bits=1 << 16, hashes=7)
+    added = [f'jti-{i}' for i in range(500)]
+    for item in added:
+        bloom.add(item)
+
+    assert all(item in bloom for item in added)
+    false_positives = sum(f'other-{i}' in bloom for i in range(5000))
+    assert false_positives < 50
+
+
+def test_empty_bloom_filter_matches_nothing():
+    bloom = BloomFilter(bits=1 << 10, hashes=3)
+    assert 'jti' not in bloom
+    assert '' not in bloom
+
+
+def test_rotate_moves_the_family_to_the_new_jti(redis):
+    start_refresh_family('family', 'first')
+
+    assert rotate_refresh_family('family', 'first', 'second') == 1
+    assert redis.get(FAMILY_KEY.format(family='family')) == b'second'
+    assert rotate_refresh_family('family', 'second', 'third') == 1
+
+
+def test_rotated_token_coming_back_drops_the_family(redis):
+    start_refresh_family('family', 'first')
+    rotate_refresh_family('family', 'first', 'second')
+
+    assert rotate_refresh_family('family', 'first', 'stolen') == -1
+    assert not redis.exists(FAMILY_KEY.format(family='family'))
+    # The legitimate holder is logged out too.
+    assert rotate_refresh_family('family', 'second', 'third') == 0
+
+
+def test_rotate_unknown_family(redis):
+    assert rotate_refresh_family('gone', 'first', 'second') == 0
+    assert not redis.exists(FAMILY_KEY.format(family='gone'))
+
+
+def test_rotation_keeps_the_family_for_the_refresh_lifetime(redis):
+    start_refresh_family('family', 'first')
+    rotate_refresh_family('family', 'first', 'second')
+
+    assert 0 < redis.ttl(FAMILY_KEY.format(family='family')) <= revocation.get_refresh_lifetime()
+
+
+def test_revoked_token(redis):
+    with mock.patch.object(revocation, 'revocations', revocation.Revocations()):
+        payload = {'jti': 'revoked', 'user_id': 1, 'iat': time.time(), 'exp': time.time() + 60}
+        assert not revocation.is_revoked(payload)
+
+        revocation.revoke_token(payload)
+
+        assert revocation.is_revoked(payload)
+        assert not revocation.is_revoked({**payload, 'jti': 'other'})
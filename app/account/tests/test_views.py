@@ -0,0 +1,61 @@
+import json
+from datetime import date
+from unittest import mock
+
+import pytest
+from django.test import Client
+from django_db_logger.models import StatusLog
+
+from account.models import User
+
+
+@pytest.fixture
+def client(redis, settings):
+    # The project's LOGGING stays as is, the db handler writes a row for every message.
+    settings.ALLOWED_HOSTS = ['testserver']
+    return Client(raise_request_exception=False)
+
+
+@pytest.fixture
+def user():
+    return User.objects.create(email='activate@example.com', date_of_birth=date(1990, 1, 1))
+
+
+def post_json(client, path, data):
+    return client.post(path, json.dumps(data), content_type='application/json')
+
+
+@pytest.mark.django_db
+def test_activation_logs_from_the_event_loop(client, user):
+    response = post_json(client, '/api/v1/users/activate/', {'email': user.email, 'code': '000000'})
+
+    assert response.status_code == 400
+    assert response.json() == {'message': 'Activation code error'}
+    assert StatusLog.objects.filter(logger_name='db').exists()
+
+
+@pytest.mark.django_db
+def test_forgot_password_logs_errors_from_the_event_loop(client, user):
+    with mock.patch('account.views.consume_verified', side_effect=RuntimeError('unavailable')):
+        response = post_json(client, '/api/v1/users/forgot-password/', {'email': user.email})
+
+    assert response.status_code == 400
+    assert response.json() == {'detail': 'unavailable'}
+    assert StatusLog.objects.filter(logger_name='db', msg__contains='Failed to reset password').exists()
+
+
+@pytest.mark.django_db
+def test_activation_code_is_not_logged(client, user):
+    post_json(client, '/api/v1/users/activate/', {'email': user.email, 'code': '481516'})
+
+    assert StatusLog.objects.filter(logger_name='db').exists()
+    assert not StatusLog.objects.filter(msg__contains='481516').exists()
+
+
+@pytest.mark.django_db
+def test_verify_code_is_not_logged_or_echoed(client, user):
+    response = post_json(client, '/api/v1/users/verify-code/', {'email': user.email, 'code': '481516'})
+
+    assert response.status_code == 403
+    assert '481516' not in response.content.decode()
+    assert not StatusLog.objects.filter(msg__contains='481516').exists()
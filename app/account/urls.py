@@ -1,7 +1,6 @@
 from django.urls import path, include
 
 from rest_framework.routers import DefaultRouter
-from rest_framework_simplejwt.views import TokenRefreshView
 
 from account.views import (
     UserViewSet,
@@ -10,6 +9,8 @@ from account.views import (
     UserActivateView,
     ResendActivateView,
     ObtainTokenView,
+    RefreshTokenView,
+    LogoutView,
     UserPolicyView,
     UserForgotPasswordByEmailView,
     SendVerifyCodeByEmailView,
@@ -25,8 +26,9 @@ router.register('users/avatar', UserAvatarViewSet, basename='user_avatar')
 urlpatterns = [
     path('policy/', UserPolicyView.as_view(), name='policy'),
 
-    path('users/token/', ObtainTokenView.as_view(({'post': 'post'})), name='token_obtain_pair'),
-    path('users/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('users/token/', ObtainTokenView.as_view(), name='token_obtain_pair'),
+    path('users/token/refresh/', RefreshTokenView.as_view(), name='token_refresh'),
+    path('users/logout/', LogoutView.as_view(), name='logout'),
     path('users/check-email/', UserCheckEmailView.as_view(), name='check-email'),
 
     path('users/activate/', UserActivateView.as_view(), name='user-activate'),
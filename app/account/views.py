@@ -1,13 +1,14 @@
 import os
+import uuid
 from io import BytesIO
-from datetime import datetime
 
+from asgiref.sync import sync_to_async
 from rest_framework import viewsets, mixins, permissions, status, generics, views
-from rest_framework.parsers import MultiPartParser, FormParser
+from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 from rest_framework.decorators import action
+from rest_framework.exceptions import AuthenticationFailed
 from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
-from django.core.cache import cache
 from django.http import HttpResponse
 
 from account import RoleType
@@ -26,55 +27,160 @@ from account.serializers import (
     VerifySmsCodeSerializer,
     ForgotPasswordSerializer,
     UserAvatarUploadSerializer,
+    RefreshTokenSerializer,
+    LogoutSerializer,
 )
-from helpers.logger import log_exception, log_message
-from helpers.utils import has_passed_30_minutes, has_passed_2_minutes, generate_activation_code, delete_file
-from helpers.serializers import EmailSerializer
+from helpers.logger import log_exception, log_message, alog_exception, alog_message
+from helpers.serializers import EmailSerializer, UploadFileSerializer, UploadCompleteSerializer
+from helpers.uploads import UploadError, create_upload, complete_upload
+from helpers.storage import queue_delete
 from helpers.services import update_instance
+from helpers.views import AsyncAPIView
+from product.images import CorruptImage
 from account.tasks import send_email
 from account.authentication import JWTAuthentication
+from account.avatars import register_avatar
+from account.otp import (
+    ACTIVATION, CONFIRMATION, COOLDOWN, EXHAUSTED, VERIFIED, LOCKED, send_code, verify_code, consume_verified,
+)
+from account.passwords import HashingUnavailable, check_password
+from account.principals import get_request_user
+from account.revocation import (
+    revoke_token, revoke_user_tokens, rotate_refresh_family, end_refresh_family, claim_legacy_refresh
+)
 
 
-class ObtainTokenView(viewsets.GenericViewSet):
-    permission_classes = [permissions.AllowAny]
-    serializer_class = ObtainTokenSerializer
-
-    def post(self, request, *args, **kwargs):
-        serializer = self.serializer_class(data=request.data)
-        serializer.is_valid(raise_exception=True)
+class ObtainTokenView(AsyncAPIView):
+    async def post(self, request, *args, **kwargs):
+        serializer = ObtainTokenSerializer(data=self.get_data(request))
+        if not serializer.is_valid():
+            return self.response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
         email = serializer.validated_data.get('email')
         password = serializer.validated_data.get('password')
 
-        user = User.objects.filter(email=email).first()
+        user = await User.objects.filter(email=email).afirst()
+        try:
+            # Unknown emails are checked against a dummy hash, so they take as long as a wrong password.
+            is_correct = await check_password(user, password)
+        except HashingUnavailable:
+            return self.response(
+                {'message': 'Too many login attempts, try again later', 'detail_code': 'login_unavailable'},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={'Retry-After': '1'},
+            )
+
         if user is None:
-            return Response(
-                data={'message': 'User not found', 'detail_code': 'user_not_found'},
+            return self.response(
+                {'message': 'User not found', 'detail_code': 'user_not_found'},
                 status=status.HTTP_404_NOT_FOUND
             )
 
-        if user is None or not user.check_password(password):
-            return Response(
-                data={'message': 'Invalid credentials', 'detail_code': 'invalid_credentials'},
+        if not is_correct:
+            return self.response(
+                {'message': 'Invalid credentials', 'detail_code': 'invalid_credentials'},
                 status=status.HTTP_401_UNAUTHORIZED
             )
 
         if not user.is_active:
-            return Response(
-                data={'message': 'User not active', 'detail_code': 'user_not_active'},
+            return self.response(
+                {'message': 'User not active', 'detail_code': 'user_not_active'},
                 status=status.HTTP_401_UNAUTHORIZED
             )
 
         jwt_token = JWTAuthentication.create_jwt(user)
-        create_refresh_token = JWTAuthentication.create_refresh_token(user)
-        user.set_last_login_now()
+        create_refresh_token = await sync_to_async(JWTAuthentication.create_refresh_token)(user)
+        await sync_to_async(user.set_last_login_now)()
 
-        return Response({
+        return self.response({
             'access': jwt_token,
             'refresh': create_refresh_token
         })
 
 
+class RefreshTokenView(views.APIView):
+    """
+    Every refresh rotates the token within its family. A token that was already rotated coming back means
+    one of the copies leaked, the family is dropped and both sides have to log in again.
+    A token issued before the rotation is exchanged once for a token that starts a family.
+    """
+    authentication_classes = []
+    permission_classes = [permissions.AllowAny]
+
+    def post(self, request, *args, **kwargs):
+        serializer = RefreshTokenSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        token = serializer.validated_data['refresh']
+        try:
+            payload = JWTAuthentication.get_refresh_payload(token)
+            user = JWTAuthentication.get_user(payload)
+        except AuthenticationFailed as e:
+            return Response(
+                data={'message': str(e.detail), 'detail_code': 'token_not_valid'},
+                status=status.HTTP_401_UNAUTHORIZED
+            )
+
+        if user is None or not user.is_active:
+            return Response(
+                data={'message': 'User not active', 'detail_code': 'user_not_active'},
+                status=status.HTTP_401_UNAUTHORIZED
+            )
+
+        if JWTAuthentication.is_legacy_refresh(payload):
+            if not claim_legacy_refresh(token, payload['exp']):
+                return Response(
+                    data={'message': 'Token has been revoked', 'detail_code': 'token_not_valid'},
+                    status=status.HTTP_401_UNAUTHORIZED
+                )
+            return Response({
+                'access': JWTAuthentication.create_jwt(user),
+                'refresh': JWTAuthentication.create_refresh_token(user)
+            })
+
+        jti = uuid.uuid4().hex
+        rotated = rotate_refresh_family(payload['family'], payload['jti'], jti)
+        if rotated != 1:
+            if rotated == -1:
+                log_message(f"Refresh token reuse, family {payload['family']} of user {payload['user_id']} revoked")
+            return Response(
+                data={'message': 'Token has been revoked', 'detail_code': 'token_not_valid'},
+                status=status.HTTP_401_UNAUTHORIZED
+            )
+
+        return Response({
+            'access': JWTAuthentication.create_jwt(user),
+            'refresh': JWTAuthentication.create_refresh_token(user, family=payload['family'], jti=jti)
+        })
+
+
+class LogoutView(views.APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        serializer = LogoutSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        if serializer.validated_data['all']:
+            revoke_user_tokens(request.user.pk)
+            return Response(status=status.HTTP_204_NO_CONTENT)
+
+        revoke_token(request.auth)
+        refresh = serializer.validated_data.get('refresh')
+        if refresh:
+            try:
+                payload = JWTAuthentication.get_refresh_payload(refresh)
+            except AuthenticationFailed:
+                payload = None
+            if payload is not None and JWTAuthentication.is_legacy_refresh(payload):
+                if payload['user_identifier'] == request.user.email:
+                    claim_legacy_refresh(refresh, payload['exp'])
+            elif payload is not None and payload['user_id'] == request.user.pk:
+                end_refresh_family(payload['family'])
+
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
 class UserViewSet(
     mixins.ListModelMixin,
     mixins.UpdateModelMixin,
@@ -102,7 +208,7 @@ class UserViewSet(
     def me(self, requests, *args, **kwargs) -> Response:
         if self.request.user.is_authenticated:
             try:
-                user = self.request.user
+                user = get_request_user(self.request)
                 serializer = self.get_serializer(user)
                 return Response(serializer.data)
             except Exception as e:
@@ -113,7 +219,7 @@ class UserViewSet(
     @action(methods=['POST'], detail=False, url_path='reset-password')
     def reset_password(self, request, *args, **kwargs) -> Response:
         try:
-            user = request.user
+            user = get_request_user(request)
             if user is None or not user.is_active:
                 return Response(
                     data={'message': 'User not found or user not active', 'detail_code': 'user_not_fount_or_not_active'},
@@ -131,32 +237,31 @@ class UserViewSet(
             return Response(data={'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
 
-class UserForgotPasswordByEmailView(
-    generics.GenericAPIView
-):
-    queryset = User.objects.all()
-    serializer_class = ForgotPasswordSerializer
-    authentication_classes = []
-    permission_classes = []
-
-    def post(self, request, *args, **kwargs) -> Response:
+class UserForgotPasswordByEmailView(AsyncAPIView):
+    async def post(self, request, *args, **kwargs):
         try:
-            serializer = self.get_serializer(data=request.data)
-            serializer.is_valid(raise_exception=True)
+            serializer = ForgotPasswordSerializer(data=self.get_data(request))
+            if not await sync_to_async(serializer.is_valid)():
+                return self.response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-            email_verified = cache.get(request.data.get('email'))
-            if email_verified:
-                serializer.save()
-                cache.delete(request.data.get('email'))
-                return Response(status=200)
+            user = serializer.validated_data['instance']
+            if await sync_to_async(consume_verified)(CONFIRMATION, user.id):
+                await user.areset_password()
+                return self.response(status=200)
 
-            return Response(
-                data={'message': 'Email not verified', 'detail_code': 'email_not_verified'},
+            return self.response(
+                {'message': 'Email not verified', 'detail_code': 'email_not_verified'},
                 status=status.HTTP_401_UNAUTHORIZED
             )
+        except HashingUnavailable:
+            return self.response(
+                {'message': 'Too many requests, try again later', 'detail_code': 'reset_unavailable'},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={'Retry-After': '1'},
+            )
         except Exception as e:
-            log_exception(e, f'Failed to reset password {str(e)}')
-            return Response(data={'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            await alog_exception(e, f'Failed to reset password {str(e)}')
+            return self.response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
 
 class VerifyCodeByEmailView(
@@ -174,16 +279,18 @@ class VerifyCodeByEmailView(
             email = serializer.data.get('email')
             code = serializer.data.get('code')
             user = User.objects.filter(email=email).first()
-            log_message(f"verify_email_code email {email}, code {code}")
+            log_message(f"verify_email_code email {email}")
             if user is not None:
-                cache_key = f'confirmation_code:{user.id}'
-                confirmation_code = cache.get(cache_key)
-                log_message(f"cache_key {cache_key}, code {code}, confirmation_code {confirmation_code}")
-                if confirmation_code == code:
-                    cache.set(email, True)
+                verified = verify_code(CONFIRMATION, user.id, code)
+                if verified == VERIFIED:
                     return Response(status=status.HTTP_200_OK)
+                if verified == LOCKED:
+                    return Response(
+                        data={"message": "Too many failed attempts, please try again after 30min"},
+                        status=status.HTTP_403_FORBIDDEN
+                    )
 
-            return Response(data={"detail": f"Failed verify sms code {code}"}, status=status.HTTP_403_FORBIDDEN)
+            return Response(data={"detail": "Failed verify sms code"}, status=status.HTTP_403_FORBIDDEN)
         except Exception as e:
             log_exception(e, f'Failed verify sms code {str(e)}')
             return Response(data={'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
@@ -204,53 +311,25 @@ class SendVerifyCodeByEmailView(
         try:
             user = User.objects.filter(email=email).first()
             if user is not None:
-                confirmation_key = f'confirmation_resend_{user.id}'
-                confirmation_resend_time = cache.get(confirmation_key)
-
-                confirmation_ty_key = f'confirmation_resend_try_{user.id}'
-                confirmation_resend_try_count = cache.get(confirmation_ty_key)
-
-                log_message(
-                    f"confirmation_key {confirmation_key}, confirmation_resend_time {confirmation_resend_time}, "
-                    f"confirmation_ty_key {confirmation_ty_key}, "
-                    f"confirmation_resend_try_count {confirmation_resend_try_count}"
-                )
-
-                if confirmation_resend_time is None or has_passed_2_minutes(confirmation_resend_time):
-
-                    if confirmation_resend_try_count is not None and confirmation_resend_try_count > 3:
-                        return Response(
-                            data={"message": "Too many activation code resend requests, wait 1 day."},
-                            status=status.HTTP_400_BAD_REQUEST
-                        )
-
-                    confirmation_code = generate_activation_code()
-
-                    cache_key = f'confirmation_code:{user.id}'
-                    cache.set(cache_key, confirmation_code)
-
-                    resend_key = f'confirmation_resend_{user.id}'
-                    cache.set(resend_key, datetime.now())
-
-                    if confirmation_resend_try_count:
-                        resend_ty_key = f'confirmation_resend_try_{user.id}'
-                        cache.set(resend_ty_key, confirmation_resend_try_count + 1)
-                    else:
-                        resend_ty_key = f'confirmation_resend_try_{user.id}'
-                        cache.set(resend_ty_key, 1)
-
-                    send_email.delay(
-                        "Код подтверждения",
-                        [email],
-                        'email/confirmation_notification.html',
-                        {'text': confirmation_code, 'from_email': 'info@example.com'}
-                    )
-                    log_message(f"cache_key {cache_key}, confirmation_code {confirmation_code}")
-                else:
+                sent, result = send_code(CONFIRMATION, user.id)
+                log_message(f"confirmation code for user {user.id}, sent {sent}")
+                if sent == COOLDOWN:
                     return Response(
                         data={"message": "Please wait 2 minutes to resend the activation code."},
                         status=status.HTTP_400_BAD_REQUEST
                     )
+                if sent == EXHAUSTED:
+                    return Response(
+                        data={"message": "Too many activation code resend requests, wait 1 day."},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+
+                send_email.delay(
+                    "Код подтверждения",
+                    [email],
+                    'email/confirmation_notification.html',
+                    {'text': result, 'from_email': 'info@example.com'}
+                )
         except Exception as e:
             log_exception(e, 'Error in send_confirmation_code')
             return Response(
@@ -285,28 +364,61 @@ class UserAvatarViewSet(
         serializer = self.serializer_class
         if self.action == 'delete_avatar':
             serializer = None
+        elif self.action == 'avatar_upload':
+            serializer = UploadFileSerializer
+        elif self.action == 'complete_avatar_upload':
+            serializer = UploadCompleteSerializer
 
         return serializer
 
     @action(detail=True, methods=['post'], url_path='upload')
     def upload_avatar(self, request, pk):
         user = get_object_or_404(User, pk=pk)
+        previous_avatar = user.avatar.name
         serializer = self.serializer_class(user, data=request.data, partial=True)
         if serializer.is_valid():
             serializer.save()
+            if user.avatar.name != previous_avatar:
+                queue_delete(previous_avatar)
             return Response(serializer.data, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    @action(detail=True, methods=['post'], url_path='uploads', parser_classes=[JSONParser])
+    def avatar_upload(self, request, pk):
+        user = get_object_or_404(User, pk=pk)
+        if user.pk != request.user.pk:
+            return Response(status=status.HTTP_403_FORBIDDEN)
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        upload = create_upload('avatar', user.id, user.id, serializer.validated_data['content_type'])
+        return Response(upload, status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=['post'], url_path='uploads/complete', parser_classes=[JSONParser])
+    def complete_avatar_upload(self, request, pk):
+        user = get_object_or_404(User, pk=pk)
+        if user.pk != request.user.pk:
+            return Response(status=status.HTTP_403_FORBIDDEN)
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            session = complete_upload('avatar', user.id, user.id, serializer.validated_data['token'])
+        except UploadError as e:
+            return Response({'token': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            register_avatar(user, session['key'])
+        except CorruptImage as e:
+            return Response(
+                {'token': f'Uploaded file is not a valid image: {str(e)}'}, status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(UserAvatarUploadSerializer(user).data, status=status.HTTP_200_OK)
+
     @action(detail=True, methods=['delete'], url_path='delete')
     def delete_avatar(self, request, pk):
         user = get_object_or_404(User, pk=pk)
-        avatar_path = user.avatar.name
-        try:
-            delete_file(avatar_path)
-            user.avatar.delete(save=True)
-            user.save()
-        except Exception as e:
-            log_exception(e, f"Error deleting user avatar from MinIO {avatar_path}")
+        queue_delete(user.avatar.name)
+        user.avatar = None
+        user.save(update_fields=['avatar'])
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
@@ -325,52 +437,30 @@ class UserCheckEmailView(
         return Response(status=status.HTTP_404_NOT_FOUND)
 
 
-class UserActivateView(
-    generics.GenericAPIView
-):
-    serializer_class = UserActivateSerializer
-    authentication_classes = []
-    permission_classes = []
-    queryset = User.objects.all()
-
-    def post(self, request, *args, **kwargs) -> Response:
-        email = request.data.get('email')
-        code = request.data.get('code')
-        user = User.objects.filter(email=email).first()
+class UserActivateView(AsyncAPIView):
+    async def post(self, request, *args, **kwargs):
+        data = self.get_data(request)
+        email = data.get('email')
+        code = data.get('code')
+        user = await User.objects.filter(email=email).afirst()
 
-        log_message(f"email {email} user {user}, code {code}")
+        await alog_message(f"activation email {email} user {user}")
         if user is not None:
-            try_key = f'activation_try_{user.id}'
-            activation_try = cache.get(try_key)
-
-            try_time_key = f'activation_try_time_{user.id}'
-            try_time = cache.get(try_time_key)
-
-            if activation_try is None or has_passed_30_minutes(try_time):
-                try_time_key = f'activation_try_time_{user.id}'
-                activation_try = 1
-                cache.set(try_time_key, datetime.now())
-
-            if activation_try and activation_try > 3:
-                return Response(
-                    data={"message": "Too many failed attempts, please try again after 30min"},
+            verified = await sync_to_async(verify_code)(ACTIVATION, user.id, code)
+            if verified == LOCKED:
+                return self.response(
+                    {"message": "Too many failed attempts, please try again after 30min"},
                     status=status.HTTP_200_OK
                 )
 
-            cache_key = f'activation_code:{user.id}'
-            activation_code = cache.get(cache_key)
-
-            log_message(f"cache_key {cache_key}, activation_code {activation_code}")
-            if activation_code and code == activation_code:
-                update_instance(user, {'is_active': True})
-                return Response(
-                    data={"message": "User activated"},
+            if verified == VERIFIED:
+                await sync_to_async(update_instance)(user, {'is_active': True})
+                return self.response(
+                    {"message": "User activated"},
                     status=status.HTTP_200_OK
                 )
-            activation_try += 1
-            cache.set(try_key, activation_try)
-        return Response(
-            data={"message": "Activation code error"},
+        return self.response(
+            {"message": "Activation code error"},
             status=status.HTTP_400_BAD_REQUEST
         )
 
@@ -389,37 +479,25 @@ class ResendActivateView(
         try:
             user = User.objects.filter(email=email).first()
             if user is not None:
-                resend_key = f'activation_resend_{user.id}'
-                activation_resend_time = cache.get(resend_key)
-
-                resend_ty_key = f'activation_resend_try_{user.id}'
-                activation_resend_try_count = cache.get(resend_ty_key)
-
-                if activation_resend_time is None or has_passed_2_minutes(activation_resend_time):
-
-                    if activation_resend_try_count is not None and activation_resend_try_count > 3:
-                        return Response(
-                            data={"message": "Too many activation code resend requests, wait 1 day."},
-                            status=status.HTTP_400_BAD_REQUEST
-                        )
-
-                    activation_code = generate_activation_code()
-                    self.set_activation_code(user.id, activation_code)
-                    self.set_resend_time(user.id)
-                    self.set_resend_try_count(user.id, activation_resend_try_count)
-
-                    log_message(f"user {user}, activation_code {activation_code}")
-                    send_email.delay(
-                        "Код активации",
-                        [email],
-                        'email/resend_notification.html',
-                        {'text': activation_code, 'from_email': 'info@example.com'}
-                    )
-                else:
+                sent, result = send_code(ACTIVATION, user.id)
+                if sent == COOLDOWN:
                     return Response(
                         data={"message": "Please wait 2 minutes to resend the activation code."},
                         status=status.HTTP_400_BAD_REQUEST
                     )
+                if sent == EXHAUSTED:
+                    return Response(
+                        data={"message": "Too many activation code resend requests, wait 1 day."},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+
+                log_message(f"activation code for user {user.id} sent")
+                send_email.delay(
+                    "Код активации",
+                    [email],
+                    'email/resend_notification.html',
+                    {'text': result, 'from_email': 'info@example.com'}
+                )
         except Exception as e:
             log_exception(e, 'Error in send_activation_code')
             return Response(
@@ -432,22 +510,6 @@ class ResendActivateView(
             status=status.HTTP_200_OK
         )
 
-    def set_activation_code(self, user_id: int, activation_code) -> None:
-        cache_key = f'activation_code:{user_id}'
-        cache.set(cache_key, activation_code)
-
-    def set_resend_time(self, user_id: int) -> None:
-        resend_key = f'activation_resend_{user_id}'
-        cache.set(resend_key, datetime.now())
-
-    def set_resend_try_count(self, user_id: int, activation_resend_try_count) -> None:
-        if activation_resend_try_count:
-            resend_ty_key = f'activation_resend_try_{user_id}'
-            cache.set(resend_ty_key, activation_resend_try_count + 1)
-        else:
-            resend_ty_key = f'activation_resend_try_{user_id}'
-            cache.set(resend_ty_key, 1)
-
 
 class UserPolicyView(
     generics.GenericAPIView
@@ -0,0 +1,60 @@
+from datetime import date
+from itertools import count
+
+import fakeredis
+import pytest
+from django_redis import get_redis_connection
+
+from account.models import User
+from product.models import Product, Type
+
+sequence = count()
+
+
+@pytest.fixture
+def redis(settings):
+    """The default cache on an in-memory Redis, Lua scripts included, emptied for every test."""
+    settings.CACHES = {
+        'default': {
+            'BACKEND': 'django_redis.cache.RedisCache',
+            'LOCATION': 'redis://localhost:6379/0',
+            'OPTIONS': {
+                'CONNECTION_POOL_KWARGS': {
+                    'connection_class': fakeredis.FakeConnection, 'server': fakeredis.FakeServer(),
+                },
+            },
+        },
+    }
+    # django_redis keeps its connection pools by URL, so the server of the first test is the one every test gets.
+    client = get_redis_connection('default')
+    client.flushall()
+    return client
+
+
+@pytest.fixture
+def owner(db):
+    return User.objects.create(email=f'owner{next(sequence)}@example.com', date_of_birth=date(1990, 1, 1))
+
+
+@pytest.fixture
+def make_product(owner):
+    product_type = Type.objects.create(name='Дом')
+
+    def make(**fields):
+        return Product.objects.create(**{
+            'name': f'Product {next(sequence)}',
+            'price_per_night': 10000,
+            'owner': owner,
+            'rooms_qty': 2,
+            'guest_qty': 4,
+            'bed_qty': 2,
+            'bedroom_qty': 1,
+            'description': 'Описание',
+            'city': 'Алматы',
+            'address': 'Абая 1',
+            'type': product_type,
+            'is_active': True,
+            **fields,
+        })
+
+    return make
@@ -0,0 +1,27 @@
+import ipaddress
+import secrets
+
+from django.conf import settings
+from django.http import Http404
+from django_prometheus.exports import ExportToDjangoView
+
+
+def is_allowed(request) -> bool:
+    """A scraper either presents the metrics token or connects from one of the allowed networks."""
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    authorization = request.META.get('HTTP_AUTHORIZATION', '')
+    if token and secrets.compare_digest(authorization.encode(), f'Bearer {token}'.encode()):
+        return True
+
+    try:
+        address = ipaddress.ip_address(request.META.get('REMOTE_ADDR', ''))
+    except ValueError:
+        return False
+    return any(address in ipaddress.ip_network(network, strict=False) for network in settings.METRICS_ALLOWED_IPS)
+
+
+def metrics(request):
+    """The exporter is not advertised to anyone else, a refused request looks like a missing page."""
+    if not is_allowed(request):
+        raise Http404
+    return ExportToDjangoView(request)
@@ -2,6 +2,8 @@ import os
 import socket
 from pathlib import Path
 
+from celery.schedules import crontab
+
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
 
 SECRET_KEY = os.getenv('SECRET_KEY')
@@ -15,6 +17,9 @@ ACTIVATE_URL = os.getenv('ACTIVATE_URL')
 
 ALLOWED_HOSTS = os.getenv('ALLOWED_HOSTS').split(' ')
 
+METRICS_ALLOWED_IPS = os.getenv('METRICS_ALLOWED_IPS', '127.0.0.1/32 ::1/128').split()
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+
 DEFAULT_APPS = [
     'django.contrib.admin',
     'django.contrib.auth',
@@ -22,6 +27,7 @@ DEFAULT_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
 ]
 THIRD_PARTY_APPS = [
     'django_extensions',
@@ -33,6 +39,7 @@ THIRD_PARTY_APPS = [
     'drf_yasg',
     'phonenumbers',
     'storages',
+    'django_prometheus',
 
     'django_db_logger',
 ]
@@ -145,6 +152,7 @@ if AWS_S3 == 'True':
 else:
     MINIO_ENDPOINT = os.getenv("MINIO_ENDPOINT")
     MINIO_CACHED_ENDPOINT = os.getenv("MINIO_CACHED_ENDPOINT")
+    MINIO_PUBLIC_ENDPOINT = os.getenv("MINIO_PUBLIC_ENDPOINT")
     AWS_S3_IMAGE_DOMAIN = MINIO_CACHED_ENDPOINT
     AWS_S3_ENDPOINT_URL = MINIO_ENDPOINT
     STATIC_URL = 'http://localhost:9001/static/'
@@ -164,6 +172,24 @@ CELERY_TASK_TRACK_STARTED = True
 CELERY_TASK_TIME_LIMIT = 30 * 60
 CELERY_RESULT_BACKEND = 'redis://redis:6379'
 RABBIT_BROKER_URL = 'amqp://guest@rabbit'
+CELERY_BEAT_SCHEDULE = {
+    'refresh-products-shuffle-rank': {
+        'task': 'product.tasks.refresh_products_shuffle_rank',
+        'schedule': crontab(hour=4, minute=0),
+    },
+    'flush-products-like-count': {
+        'task': 'product.tasks.flush_products_like_count',
+        'schedule': 60.0,
+    },
+    'flush-storage-deletes': {
+        'task': 'product.tasks.flush_storage_deletes',
+        'schedule': 60.0,
+    },
+    'reconcile-storage-orphans': {
+        'task': 'product.tasks.reconcile_storage_orphans',
+        'schedule': crontab(hour=5, minute=0),
+    },
+}
 
 REDIS_HOST = os.getenv('REDIS_HOST')
 REDIS_PORT = os.getenv('REDIS_PORT')
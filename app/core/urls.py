@@ -3,6 +3,7 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from core.metrics import metrics
 from core.swagger import swagger_patterns
 
 API_PREFIX = 'api/v1/'
@@ -11,6 +12,7 @@ urlpatterns = [
     path('swagger/', include(swagger_patterns)),
 
     path('admin/', admin.site.urls),
+    path('metrics', metrics, name='prometheus-django-metrics'),
 
     path(API_PREFIX, include('account.urls')),
     path(API_PREFIX, include('product.urls')),
@@ -5,3 +5,50 @@ BEDROOM_LIMIT = 6
 MB_SIZE = 1024 * 1000
 ORIGINAL_QUALITY = 60
 THUMBNAIL_QUALITY = 30
+SHUFFLE_RANK_MAX = 2147483647
+KEYSET_MAX_LIMIT = 100
+PAGINATION_COUNT_TIMEOUT = 60
+AVAILABILITY_MAX_DAYS = 366
+SEARCH_CONFIG = 'russian'
+FACETS_CACHE_TIMEOUT = 300
+FACET_PRICE_BUCKET = 5000
+FACET_PRICE_BUCKETS = 20
+LISTING_CACHE_TIMEOUT = 600
+FAVORITES_CACHE_TIMEOUT = 604800
+COUNTER_FLUSH_BATCH = 1000
+COUNTER_FLUSH_LOCK_TIMEOUT = 300
+COUNTER_FLUSH_RETENTION = 86400
+LIKES_SYNC_MAX = 500
+CARD_IMAGES_LIMIT = 5
+PRODUCT_COMMENTS_LIMIT = 6
+PRODUCT_DETAIL_CACHE_TIMEOUT = 3600
+BOOKING_RESERVE_MAX = 50
+CALENDAR_MAX_PRODUCTS = 100
+CALENDAR_CACHE_MAX_AGE = 60
+HOLD_TTL = 600
+IMAGE_PROCESS_MAX_RETRIES = 3
+IMAGE_PROCESS_RETRY_DELAY = 30
+IMAGE_CARD_WIDTH = 480
+IMAGE_GALLERY_WIDTH = 1080
+IMAGE_FULL_WIDTH = 1920
+IMAGE_QUALITY_MIN = 30
+IMAGE_QUALITY_MAX = 90
+IMAGE_SSIM_TARGET = 0.985
+UPLOAD_URL_TTL = 900
+UPLOAD_MAX_SIZE = 20 * MB_SIZE
+UPLOAD_MAX_FILES = 10
+STORAGE_DELETE_BATCH = 1000
+STORAGE_ORPHAN_GRACE = 86400
+PRINCIPAL_CACHE_TIMEOUT = 3600
+PRINCIPAL_LOCAL_TTL = 15
+PRINCIPAL_LOCAL_SIZE = 1024
+REVOCATION_SYNC_INTERVAL = 5
+REVOCATION_BLOOM_BITS = 1 << 20
+REVOCATION_BLOOM_HASHES = 7
+OTP_TTL = 86400
+OTP_RESEND_INTERVAL = 120
+OTP_MAX_SENDS = 4
+OTP_MAX_ATTEMPTS = 3
+OTP_ATTEMPT_WINDOW = 1800
+PASSWORD_HASH_WORKERS = 2
+PASSWORD_HASH_QUEUE = 32
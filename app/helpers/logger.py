@@ -1,5 +1,7 @@
 import logging
 
+from asgiref.sync import sync_to_async
+
 db_logger = logging.getLogger('db')
 
 
@@ -9,3 +11,8 @@ def log_exception(error, custom_err_msg=''):
 
 def log_message(message=''):
     db_logger.info(message)
+
+
+# The db handler writes a row, coroutines log through these so the write runs off the event loop.
+alog_exception = sync_to_async(log_exception)
+alog_message = sync_to_async(log_message)
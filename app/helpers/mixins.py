@@ -9,7 +9,7 @@ from django.db.models import ImageField
 from helpers.logger import log_exception
 from django.core.files.storage import default_storage
 
-from account.authentication import JWTAuthentication
+from account.authentication import OptionalJWTAuthentication
 
 
 class UserQuerySetMixin:
@@ -18,7 +18,7 @@ class UserQuerySetMixin:
 
     def get_queryset(self, *args, **kwargs):
         user = self.request.user
-        lookup_data = {self.user_filed: user}
+        lookup_data = {self.user_filed: user.pk}
         qs = super().get_queryset(*args, **kwargs)
         if not self.allow_staff_view and not user.is_staff:
             return qs
@@ -50,10 +50,11 @@ class ResizeImageMixin:
 
 
 class ProductContextSerializerMixins:
+    def get_user_id(self):
+        return OptionalJWTAuthentication.get_user_id(self.request)
+
     def get_serializer_context(self):
-        jwt = JWTAuthentication()
-        user = jwt.authenticate(self.request)
-        return {'user_id': user[0].id} if user is not None else None
+        return {'user_id': self.get_user_id()}
 
 
 class ImageMinioCorrectPathMixin:
@@ -0,0 +1,212 @@
+import json
+import base64
+import hashlib
+from collections import OrderedDict
+
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Q
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+from helpers.constants import KEYSET_MAX_LIMIT, PAGINATION_COUNT_TIMEOUT
+from helpers.logger import log_exception
+
+
+class CountMode:
+    EXACT = 'exact'
+    CACHED = 'cached'
+    ESTIMATE = 'estimate'
+    OFF = 'off'
+
+    choices = (EXACT, CACHED, ESTIMATE, OFF)
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination that seeks on the ordering keys instead of using OFFSET.
+
+    The queryset is read as one or more ordered segments (``queryset.segments`` when present, e.g.
+    ``SeededShuffle``), the cursor stores the segment and the ordering key values of the edge row.
+    A queryset whose order can be redrawn has a ``generation``, a cursor of another generation starts over.
+    """
+    default_limit = api_settings.PAGE_SIZE
+    max_limit = KEYSET_MAX_LIMIT
+    limit_query_param = 'limit'
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    default_count_mode = CountMode.CACHED
+
+    def __init__(self, ordering=None):
+        self.ordering = ordering
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.limit = self.get_limit(request)
+        self.ordering = self.ordering or getattr(queryset, 'ordering', None) or queryset.query.order_by
+        self.fields = [(field.lstrip('-'), field.startswith('-')) for field in self.ordering]
+        self.segments = getattr(queryset, 'segments', None) or (queryset.order_by(*self.ordering),)
+        self.generation = getattr(queryset, 'generation', None)
+        self.count = self.get_count(queryset, self.get_count_mode(request))
+
+        segment, key, reverse = self.decode_cursor(request)
+        if reverse:
+            rows = self.read_backward(segment, key)
+            self.has_previous = len(rows) > self.limit
+            rows = rows[:self.limit][::-1]
+            self.has_next = True
+        else:
+            rows = self.read_forward(segment, key)
+            self.has_next = len(rows) > self.limit
+            rows = rows[:self.limit]
+            self.has_previous = key is not None or segment > 0
+
+        self.first_row = rows[0] if rows else None
+        self.last_row = rows[-1] if rows else None
+
+        return [obj for _, obj in rows]
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('count', self.count),
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'count': {'type': 'integer', 'nullable': True},
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_limit(self, request) -> int:
+        try:
+            limit = int(request.query_params.get(self.limit_query_param, self.default_limit))
+        except (TypeError, ValueError):
+            limit = self.default_limit
+        return min(max(limit, 1), self.max_limit)
+
+    def get_count_mode(self, request) -> str:
+        mode = request.query_params.get(self.count_query_param, self.default_count_mode)
+        return mode if mode in CountMode.choices else self.default_count_mode
+
+    def get_count(self, queryset, mode):
+        if mode == CountMode.OFF:
+            return None
+        if mode == CountMode.EXACT:
+            return sum(segment.count() for segment in self.segments)
+        if mode == CountMode.ESTIMATE:
+            return sum(self.estimate_count(segment) for segment in self.segments)
+
+        cache_key = self.get_count_cache_key()
+        count = cache.get(cache_key)
+        if count is None:
+            count = sum(segment.count() for segment in self.segments)
+            cache.set(cache_key, count, PAGINATION_COUNT_TIMEOUT)
+        return count
+
+    def get_count_cache_key(self) -> str:
+        """
+        Built from the rows the count covers, not the whole query: annotations nothing filters on are left out
+        of the SQL, so a value computed per request (``is_new`` compares with now) doesn't change the key.
+        """
+        queries = [segment.order_by().values('pk').query.sql_with_params() for segment in self.segments]
+        return f'pagination_count:{hashlib.sha1(repr(queries).encode()).hexdigest()}'
+
+    @staticmethod
+    def estimate_count(queryset) -> int:
+        sql, params = queryset.query.sql_with_params()
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+                plan = cursor.fetchone()[0]
+            plan = json.loads(plan) if isinstance(plan, str) else plan
+            return int(plan[0]['Plan']['Plan Rows'])
+        except Exception as e:
+            log_exception(e, f'Failed to estimate count {str(e)}')
+            return queryset.count()
+
+    def read_forward(self, segment, key):
+        rows = []
+        while segment < len(self.segments) and len(rows) <= self.limit:
+            queryset = self.segments[segment]
+            if key is not None:
+                queryset = queryset.filter(self.get_seek_filter(key, reverse=False))
+            rows += [(segment, obj) for obj in queryset[:self.limit + 1 - len(rows)]]
+            segment, key = segment + 1, None
+
+        return rows
+
+    def read_backward(self, segment, key):
+        rows = []
+        reverse_ordering = [field[1:] if field.startswith('-') else f'-{field}' for field in self.ordering]
+        while segment >= 0 and len(rows) <= self.limit:
+            queryset = self.segments[segment].order_by(*reverse_ordering)
+            if key is not None:
+                queryset = queryset.filter(self.get_seek_filter(key, reverse=True))
+            rows += [(segment, obj) for obj in queryset[:self.limit + 1 - len(rows)]]
+            segment, key = segment - 1, None
+
+        return rows
+
+    def get_seek_filter(self, key, reverse) -> Q:
+        q = Q()
+        for index, (field, descending) in enumerate(self.fields):
+            lookup = 'lt' if descending != reverse else 'gt'
+            step = Q(**{f'{field}__{lookup}': key[index]})
+            for (previous_field, _), value in zip(self.fields[:index], key):
+                step &= Q(**{previous_field: value})
+            q |= step
+
+        return q
+
+    def get_key(self, obj) -> list:
+        key = []
+        for field, _ in self.fields:
+            value = getattr(obj, field)
+            key.append(value.isoformat() if hasattr(value, 'isoformat') else value)
+        return key
+
+    def encode_cursor(self, row, reverse) -> str:
+        segment, obj = row
+        data = {'s': segment, 'k': self.get_key(obj), 'r': reverse}
+        if self.generation is not None:
+            data['g'] = self.generation
+        return base64.urlsafe_b64encode(json.dumps(data, separators=(',', ':')).encode()).decode()
+
+    def decode_cursor(self, request) -> tuple:
+        cursor = request.query_params.get(self.cursor_query_param, None)
+        if not cursor:
+            return 0, None, False
+
+        try:
+            data = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+            segment, key, reverse = int(data['s']), data['k'], bool(data['r'])
+            if not 0 <= segment < len(self.segments) or len(key) != len(self.fields):
+                raise ValueError('Cursor does not match the ordering')
+            if data.get('g') != self.generation:
+                raise ValueError('Cursor is from another generation of the ordering')
+            return segment, key, reverse
+        except Exception as e:
+            log_exception(e, f'Invalid cursor {str(e)}')
+            return 0, None, False
+
+    def get_next_link(self):
+        if not self.has_next or self.last_row is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.last_row, reverse=False))
+
+    def get_previous_link(self):
+        if not self.has_previous or self.first_row is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.first_row, reverse=True))
@@ -9,6 +9,6 @@ class AuthorOrReadOnly(permissions.BasePermission):
         return False
 
     def has_object_permission(self, request, view, obj):
-        if obj.owner == request.user:
+        if obj.owner_id == request.user.pk:
             return True
         return False
@@ -2,8 +2,18 @@ from django.conf import settings
 from rest_framework import serializers
 
 from account.models import User
-from product.models import Image
+from account.principals import get_request_user
+from product.models import Image, ImageDerivative
 from helpers.mixins import ImageMinioCorrectPathMixin
+from helpers.uploads import UPLOAD_CONTENT_TYPES
+from helpers.constants import UPLOAD_MAX_SIZE
+
+
+class RequestUserDefault(serializers.CurrentUserDefault):
+    """``CurrentUserDefault`` for the relations a serializer saves, the token authentication gives a principal."""
+
+    def __call__(self, serializer_field):
+        return get_request_user(serializer_field.context['request'])
 
 
 class ShareItemSerializer(serializers.Serializer):
@@ -34,9 +44,28 @@ class UserSerializer(serializers.ModelSerializer, ImageMinioCorrectPathMixin):
         return self._get_image_url(obj.avatar)
 
 
+class ImageDerivativeSerializer(serializers.ModelSerializer, ImageMinioCorrectPathMixin):
+    url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ImageDerivative
+        fields = (
+            'name',
+            'url',
+            'width',
+            'height',
+            'size',
+            'mimetype',
+        )
+
+    def get_url(self, obj):
+        return self._get_image_url(obj.file)
+
+
 class ImageSerializer(serializers.ModelSerializer, ImageMinioCorrectPathMixin):
     original = serializers.SerializerMethodField()
     thumbnail = serializers.SerializerMethodField()
+    srcset = ImageDerivativeSerializer(source='derivatives', many=True, read_only=True)
 
     class Meta:
         model = Image
@@ -47,7 +76,9 @@ class ImageSerializer(serializers.ModelSerializer, ImageMinioCorrectPathMixin):
             'width',
             'height',
             'mimetype',
-            'is_label'
+            'is_label',
+            'status',
+            'srcset',
         )
 
     def get_original(self, obj):
@@ -99,3 +130,12 @@ class IconSerializer(serializers.ModelSerializer):
 
     def get_icon(self, obj):
         return self._get_image_url(obj.icon)
+
+
+class UploadFileSerializer(serializers.Serializer):
+    content_type = serializers.ChoiceField(choices=list(UPLOAD_CONTENT_TYPES))
+    size = serializers.IntegerField(min_value=1, max_value=UPLOAD_MAX_SIZE)
+
+
+class UploadCompleteSerializer(serializers.Serializer):
+    token = serializers.CharField(max_length=32)
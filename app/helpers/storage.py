@@ -0,0 +1,103 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Q, FileField
+from django.utils import timezone
+from django_redis import get_redis_connection
+
+from helpers.constants import STORAGE_DELETE_BATCH, STORAGE_ORPHAN_GRACE
+from helpers.logger import log_exception
+
+DELETE_QUEUE_KEY = 'storage:delete'
+RECONCILE_PREFIXES = ('images/original/', 'images/thumbnail/', 'images/derivatives/', 'avatar/')
+
+
+def queue_delete(*names) -> None:
+    """The files are queued once the transaction commits, a rolled back delete keeps them."""
+    names = [name for name in names if name]
+    if names:
+        transaction.on_commit(lambda: get_redis_connection('default').sadd(DELETE_QUEUE_KEY, *names))
+
+
+def delete_objects(keys) -> list:
+    """One DeleteObjects request, returns the keys the bucket failed to delete."""
+    response = default_storage.connection.meta.client.delete_objects(
+        Bucket=settings.AWS_STORAGE_BUCKET_NAME,
+        Delete={'Objects': [{'Key': key} for key in keys], 'Quiet': True},
+    )
+    return [error['Key'] for error in response.get('Errors', [])]
+
+
+def flush_deletes() -> int:
+    """
+    Pops up to a batch of queued names at a time, so concurrent flushes never send the same key twice.
+    A name a row references again is dropped from the batch, file names can be reused as storage overwrites them.
+    Keys the request or the bucket failed on go back to the queue for the next run.
+    """
+    client = get_redis_connection('default')
+    deleted = 0
+    while True:
+        keys = [key.decode() for key in client.spop(DELETE_QUEUE_KEY, STORAGE_DELETE_BATCH)]
+        if not keys:
+            return deleted
+
+        try:
+            keys = list(set(keys) - get_referenced(keys))
+            failed = delete_objects(keys) if keys else []
+        except Exception:
+            client.sadd(DELETE_QUEUE_KEY, *keys)
+            raise
+        if failed:
+            client.sadd(DELETE_QUEUE_KEY, *failed)
+            return deleted + len(keys) - len(failed)
+        deleted += len(keys)
+
+
+def get_referenced(keys) -> set:
+    from account.models import User
+    from product.models import Image, ImageDerivative
+
+    referenced = set()
+    images = Image.objects.filter(Q(original__in=keys) | Q(thumbnail__in=keys))
+    for original, thumbnail in images.values_list('original', 'thumbnail'):
+        referenced.update((original, thumbnail))
+    referenced.update(ImageDerivative.objects.filter(file__in=keys).values_list('file', flat=True))
+    referenced.update(User.objects.filter(avatar__in=keys).values_list('avatar', flat=True))
+    return referenced
+
+
+def reconcile_orphans() -> int:
+    """
+    Queues the objects under the upload prefixes no image, derivative or avatar references.
+    Objects younger than the grace period are skipped, they may belong to an upload or a render in flight.
+    """
+    client = default_storage.connection.meta.client
+    paginator = client.get_paginator('list_objects_v2')
+    cutoff = timezone.now() - timedelta(seconds=STORAGE_ORPHAN_GRACE)
+    orphans = 0
+    for prefix in RECONCILE_PREFIXES:
+        pages = paginator.paginate(
+            Bucket=settings.AWS_STORAGE_BUCKET_NAME, Prefix=prefix, PaginationConfig={'PageSize': STORAGE_DELETE_BATCH}
+        )
+        for page in pages:
+            keys = [item['Key'] for item in page.get('Contents', []) if item['LastModified'] < cutoff]
+            if not keys:
+                continue
+            unreferenced = set(keys) - get_referenced(keys)
+            if unreferenced:
+                get_redis_connection('default').sadd(DELETE_QUEUE_KEY, *unreferenced)
+                orphans += len(unreferenced)
+    return orphans
+
+
+def files_deleted(sender, instance, **kwargs):
+    """Queues every file the deleted row pointed at, cascades included, as they send post_delete too."""
+    try:
+        queue_delete(*(
+            getattr(instance, field.attname).name
+            for field in instance._meta.concrete_fields if isinstance(field, FileField)
+        ))
+    except Exception as e:
+        log_exception(e, f'Storage delete queue error {str(e)}')
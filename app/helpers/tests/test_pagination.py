@@ -0,0 +1,107 @@
+from urllib.parse import urlparse, parse_qs
+
+import pytest
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from helpers.pagination import KeysetPagination
+from product.models import Product
+from product.services import get_user_products
+
+ORDERING = ['-created_at', '-id']
+factory = APIRequestFactory()
+
+
+def paginate(queryset, params=None, ordering=ORDERING):
+    paginator = KeysetPagination(ordering)
+    page = paginator.paginate_queryset(queryset, Request(factory.get('/products', params or {})))
+    return paginator, page
+
+
+def get_cursor(link):
+    return parse_qs(urlparse(link).query)['cursor'][0]
+
+
+@pytest.fixture
+def products(redis, owner, make_product):
+    created = [make_product() for _ in range(7)]
+    # Ties on the first ordering key are broken by the id.
+    Product.objects.filter(pk__in=[product.pk for product in created[2:5]]).update(created_at=created[2].created_at)
+    return Product.objects.filter(owner=owner)
+
+
+@pytest.mark.django_db
+def test_forward_pages_cover_every_row_once(products):
+    expected = list(products.order_by(*ORDERING).values_list('pk', flat=True))
+
+    seen, params = [], {'limit': 2, 'count': 'exact'}
+    while True:
+        paginator, page = paginate(products, params)
+        seen += [product.pk for product in page]
+        assert paginator.count == len(expected)
+        link = paginator.get_next_link()
+        if link is None:
+            break
+        params = {**params, 'cursor': get_cursor(link)}
+
+    assert seen == expected
+
+
+@pytest.mark.django_db
+def test_previous_link_returns_the_same_page(products):
+    paginator, first = paginate(products, {'limit': 3})
+    paginator, second = paginate(products, {'limit': 3, 'cursor': get_cursor(paginator.get_next_link())})
+    paginator, back = paginate(products, {'limit': 3, 'cursor': get_cursor(paginator.get_previous_link())})
+
+    assert [product.pk for product in back] == [product.pk for product in first]
+    assert not set(first) & set(second)
+
+
+@pytest.mark.django_db
+def test_last_page_has_no_next_link(products):
+    paginator, page = paginate(products, {'limit': 10})
+
+    assert len(page) == 7
+    assert paginator.get_next_link() is None
+    assert paginator.get_previous_link() is None
+
+
+@pytest.mark.django_db
+def test_invalid_cursor_starts_from_the_first_page(products):
+    _, first = paginate(products, {'limit': 2})
+    _, page = paginate(products, {'limit': 2, 'cursor': 'not-a-cursor'})
+
+    assert page == first
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('mode, expected', [('exact', 7), ('estimate', int), ('off', None)])
+def test_count_modes(products, mode, expected):
+    paginator, _ = paginate(products, {'count': mode})
+
+    if expected is int:
+        assert isinstance(paginator.count, int)
+    else:
+        assert paginator.count == expected
+
+
+@pytest.mark.django_db
+def test_cached_count_is_read_back(products, make_product):
+    paginator, _ = paginate(products)
+    assert paginator.count == 7
+
+    make_product()
+    paginator, _ = paginate(products)
+
+    assert paginator.count == 7
+
+
+@pytest.mark.django_db
+def test_count_cache_key_ignores_per_request_annotations(owner, products):
+    # is_new compares created_at with the time the queryset is built.
+    first, _ = paginate(get_user_products(owner))
+    second, _ = paginate(get_user_products(owner))
+    other, _ = paginate(get_user_products(owner).filter(is_active=False))
+
+    assert first.get_count_cache_key() == second.get_count_cache_key()
+    assert first.get_count_cache_key() != other.get_count_cache_key()
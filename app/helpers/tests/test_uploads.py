@@ -0,0 +1,159 @@
+from datetime import date
+from io import BytesIO
+from unittest import mock
+
+import boto3
+import pytest
+import requests
+from django.core.cache import cache
+from django.core.files.storage import default_storage, storages
+from django.utils.functional import empty
+from moto import mock_aws
+from PIL import Image as PILImage
+
+from account.avatars import register_avatar
+from account.models import User
+from helpers.uploads import UPLOAD_KEY, UploadError, create_upload, complete_upload
+from product.images import CorruptImage
+
+BUCKET = 'uploads-test'
+REGION = 'us-east-1'
+
+
+@pytest.fixture
+def s3(settings):
+    """A moto bucket behind both the presigning client and the default storage, sessions in a local cache."""
+    settings.CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+    settings.AWS_STORAGE_BUCKET_NAME = BUCKET
+    settings.AWS_S3_ENDPOINT_URL = None
+    settings.MINIO_PUBLIC_ENDPOINT = None
+    settings.AWS_S3_CENTRAL = REGION
+    settings.AWS_S3_REGION_NAME = REGION
+    settings.AWS_ACCESS_KEY_ID = 'testing'
+    settings.AWS_SECRET_ACCESS_KEY = 'testing'
+    with mock_aws(), mock.patch('helpers.uploads.queue_delete') as queue_delete, \
+            mock.patch('account.avatars.queue_delete'):
+        client = boto3.client('s3', region_name=REGION)
+        client.create_bucket(Bucket=BUCKET)
+        reset_storage()
+        cache.clear()
+        client.queue_delete = queue_delete
+        yield client
+    reset_storage()
+
+
+def reset_storage():
+    """The storage reads the bucket settings once, a new instance picks up the overridden ones."""
+    storages._storages.pop('default', None)
+    default_storage._wrapped = empty
+
+
+def make_image(fmt='JPEG', **params) -> bytes:
+    output = BytesIO()
+    PILImage.new('RGB', (64, 48), (200, 30, 30)).save(output, fmt, **params)
+    return output.getvalue()
+
+
+def post_object(upload, content, content_type):
+    """What the client does with the presigned policy."""
+    fields = {**upload['fields'], 'Content-Type': content_type}
+    return requests.post(upload['url'], data=fields, files={'file': ('upload', content, content_type)})
+
+
+def test_create_upload(s3):
+    upload = create_upload('image', 1, 10, 'image/png')
+
+    assert upload['key'].startswith('images/original/') and upload['key'].endswith('.png')
+    assert upload['fields']['key'] == upload['key']
+    assert upload['fields']['Content-Type'] == 'image/png'
+    assert cache.get(UPLOAD_KEY.format(token=upload['token'])) == {
+        'kind': 'image', 'user': 1, 'target': 10, 'key': upload['key'], 'content_type': 'image/png',
+    }
+
+
+def test_complete_upload(s3):
+    upload = create_upload('image', 1, 10, 'image/jpeg')
+    assert post_object(upload, make_image(), 'image/jpeg').status_code == 204
+
+    session = complete_upload('image', 1, 10, upload['token'])
+
+    assert session['key'] == upload['key']
+    assert cache.get(UPLOAD_KEY.format(token=upload['token'])) is None
+
+
+def test_complete_before_the_object_lands_keeps_the_session(s3):
+    upload = create_upload('image', 1, 10, 'image/jpeg')
+
+    with pytest.raises(UploadError, match='not found'):
+        complete_upload('image', 1, 10, upload['token'])
+
+    post_object(upload, make_image(), 'image/jpeg')
+    assert complete_upload('image', 1, 10, upload['token'])['key'] == upload['key']
+
+
+def test_expired_token(s3):
+    upload = create_upload('image', 1, 10, 'image/jpeg')
+    post_object(upload, make_image(), 'image/jpeg')
+    cache.delete(UPLOAD_KEY.format(token=upload['token']))
+
+    with pytest.raises(UploadError, match='expired'):
+        complete_upload('image', 1, 10, upload['token'])
+
+
+def test_session_of_another_user_or_target(s3):
+    upload = create_upload('image', 1, 10, 'image/jpeg')
+    post_object(upload, make_image(), 'image/jpeg')
+
+    for kind, user_id, target_id in (('image', 2, 10), ('image', 1, 11), ('avatar', 1, 10)):
+        with pytest.raises(UploadError):
+            complete_upload(kind, user_id, target_id, upload['token'])
+
+
+def test_mismatched_content_type(s3):
+    upload = create_upload('image', 1, 10, 'image/png')
+    s3.put_object(Bucket=BUCKET, Key=upload['key'], Body=make_image(), ContentType='image/jpeg')
+
+    with pytest.raises(UploadError, match='does not match'):
+        complete_upload('image', 1, 10, upload['token'])
+    s3.queue_delete.assert_called_once_with(upload['key'])
+
+
+def test_double_complete(s3):
+    upload = create_upload('image', 1, 10, 'image/jpeg')
+    post_object(upload, make_image(), 'image/jpeg')
+    complete_upload('image', 1, 10, upload['token'])
+
+    with pytest.raises(UploadError):
+        complete_upload('image', 1, 10, upload['token'])
+
+
+@pytest.mark.django_db
+def test_register_avatar_reencodes_without_exif(s3):
+    user = User.objects.create(email='avatar@example.com', date_of_birth=date(1990, 1, 1))
+    exif = PILImage.Exif()
+    exif[0x010F] = 'Camera maker'
+    upload = create_upload('avatar', user.id, user.id, 'image/jpeg')
+    post_object(upload, make_image(exif=exif.tobytes()), 'image/jpeg')
+    session = complete_upload('avatar', user.id, user.id, upload['token'])
+
+    register_avatar(user, session['key'])
+
+    user.refresh_from_db()
+    assert user.avatar.name.startswith('avatar/') and user.avatar.name.endswith('.webp')
+    stored = PILImage.open(BytesIO(s3.get_object(Bucket=BUCKET, Key=user.avatar.name)['Body'].read()))
+    assert stored.format == 'WEBP' and stored.size == (64, 48)
+    assert not stored.getexif()
+
+
+@pytest.mark.django_db
+def test_register_avatar_rejects_non_images(s3):
+    user = User.objects.create(email='avatar@example.com', date_of_birth=date(1990, 1, 1))
+    upload = create_upload('avatar', user.id, user.id, 'image/png')
+    post_object(upload, b'not an image', 'image/png')
+    session = complete_upload('avatar', user.id, user.id, upload['token'])
+
+    with pytest.raises(CorruptImage):
+        register_avatar(user, session['key'])
+
+    user.refresh_from_db()
+    assert not user.avatar
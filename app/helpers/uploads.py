@@ -0,0 +1,101 @@
+import uuid
+from datetime import date
+
+import boto3
+from botocore.client import Config
+from botocore.exceptions import ClientError
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+
+from helpers.constants import UPLOAD_URL_TTL, UPLOAD_MAX_SIZE
+from helpers.storage import queue_delete
+from helpers.validator import MAX_FILE_SIZE
+
+UPLOAD_KEY = 'upload:{token}'
+UPLOAD_CONTENT_TYPES = {
+    'image/png': 'png',
+    'image/jpeg': 'jpg',
+    'image/jpg': 'jpg',
+    'image/gif': 'gif',
+    'image/webp': 'webp',
+}
+UPLOAD_PREFIXES = {
+    'image': 'images/original/{today:%Y/%m/%d}',
+    'avatar': 'avatar/uploads',
+}
+UPLOAD_MAX_SIZES = {
+    'image': UPLOAD_MAX_SIZE,
+    'avatar': MAX_FILE_SIZE,
+}
+
+
+class UploadError(Exception):
+    pass
+
+
+def get_presign_client():
+    """
+    Presigning is computed locally, but the signature covers the host, so URLs are signed for the endpoint
+    clients can reach, not the one the app talks to.
+    """
+    endpoint_url = getattr(settings, 'MINIO_PUBLIC_ENDPOINT', None) or getattr(settings, 'AWS_S3_ENDPOINT_URL', None)
+    return boto3.client(
+        's3',
+        endpoint_url=endpoint_url,
+        aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+        aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+        region_name=getattr(settings, 'AWS_S3_CENTRAL', None),
+        config=Config(signature_version='s3v4'),
+    )
+
+
+def create_upload(kind, user_id, target_id, content_type) -> dict:
+    """
+    A POST policy for one object: the key, the content type and the size range are enforced by the bucket,
+    the session that completes it is kept in the cache until the policy expires.
+    """
+    token = uuid.uuid4().hex
+    prefix = UPLOAD_PREFIXES[kind].format(today=date.today())
+    key = f'{prefix}/{token}.{UPLOAD_CONTENT_TYPES[content_type]}'
+    post = get_presign_client().generate_presigned_post(
+        Bucket=settings.AWS_STORAGE_BUCKET_NAME,
+        Key=key,
+        Fields={'Content-Type': content_type},
+        Conditions=[{'Content-Type': content_type}, ['content-length-range', 1, UPLOAD_MAX_SIZES[kind]]],
+        ExpiresIn=UPLOAD_URL_TTL,
+    )
+    cache.set(
+        UPLOAD_KEY.format(token=token),
+        {'kind': kind, 'user': user_id, 'target': target_id, 'key': key, 'content_type': content_type},
+        UPLOAD_URL_TTL * 2,
+    )
+    return {'token': token, 'key': key, 'url': post['url'], 'fields': post['fields'], 'expires_in': UPLOAD_URL_TTL}
+
+
+def complete_upload(kind, user_id, target_id, token) -> dict:
+    """
+    Checks the object landed in the bucket as the policy allowed. A session whose object isn't there yet can be
+    completed again, a completed one can't, only the request that consumes it registers the file.
+    """
+    cache_key = UPLOAD_KEY.format(token=token)
+    session = cache.get(cache_key)
+    if session is None or (session['kind'], session['user'], session['target']) != (kind, user_id, target_id):
+        raise UploadError('Upload session not found or expired')
+
+    try:
+        head = default_storage.connection.meta.client.head_object(
+            Bucket=settings.AWS_STORAGE_BUCKET_NAME, Key=session['key']
+        )
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') not in ('404', 'NoSuchKey', 'NotFound'):
+            raise
+        raise UploadError('Uploaded file not found') from e
+
+    if not cache.delete(cache_key):
+        raise UploadError('Upload session not found or expired')
+    if head['ContentLength'] > UPLOAD_MAX_SIZES[kind] or head.get('ContentType') != session['content_type']:
+        queue_delete(session['key'])
+        raise UploadError('Uploaded file does not match the upload session')
+
+    return session
@@ -1,33 +1,28 @@
+import os
 import random
 import math
 from django.core.files.storage import default_storage
-from datetime import datetime, timedelta
 
-
-def has_passed_30_minutes(target_time):
-    current_time = datetime.now()
-    time_difference = current_time - target_time
-    return time_difference >= timedelta(minutes=30)
-
-
-def has_passed_2_minutes(target_time):
-    current_time = datetime.now()
-    time_difference = current_time - target_time
-    return time_difference >= timedelta(minutes=2)
+from helpers.constants import SHUFFLE_RANK_MAX
+from helpers.logger import log_exception
 
 
 def delete_file(file_path: str):
+    """Deletes the file right away, the empty directory left behind is removed on storages that have them."""
     try:
-        full_path = default_storage.path(file_path)
-        if default_storage.exists(file_path):
-            default_storage.delete(file_path)
+        default_storage.delete(file_path)
+        try:
+            directory = os.path.dirname(default_storage.path(file_path))
+        except NotImplementedError:
+            return
+        if os.path.isdir(directory) and not os.listdir(directory):
+            os.rmdir(directory)
+    except Exception as e:
+        log_exception(e, f'Error deleting file {file_path}')
 
-            directory = os.path.dirname(full_path)
-            if not os.listdir(directory):
-                os.rmdir(directory)
 
-    except Exception as e:
-        print(f"Error deleting file: {e}")
+def generate_shuffle_rank():
+    return random.randint(0, SHUFFLE_RANK_MAX - 1)
 
 
 def generate_activation_code():
@@ -0,0 +1,44 @@
+import json
+
+from django.http import JsonResponse, HttpResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+
+
+class ParseError(Exception):
+    pass
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncAPIView(View):
+    """
+    A view with coroutine handlers for the public endpoints that need no DRF authentication or permissions.
+    Under ASGI a sync view runs on the one thread every sync view of the worker shares, these don't.
+    Answers in the same JSON the DRF views do.
+    """
+    http_method_names = ['post']
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            return await super().dispatch(request, *args, **kwargs)
+        except ParseError as e:
+            return self.response({'detail': str(e)}, status=400)
+
+    @staticmethod
+    def get_data(request) -> dict:
+        if request.content_type == 'application/json':
+            try:
+                data = json.loads(request.body or b'{}')
+            except ValueError as e:
+                raise ParseError(f'JSON parse error - {str(e)}')
+            if not isinstance(data, dict):
+                raise ParseError('Expected an object')
+            return data
+        return request.POST.dict()
+
+    @staticmethod
+    def response(data=None, status=200, headers=None):
+        if data is None:
+            return HttpResponse(status=status, headers=headers)
+        return JsonResponse(data, status=status, headers=headers)
@@ -5,3 +5,16 @@ class Priority(TextChoices):
     HIGH = 'HIGHEST', 'Наивысший приоритет'
     MEDIUM = 'MEDIUM', 'Средний приоритет'
     LOW = 'LOW', 'Низкий приоритет'
+
+
+class ImageStatus(TextChoices):
+    PENDING = 'PENDING', 'В очереди'
+    PROCESSING = 'PROCESSING', 'Обрабатывается'
+    READY = 'READY', 'Готово'
+    FAILED = 'FAILED', 'Ошибка'
+
+
+class ImageSize(TextChoices):
+    CARD = 'card', 'Карточка'
+    GALLERY = 'gallery', 'Галерея'
+    FULL = 'full', 'Полный размер'
@@ -1,22 +1,42 @@
 from django.contrib import admin
-from product.models import Type, Category, Product, Convenience, Image, Booking, Like, Comment, Favorites
+from product.models import Type, Category, Product, Convenience, Image, ImageDerivative, Booking, Like, Comment
+from product.images import reprocess_images
 
 admin.site.register(Type)
 admin.site.register(Category)
 admin.site.register(Convenience)
-admin.site.register(Image)
 admin.site.register(Booking)
 admin.site.register(Like)
 admin.site.register(Comment)
-admin.site.register(Favorites)
 
 
 class ProductImageInline(admin.TabularInline):
     model = Image
-    readonly_fields = ('id', 'image_tag')
+    readonly_fields = ('id', 'image_tag', 'status')
     extra = 1
 
 
+class ImageDerivativeInline(admin.TabularInline):
+    model = ImageDerivative
+    fields = ('name', 'file', 'width', 'height', 'size', 'baseline_size', 'quality', 'mimetype')
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+
+
+@admin.register(Image)
+class ImageAdmin(admin.ModelAdmin):
+    list_display = ('id', 'product', 'status', 'is_label')
+    list_filter = ('status',)
+    readonly_fields = ('status', 'error')
+    inlines = [ImageDerivativeInline]
+    actions = ('reprocess',)
+
+    @admin.action(description='Повторить обработку')
+    def reprocess(self, request, queryset):
+        self.message_user(request, f'Images queued: {reprocess_images(queryset)}')
+
+
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
     list_display = ('id', 'name', 'price_per_night', 'is_active', 'owner', 'rooms_qty', 'address')
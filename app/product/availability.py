@@ -0,0 +1,143 @@
+from datetime import date, timedelta
+
+from django.db import transaction
+from django.db.models import Q, F, Case, When, Value, Exists, OuterRef, IntegerField
+from django.utils.dateparse import parse_date
+
+from helpers.constants import AVAILABILITY_MAX_DAYS
+from product.models import Booking, Occupancy
+
+
+def next_month(day):
+    return (day.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+
+def get_nights(start_date, end_date) -> tuple:
+    """Occupied nights are [start_date, end_date), a same day booking still holds its first night."""
+    return start_date, max(end_date, start_date + timedelta(days=1))
+
+
+def get_month_masks(start_date, end_date) -> dict:
+    masks = {}
+    start, end = get_nights(start_date, end_date)
+    month = start.replace(day=1)
+    while month < end:
+        first, last = max(start, month), min(end, next_month(month))
+        masks[month] = ((1 << (last - month).days) - 1) ^ ((1 << (first - month).days) - 1)
+        month = next_month(month)
+
+    return masks
+
+
+def get_default_booking_window() -> tuple:
+    """From today to the end of the next month."""
+    today = date.today()
+    return today, next_month(next_month(today)) - timedelta(days=1)
+
+
+def get_window(start_date, end_date):
+    try:
+        start_date, end_date = parse_date(str(start_date)), parse_date(str(end_date))
+    except ValueError:
+        return None
+
+    if start_date is None or end_date is None or end_date < start_date:
+        return None
+
+    return start_date, min(end_date, start_date + timedelta(days=AVAILABILITY_MAX_DAYS))
+
+
+def get_occupied_queryset(start_date, end_date):
+    masks = get_month_masks(start_date, end_date)
+    return Occupancy.objects.filter(month__in=masks.keys()).annotate(
+        mask=Case(
+            *[When(month=month, then=Value(mask)) for month, mask in masks.items()],
+            default=Value(0),
+            output_field=IntegerField(),
+        ),
+    ).annotate(hit=F('days').bitand(F('mask'))).exclude(hit=0)
+
+
+def get_available_filter(start_date, end_date) -> Q:
+    occupied = get_occupied_queryset(start_date, end_date).filter(product=OuterRef('pk'))
+    return Q(~Exists(occupied))
+
+
+def get_available_product_ids(product_ids, start_date, end_date) -> set:
+    product_ids = set(product_ids)
+    occupied = get_occupied_queryset(start_date, end_date).filter(product_id__in=product_ids)
+    return product_ids - set(occupied.values_list('product_id', flat=True))
+
+
+def get_runs(days, month) -> list:
+    """Runs of set bits of a month mask as [first night, checkout) date pairs."""
+    runs = []
+    while days:
+        first = (days & -days).bit_length() - 1
+        shifted = days >> first
+        length = (~shifted & (shifted + 1)).bit_length() - 1
+        runs.append([month + timedelta(days=first), month + timedelta(days=first + length)])
+        days &= ~(((1 << length) - 1) << first)
+    return runs
+
+
+def get_calendar(product_ids, start_date, end_date) -> dict:
+    """
+    Occupied nights of every product inside the window as run-length ranges, read from the occupancy
+    index in one query. Runs that cross a month boundary are merged.
+    """
+    window = get_month_masks(start_date, end_date)
+    occupancy = Occupancy.objects.filter(product_id__in=product_ids, month__in=window.keys())
+    days = {
+        (product_id, month): mask for product_id, month, mask in occupancy.values_list('product_id', 'month', 'days')
+    }
+
+    calendar = {}
+    for product_id in product_ids:
+        runs = []
+        for month, mask in sorted(window.items()):
+            for run in get_runs(days.get((product_id, month), 0) & mask, month):
+                if runs and runs[-1][1] == run[0]:
+                    runs[-1][1] = run[1]
+                else:
+                    runs.append(run)
+        calendar[product_id] = runs
+
+    return calendar
+
+
+def rebuild_occupancy(product_id, months=None) -> None:
+    bookings = Booking.objects.filter(product_id=product_id)
+    if months is not None:
+        months = sorted(set(months))
+        if not months:
+            return
+        bookings = bookings.filter(start_date__lt=next_month(months[-1]), end_date__gte=months[0])
+
+    days = dict.fromkeys(months or [], 0)
+    for start_date, end_date in bookings.values_list('start_date', 'end_date'):
+        for month, mask in get_month_masks(start_date, end_date).items():
+            if months is None or month in days:
+                days[month] = days.get(month, 0) | mask
+
+    with transaction.atomic():
+        stale = Occupancy.objects.filter(product_id=product_id)
+        if months is not None:
+            stale = stale.filter(month__in=months)
+        stale.exclude(month__in=[month for month, mask in days.items() if mask]).delete()
+        Occupancy.objects.bulk_create(
+            [Occupancy(product_id=product_id, month=month, days=mask) for month, mask in days.items() if mask],
+            update_conflicts=True,
+            unique_fields=['product', 'month'],
+            update_fields=['days'],
+        )
+
+
+def rebuild_booking_occupancy(booking, loaded=None) -> None:
+    changes = {booking.product_id: list(get_month_masks(booking.start_date, booking.end_date))}
+    if loaded is not None and None not in loaded:
+        product_id, start_date, end_date = loaded
+        changes.setdefault(product_id, []).extend(get_month_masks(start_date, end_date))
+
+    for product_id, months in changes.items():
+        transaction.on_commit(lambda product_id=product_id, months=months: rebuild_occupancy(product_id, months))
@@ -0,0 +1,71 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.db.models.signals import post_save
+from django.db.backends.postgresql.psycopg_any import DateRange
+
+from product.availability import get_nights
+from product.models import Booking
+
+EXCLUSION_VIOLATION = '23P01'
+
+
+class BookingConflict(Exception):
+    def __init__(self, conflicts, message='Booking dates overlap existing bookings'):
+        super().__init__(message)
+        self.conflicts = conflicts
+
+
+def is_overlap_error(error) -> bool:
+    return getattr(error.__cause__, 'pgcode', None) == EXCLUSION_VIOLATION
+
+
+def get_nights_range(start_date, end_date):
+    return DateRange(*get_nights(start_date, end_date), '[)')
+
+
+def get_conflicts(ranges, exclude_id=None) -> list:
+    """Bookings that overlap any of the (product_id, start_date, end_date) ranges, read in one query."""
+    q = Q()
+    for product_id, start_date, end_date in ranges:
+        q |= Q(product_id=product_id, nights__overlap=get_nights_range(start_date, end_date))
+
+    bookings = Booking.objects.filter(q)
+    if exclude_id is not None:
+        bookings = bookings.exclude(pk=exclude_id)
+    return list(bookings.order_by('product_id', 'start_date').values('id', 'product', 'start_date', 'end_date'))
+
+
+def save_booking(serializer):
+    """The exclusion constraint decides, the conflicts are only read to explain a rejected write."""
+    try:
+        with transaction.atomic():
+            return serializer.save()
+    except IntegrityError as e:
+        if not is_overlap_error(e):
+            raise
+        instance, data = serializer.instance, serializer.validated_data
+        product = data.get('product', getattr(instance, 'product', None))
+        start_date = data.get('start_date', getattr(instance, 'start_date', None))
+        end_date = data.get('end_date', getattr(instance, 'end_date', None))
+        raise BookingConflict(
+            get_conflicts([(product.pk, start_date, end_date)], exclude_id=getattr(instance, 'pk', None))
+        )
+
+
+def reserve_bookings(items) -> list:
+    """All ranges are inserted by one statement in one transaction, or none of them is."""
+    bookings = [Booking(**item) for item in items]
+    try:
+        with transaction.atomic():
+            Booking.objects.bulk_create(bookings)
+            for booking in bookings:
+                post_save.send(
+                    sender=Booking, instance=booking, created=True, update_fields=None, raw=False,
+                    using=Booking.objects.db,
+                )
+    except IntegrityError as e:
+        if not is_overlap_error(e):
+            raise
+        raise BookingConflict(get_conflicts([(b.product_id, b.start_date, b.end_date) for b in bookings]))
+
+    return bookings
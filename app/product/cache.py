@@ -0,0 +1,74 @@
+import time
+import hashlib
+from datetime import date
+from urllib.parse import urlencode
+
+from django.core.cache import cache
+from django.db import transaction
+from prometheus_client import Counter
+
+from helpers.constants import LISTING_CACHE_TIMEOUT
+from product.shuffle import get_shuffle_seed
+
+LISTING_VERSION_KEY = 'product_listing:version'
+
+listing_cache_requests = Counter(
+    'product_listing_cache_requests_total',
+    'Product listing response cache lookups',
+    ['result'],
+)
+
+
+def get_listing_cache_key(request) -> str:
+    """Sorted query params with the shuffle seed resolved, so the default seed rolls over with the day."""
+    params = sorted((key, value) for key, values in request.GET.lists() for value in values)
+    if not request.GET.get('shuffle_seed'):
+        params.append(('shuffle_seed', get_shuffle_seed(request)))
+    params.append(('host', request.get_host()))
+    return f'product_listing:{hashlib.sha1(urlencode(params).encode()).hexdigest()}'
+
+
+def get_product_cache_key(product_id) -> str:
+    """The payload holds a booking window that starts today, so it rolls over with the day."""
+    return f'product_detail:{product_id}:{date.today().isoformat()}'
+
+
+def get_product_version_key(product_id) -> str:
+    return f'product_detail:{product_id}:version'
+
+
+def get_versioned(cache_key, version_key=LISTING_VERSION_KEY) -> tuple:
+    """Reads the version and the entry in one round trip, an entry of an older version is a miss."""
+    values = cache.get_many([version_key, cache_key])
+    version = values.get(version_key, 0)
+    entry = values.get(cache_key)
+    if entry is not None and entry[0] == version:
+        return version, entry[1]
+    return version, None
+
+
+def set_versioned(cache_key, version, data, timeout=LISTING_CACHE_TIMEOUT) -> None:
+    cache.set(cache_key, (version, data), timeout)
+
+
+def get_cached_listing(cache_key) -> tuple:
+    version, data = get_versioned(cache_key)
+    listing_cache_requests.labels(result='miss' if data is None else 'hit').inc()
+    return version, data
+
+
+def bump_version(version_key) -> None:
+    """A lost version restarts from the clock, so it can't come back to a value some old entry was stored with."""
+    try:
+        cache.incr(version_key)
+    except ValueError:
+        cache.set(version_key, time.time_ns(), timeout=None)
+
+
+def invalidate_listing() -> None:
+    """Bumps the version once the transaction commits, so a concurrent read can't cache the old rows as new."""
+    transaction.on_commit(lambda: bump_version(LISTING_VERSION_KEY))
+
+
+def invalidate_product(product_id) -> None:
+    transaction.on_commit(lambda: bump_version(get_product_version_key(product_id)))
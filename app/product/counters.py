@@ -0,0 +1,120 @@
+import uuid
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.utils import timezone
+from django_redis import get_redis_connection
+
+from helpers.constants import COUNTER_FLUSH_BATCH, COUNTER_FLUSH_LOCK_TIMEOUT, COUNTER_FLUSH_RETENTION
+from product.cache import invalidate_listing, invalidate_product
+from product.models import Product, CounterFlush
+
+LIKE_COUNT_KEY = 'counters:like_count'
+LIKE_COUNT_FLUSHING_KEY = 'counters:like_count:flushing'
+LIKE_COUNT_LOCK_KEY = 'counters:like_count:lock'
+BATCH_FIELD = 'batch'
+
+# Moves the buffered deltas aside unless a previous batch is still there, and names the batch in the same step.
+# A batch left from before batches were named gets its name here too.
+START_FLUSH_SCRIPT = """
+if redis.call('exists', KEYS[2]) == 0 then
+    if redis.call('exists', KEYS[1]) == 0 then
+        return {}
+    end
+    redis.call('rename', KEYS[1], KEYS[2])
+end
+redis.call('hsetnx', KEYS[2], ARGV[2], ARGV[1])
+return redis.call('hgetall', KEYS[2])
+"""
+
+
+def increment_like_count(product_id, delta) -> None:
+    """The delta is buffered once the like is committed, a rolled back like never counts."""
+    transaction.on_commit(
+        lambda: get_redis_connection('default').hincrby(LIKE_COUNT_KEY, product_id, delta)
+    )
+
+
+def get_pending_like_counts(product_ids) -> dict:
+    product_ids = list(product_ids)
+    if not product_ids:
+        return {}
+
+    pipe = get_redis_connection('default').pipeline(transaction=False)
+    pipe.hmget(LIKE_COUNT_KEY, product_ids)
+    pipe.hmget(LIKE_COUNT_FLUSHING_KEY, product_ids)
+    pending, flushing = pipe.execute()
+    return {
+        product_id: int(delta or 0) + int(flushing_delta or 0)
+        for product_id, delta, flushing_delta in zip(product_ids, pending, flushing)
+    }
+
+
+def merge_like_counts(products) -> list:
+    """
+    Copies of the serialized products with the deltas that are not flushed yet added.
+    Runs on the way out, cached payloads keep the database counts only.
+    """
+    deltas = get_pending_like_counts(product['id'] for product in products)
+    return [
+        {**product, 'like_count': max(product['like_count'] + deltas.get(product['id'], 0), 0)}
+        for product in products
+    ]
+
+
+def apply_like_counts(batch, deltas) -> bool:
+    """
+    Applies the batch and records it in one transaction, a batch that is already recorded is skipped.
+    The cached payloads hold the database counts, they are invalidated once per batch, not per like.
+    """
+    table = Product._meta.db_table
+    items = list(deltas.items())
+    with transaction.atomic():
+        _, created = CounterFlush.objects.get_or_create(batch=batch)
+        if not created:
+            return False
+
+        with connection.cursor() as cursor:
+            for start in range(0, len(items), COUNTER_FLUSH_BATCH):
+                chunk = items[start:start + COUNTER_FLUSH_BATCH]
+                values = ', '.join(['(%s, %s)'] * len(chunk))
+                cursor.execute(
+                    f'UPDATE {table} SET like_count = GREATEST({table}.like_count + v.delta, 0) '
+                    f'FROM (VALUES {values}) AS v(id, delta) WHERE {table}.id = v.id',
+                    [value for item in chunk for value in item],
+                )
+        CounterFlush.objects.filter(created_at__lt=timezone.now() - timedelta(seconds=COUNTER_FLUSH_RETENTION)).delete()
+
+        if items:
+            invalidate_listing()
+        for product_id, _ in items:
+            invalidate_product(product_id)
+    return True
+
+
+def flush_like_counts() -> int:
+    """
+    Moves the buffered deltas aside under a batch id and applies them in bulk.
+    The moved hash is dropped after the update commits. When that fails the next run finds the batch recorded
+    and only drops it, until then pending counts may include the batch twice.
+    """
+    client = get_redis_connection('default')
+    lock = client.lock(LIKE_COUNT_LOCK_KEY, timeout=COUNTER_FLUSH_LOCK_TIMEOUT)
+    if not lock.acquire(blocking=False):
+        return 0
+
+    try:
+        values = client.register_script(START_FLUSH_SCRIPT)(
+            keys=[LIKE_COUNT_KEY, LIKE_COUNT_FLUSHING_KEY], args=[uuid.uuid4().hex, BATCH_FIELD],
+        )
+        if not values:
+            return 0
+
+        fields = dict(zip(values[::2], values[1::2]))
+        batch = fields.pop(BATCH_FIELD.encode()).decode()
+        deltas = {int(product_id): int(delta) for product_id, delta in fields.items() if int(delta)}
+        applied = apply_like_counts(batch, deltas)
+        client.delete(LIKE_COUNT_FLUSHING_KEY)
+        return len(deltas) if applied else 0
+    finally:
+        lock.release()
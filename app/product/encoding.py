@@ -0,0 +1,94 @@
+from io import BytesIO
+
+from PIL import Image as PILImage, ImageMath
+
+from helpers.constants import IMAGE_QUALITY_MIN, IMAGE_QUALITY_MAX, IMAGE_SSIM_TARGET
+
+try:
+    import pillow_avif  # noqa: F401, registers the AVIF plugin
+except ImportError:
+    pass
+
+WEBP = 'webp'
+AVIF = 'avif'
+SSIM_WINDOW = 8
+# The usual SSIM stabilizers, (0.01 * 255) ** 2 and (0.03 * 255) ** 2.
+SSIM_C1 = 6.5025
+SSIM_C2 = 58.5225
+SSIM_EXPRESSION = (
+    '((2 * mx * my + c1) * (2 * (xy - mx * my) + c2))'
+    ' / ((mx * mx + my * my + c1) * ((xx - mx * mx) + (yy - my * my) + c2))'
+)
+
+
+def get_formats() -> list:
+    """WebP always, AVIF next to it when the plugin is installed."""
+    return [WEBP, AVIF] if AVIF.upper() in PILImage.SAVE else [WEBP]
+
+
+def encode(im, mimetype, quality: int) -> bytes:
+    output = BytesIO()
+    im.save(output, format=mimetype, quality=quality, exif=b'', icc_profile=im.info.get('icc_profile'))
+    return output.getvalue()
+
+
+def ssim(reference, candidate) -> float:
+    """
+    Mean structural similarity of the luma, over non-overlapping 8x8 windows.
+    Box downscaling of float images gives the window means, so it needs nothing but Pillow.
+    """
+    x, y = reference.convert('L').convert('F'), candidate.convert('L').convert('F')
+    size = (max(x.width // SSIM_WINDOW, 1), max(x.height // SSIM_WINDOW, 1))
+
+    def window_mean(im):
+        return im.resize(size, PILImage.BOX)
+
+    similarity = ImageMath.eval(
+        SSIM_EXPRESSION,
+        mx=window_mean(x),
+        my=window_mean(y),
+        xx=window_mean(ImageMath.eval('a * a', a=x)),
+        yy=window_mean(ImageMath.eval('a * a', a=y)),
+        xy=window_mean(ImageMath.eval('a * b', a=x, b=y)),
+        c1=SSIM_C1,
+        c2=SSIM_C2,
+    )
+    return sum(similarity.getdata()) / (size[0] * size[1])
+
+
+def probe(im, mimetype, quality: int) -> tuple:
+    content = encode(im, mimetype, quality)
+    decoded = PILImage.open(BytesIO(content))
+    decoded.load()
+    return content, ssim(im, decoded)
+
+
+def encode_to_target(im, mimetype, baseline_quality: int, target: float = IMAGE_SSIM_TARGET) -> dict:
+    """
+    Binary search for the lowest quality whose SSIM reaches the target, falling back to the highest quality.
+    It starts from the ladder quality, so the bytes the ladder would have shipped come with the search.
+    """
+    probes = {}
+
+    def run(quality):
+        if quality not in probes:
+            probes[quality] = probe(im, mimetype, quality)
+        return probes[quality]
+
+    low, high = IMAGE_QUALITY_MIN, IMAGE_QUALITY_MAX
+    quality, best = min(max(baseline_quality, low), high), None
+    while low <= high:
+        if run(quality)[1] >= target:
+            best, high = quality, quality - 1
+        else:
+            low = quality + 1
+        quality = (low + high) // 2
+
+    best = IMAGE_QUALITY_MAX if best is None else best
+    return {
+        'content': run(best)[0],
+        'quality': best,
+        'ssim': probes[best][1],
+        'baseline_size': len(run(baseline_quality)[0]),
+        'probes': len(probes),
+    }
@@ -0,0 +1,79 @@
+import hashlib
+from urllib.parse import urlencode
+
+from django.db.models import F, Value, Count, CharField, IntegerField
+from django.db.models.functions import Least
+
+from helpers.constants import ROOM_LIMIT, FACETS_CACHE_TIMEOUT, FACET_PRICE_BUCKET, FACET_PRICE_BUCKETS
+from product.models import Product
+from product.cache import get_versioned, set_versioned
+
+PAGINATION_PARAMS = ('limit', 'offset', 'cursor', 'count', 'shuffle_seed', 'sort')
+
+
+def get_facets_cache_key(request) -> str:
+    params = sorted(
+        (key, value) for key, values in request.GET.lists() if key not in PAGINATION_PARAMS for value in values
+    )
+    return f'product_facets:{hashlib.sha1(urlencode(params).encode()).hexdigest()}'
+
+
+def get_facet_rows(queryset, facet, key):
+    return queryset.values(key=key).annotate(
+        facet=Value(facet, output_field=CharField()),
+        count=Count('*'),
+    ).values_list('facet', 'key', 'count')
+
+
+def get_facets_queryset(q):
+    """All facets as (facet, key, count) rows of a single UNION ALL query."""
+    products = Product.objects.filter(q, is_active=True)
+    product_ids = products.values('id')
+    price_bucket = Least(
+        F('price_per_night') / FACET_PRICE_BUCKET, FACET_PRICE_BUCKETS - 1, output_field=IntegerField()
+    )
+
+    return get_facet_rows(products, 'type', F('type_id')).union(
+        get_facet_rows(
+            Product.category.through.objects.filter(product_id__in=product_ids), 'category', F('category_id')
+        ),
+        get_facet_rows(
+            Product.convenience.through.objects.filter(product_id__in=product_ids), 'convenience', F('convenience_id')
+        ),
+        get_facet_rows(products, 'rooms_qty', Least(F('rooms_qty'), ROOM_LIMIT, output_field=IntegerField())),
+        get_facet_rows(products, 'price', price_bucket),
+        all=True,
+    )
+
+
+def get_facets(q) -> dict:
+    facets = {'count': 0, 'type': [], 'category': [], 'convenience': [], 'rooms_qty': [], 'price': []}
+    for facet, key, count in get_facets_queryset(q):
+        if facet == 'price':
+            facets[facet].append({
+                'from': key * FACET_PRICE_BUCKET,
+                'to': (key + 1) * FACET_PRICE_BUCKET if key < FACET_PRICE_BUCKETS - 1 else None,
+                'count': count,
+            })
+        elif facet == 'rooms_qty':
+            facets[facet].append({'value': key, 'count': count})
+        else:
+            facets[facet].append({'id': key, 'count': count})
+            if facet == 'type':
+                facets['count'] += count
+
+    for facet in ('type', 'category', 'convenience'):
+        facets[facet].sort(key=lambda item: -item['count'])
+    for facet, field in (('rooms_qty', 'value'), ('price', 'from')):
+        facets[facet].sort(key=lambda item: item[field])
+
+    return facets
+
+
+def get_cached_facets(q, request) -> dict:
+    cache_key = get_facets_cache_key(request)
+    version, facets = get_versioned(cache_key)
+    if facets is None:
+        facets = get_facets(q)
+        set_versioned(cache_key, version, facets, FACETS_CACHE_TIMEOUT)
+    return facets
@@ -0,0 +1,70 @@
+from django.db import transaction
+from django_redis import get_redis_connection
+
+from helpers.constants import FAVORITES_CACHE_TIMEOUT
+from product.models import Like
+
+LOADED = 0
+POPULATE_CHUNK = 1000
+
+# Loads the set only if nobody has liked or unliked since the generation was read, otherwise the ids read from
+# the database may already be stale and the next request loads them again.
+POPULATE_SCRIPT = """
+if redis.call('exists', KEYS[1]) == 1 or (redis.call('get', KEYS[2]) or '0') ~= ARGV[1] then
+    return 0
+end
+for i = 3, #ARGV, %(chunk)d do
+    redis.call('sadd', KEYS[1], unpack(ARGV, i, math.min(i + %(chunk)d - 1, #ARGV)))
+end
+redis.call('expire', KEYS[1], ARGV[2])
+return 1
+""" % {'chunk': POPULATE_CHUNK}
+
+UPDATE_SCRIPT = """
+redis.call('incr', KEYS[2])
+redis.call('expire', KEYS[2], ARGV[3])
+if redis.call('exists', KEYS[1]) == 1 then
+    redis.call(ARGV[1], KEYS[1], ARGV[2])
+end
+return 1
+"""
+
+
+def get_favorites_keys(user_id) -> list:
+    return [f'favorites:{user_id}', f'favorites:{user_id}:generation']
+
+
+def get_favorite_ids(user_id) -> set:
+    """
+    Favorite product ids of the user, loaded from the likes on a miss.
+    The set always holds the ``LOADED`` member, so a user without favorites is still a hit.
+    """
+    client = get_redis_connection('default')
+    keys = get_favorites_keys(user_id)
+    pipe = client.pipeline(transaction=False)
+    pipe.smembers(keys[0])
+    pipe.get(keys[1])
+    members, generation = pipe.execute()
+    if members:
+        return {int(member) for member in members} - {LOADED}
+
+    product_ids = set(Like.objects.filter(user_id=user_id).values_list('product_id', flat=True))
+    client.register_script(POPULATE_SCRIPT)(
+        keys=keys, args=[int(generation or 0), FAVORITES_CACHE_TIMEOUT, LOADED, *product_ids],
+    )
+    return product_ids
+
+
+def update_favorite_ids(user_id, product_id, added) -> None:
+    client = get_redis_connection('default')
+    client.register_script(UPDATE_SCRIPT)(
+        keys=get_favorites_keys(user_id), args=['sadd' if added else 'srem', product_id, FAVORITES_CACHE_TIMEOUT],
+    )
+
+
+def favorite_changed(user_id, product_id, added) -> None:
+    transaction.on_commit(lambda: update_favorite_ids(user_id, product_id, added))
+
+
+def overlay_favorites(products, favorite_ids) -> list:
+    return [{**product, 'is_favorite': product['id'] in favorite_ids} for product in products]
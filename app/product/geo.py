@@ -0,0 +1,79 @@
+import math
+
+from django.db.models import Q, F, Value, FloatField
+from django.db.models.functions import ASin, Cos, Least, Power, Radians, Sin, Sqrt
+from django.db.models.lookups import LessThanOrEqual
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = 111.045
+DISTANCE_ORDERING = ('distance', 'id')
+
+
+def parse_coordinate(value, limit):
+    if value is None:
+        return None
+    try:
+        coordinate = float(str(value).strip().replace(',', '.'))
+    except ValueError:
+        return None
+    return coordinate if math.isfinite(coordinate) and -limit <= coordinate <= limit else None
+
+
+def parse_coordinates(lat, lng) -> tuple:
+    latitude, longitude = parse_coordinate(lat, 90), parse_coordinate(lng, 180)
+    if latitude is None or longitude is None:
+        return None, None
+    return latitude, longitude
+
+
+def get_bounding_box(params):
+    bounds = [parse_coordinate(params.get(name), limit) for name, limit in (
+        ('min_lat', 90), ('max_lat', 90), ('min_lng', 180), ('max_lng', 180),
+    )]
+    return None if None in bounds else bounds
+
+
+def get_near(params):
+    try:
+        lat, lng = params.get('near', '').split(',')
+        radius_km = float(params.get('radius_km'))
+    except (TypeError, ValueError):
+        return None
+
+    latitude, longitude = parse_coordinates(lat, lng)
+    if latitude is None or not 0 < radius_km:
+        return None
+    return latitude, longitude, radius_km
+
+
+def get_bounding_box_filter(min_lat, max_lat, min_lng, max_lng) -> Q:
+    q = Q(latitude__range=(min_lat, max_lat))
+    if min_lng <= max_lng:
+        return q & Q(longitude__range=(min_lng, max_lng))
+    return q & (Q(longitude__gte=min_lng) | Q(longitude__lte=max_lng))
+
+
+def get_distance_expression(latitude, longitude):
+    """Haversine distance in kilometers from the given point."""
+    dlat = Radians(F('latitude') - Value(latitude)) / 2
+    dlng = Radians(F('longitude') - Value(longitude)) / 2
+    a = Power(Sin(dlat), 2) + Cos(Radians(Value(latitude))) * Cos(Radians(F('latitude'))) * Power(Sin(dlng), 2)
+    # Rounding can push ``a`` a hair above 1 for antipodal points, outside the domain of asin.
+    return 2 * EARTH_RADIUS_KM * ASin(Least(Sqrt(a), Value(1.0)), output_field=FloatField())
+
+
+def get_radius_filter(latitude, longitude, radius_km) -> Q:
+    """The bounding box is served by the coordinates index, the exact distance only checks what is left."""
+    dlat = radius_km / KM_PER_DEGREE
+    dlng = radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(latitude)), 0.01))
+    bbox = get_bounding_box_filter(
+        max(latitude - dlat, -90),
+        min(latitude + dlat, 90),
+        (longitude - dlng + 180) % 360 - 180 if dlng < 180 else -180,
+        (longitude + dlng + 180) % 360 - 180 if dlng < 180 else 180,
+    )
+    return bbox & Q(LessThanOrEqual(get_distance_expression(latitude, longitude), radius_km))
+
+
+def annotate_distance(queryset, latitude, longitude):
+    return queryset.annotate(distance=get_distance_expression(latitude, longitude)).order_by(*DISTANCE_ORDERING)
@@ -0,0 +1,173 @@
+import time
+import uuid
+from datetime import date
+
+from django.db import IntegrityError, transaction
+from django_redis import get_redis_connection
+
+from helpers.constants import HOLD_TTL
+from product.availability import get_nights
+from product.bookings import BookingConflict, get_conflicts, is_overlap_error
+from product.models import Booking
+
+HOLD_KEY = 'hold:{token}'
+PRODUCT_HOLDS_KEY = 'holds:{product_id}'
+HELD_PRODUCTS_KEY = 'holds:products'
+
+# Drops the expired holds of the product, then adds the new one unless a live hold overlaps its nights.
+# Members are "<token>:<first night ordinal>:<checkout ordinal>" scored by the expiry time, so the overlap check
+# never reads the hold hashes and nothing has to scan for expired holds.
+HOLD_SCRIPT = """
+redis.call('zremrangebyscore', KEYS[1], '-inf', ARGV[1])
+local start_day, end_day = tonumber(ARGV[3]), tonumber(ARGV[4])
+for _, member in ipairs(redis.call('zrange', KEYS[1], 0, -1)) do
+    local held_start, held_end = string.match(member, ':(%d+):(%d+)$')
+    if tonumber(held_start) < end_day and start_day < tonumber(held_end) then
+        return member
+    end
+end
+redis.call('zadd', KEYS[1], ARGV[2], ARGV[5])
+redis.call('expireat', KEYS[1], math.ceil(tonumber(ARGV[2])))
+redis.call('hset', KEYS[2], 'product', ARGV[6], 'user', ARGV[7], 'start', ARGV[3], 'end', ARGV[4], 'member', ARGV[5])
+redis.call('expireat', KEYS[2], math.ceil(tonumber(ARGV[2])))
+local latest = redis.call('zscore', KEYS[3], ARGV[6])
+if not latest or tonumber(latest) < tonumber(ARGV[2]) then
+    redis.call('zadd', KEYS[3], ARGV[2], ARGV[6])
+end
+return false
+"""
+
+
+class HoldConflict(BookingConflict):
+    def __init__(self, conflicts):
+        super().__init__(conflicts, 'Dates are held by another checkout')
+
+
+def parse_member(member) -> tuple:
+    token, start, end = (member.decode() if isinstance(member, bytes) else member).rsplit(':', 2)
+    return token, date.fromordinal(int(start)), date.fromordinal(int(end))
+
+
+def create_hold(product_id, user_id, start_date, end_date) -> dict:
+    start_date, end_date = get_nights(start_date, end_date)
+    token = uuid.uuid4().hex
+    expires_at = time.time() + HOLD_TTL
+    member = f'{token}:{start_date.toordinal()}:{end_date.toordinal()}'
+    client = get_redis_connection('default')
+    conflict = client.register_script(HOLD_SCRIPT)(
+        keys=[PRODUCT_HOLDS_KEY.format(product_id=product_id), HOLD_KEY.format(token=token), HELD_PRODUCTS_KEY],
+        args=[time.time(), expires_at, start_date.toordinal(), end_date.toordinal(), member, product_id, user_id],
+    )
+    if conflict:
+        _, held_start, held_end = parse_member(conflict)
+        raise HoldConflict([{'product': product_id, 'start_date': held_start, 'end_date': held_end}])
+
+    return {
+        'token': token,
+        'product': product_id,
+        'start_date': start_date,
+        'end_date': end_date,
+        'expires_at': int(expires_at),
+    }
+
+
+def place_hold(product_id, user_id, start_date, end_date) -> dict:
+    conflicts = get_conflicts([(product_id, start_date, end_date)])
+    if conflicts:
+        raise BookingConflict(conflicts)
+
+    return create_hold(product_id, user_id, start_date, end_date)
+
+
+def get_hold(token):
+    hold = get_redis_connection('default').hgetall(HOLD_KEY.format(token=token))
+    if not hold:
+        return None
+    hold = {key.decode(): value.decode() for key, value in hold.items()}
+    return {
+        'token': token,
+        'product': int(hold['product']),
+        'user': int(hold['user']),
+        'start_date': date.fromordinal(int(hold['start'])),
+        'end_date': date.fromordinal(int(hold['end'])),
+        'member': hold['member'],
+    }
+
+
+def release_hold(hold) -> None:
+    pipe = get_redis_connection('default').pipeline(transaction=True)
+    pipe.delete(HOLD_KEY.format(token=hold['token']))
+    pipe.zrem(PRODUCT_HOLDS_KEY.format(product_id=hold['product']), hold['member'])
+    pipe.execute()
+
+
+def confirm_hold(hold, user_name=None, phone=None):
+    """The exclusion constraint still guards the insert, the hold is dropped once the booking commits."""
+    booking = Booking(
+        product_id=hold['product'],
+        start_date=hold['start_date'],
+        end_date=hold['end_date'],
+        user_name=user_name,
+        phone=phone,
+    )
+    try:
+        with transaction.atomic():
+            booking.save()
+            transaction.on_commit(lambda: release_hold(hold))
+    except IntegrityError as e:
+        if not is_overlap_error(e):
+            raise
+        raise BookingConflict(get_conflicts([(booking.product_id, booking.start_date, booking.end_date)]))
+
+    return booking
+
+
+def get_held_ranges(product_ids) -> dict:
+    """Live hold ranges of the products, one pipelined read."""
+    product_ids = list(product_ids)
+    if not product_ids:
+        return {}
+
+    now = time.time()
+    pipe = get_redis_connection('default').pipeline(transaction=False)
+    for product_id in product_ids:
+        pipe.zrangebyscore(PRODUCT_HOLDS_KEY.format(product_id=product_id), now, '+inf')
+    return {
+        product_id: [parse_member(member)[1:] for member in members]
+        for product_id, members in zip(product_ids, pipe.execute())
+    }
+
+
+def get_held_product_ids(start_date, end_date) -> set:
+    """Products with a live hold overlapping the nights, only products that have holds at all are read."""
+    client = get_redis_connection('default')
+    now = time.time()
+    pipe = client.pipeline(transaction=False)
+    pipe.zremrangebyscore(HELD_PRODUCTS_KEY, '-inf', now)
+    pipe.zrange(HELD_PRODUCTS_KEY, 0, -1)
+    _, product_ids = pipe.execute()
+
+    start_date, end_date = get_nights(start_date, end_date)
+    return {
+        product_id for product_id, ranges in get_held_ranges(int(value) for value in product_ids).items()
+        if any(held_start < end_date and start_date < held_end for held_start, held_end in ranges)
+    }
+
+
+def merge_held_runs(calendar, start_date, end_date) -> dict:
+    """Adds live holds, clipped to the window, to the occupied runs of the calendar."""
+    start_date, end_date = get_nights(start_date, end_date)
+    for product_id, ranges in get_held_ranges(calendar).items():
+        runs = calendar[product_id] + [
+            [max(held_start, start_date), min(held_end, end_date)]
+            for held_start, held_end in ranges if held_start < end_date and start_date < held_end
+        ]
+        merged = []
+        for run in sorted(runs):
+            if merged and run[0] <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], run[1])
+            else:
+                merged.append(list(run))
+        calendar[product_id] = merged
+
+    return calendar
@@ -0,0 +1,174 @@
+import uuid
+from io import BytesIO
+
+from PIL import Image as PILImage, ImageCms, ImageOps
+from prometheus_client import Counter
+from django.core.files.base import ContentFile
+from django.db import DatabaseError, transaction
+
+from helpers.storage import queue_delete
+from helpers.constants import IMAGE_CARD_WIDTH, IMAGE_GALLERY_WIDTH, IMAGE_FULL_WIDTH
+from product import ImageStatus, ImageSize
+from product.models import Image, ImageDerivative
+from product.encoding import WEBP, get_formats, encode_to_target
+
+SRGB_PROFILE = ImageCms.createProfile('sRGB')
+UNPROCESSED = (ImageStatus.PENDING, ImageStatus.PROCESSING)
+DERIVATIVES = (
+    (ImageSize.CARD, IMAGE_CARD_WIDTH),
+    (ImageSize.GALLERY, IMAGE_GALLERY_WIDTH),
+    (ImageSize.FULL, IMAGE_FULL_WIDTH),
+)
+
+derivative_bytes = Counter(
+    'product_image_derivative_bytes_total',
+    'Bytes of the rendered image derivatives, and of the same derivatives at the old quality ladder',
+    ['mimetype', 'kind'],
+)
+
+
+class CorruptImage(Exception):
+    """The upload can't be decoded, retrying won't help."""
+
+
+def enqueue_image(image_id) -> None:
+    from product.tasks import process_product_image
+
+    transaction.on_commit(lambda: process_product_image.delay(image_id))
+
+
+def decode_image(content: bytes):
+    try:
+        im = PILImage.open(BytesIO(content))
+        im.load()
+        im = ImageOps.exif_transpose(im)
+    except PILImage.UnidentifiedImageError as e:
+        raise CorruptImage('Unsupported image format') from e
+    except Exception as e:
+        raise CorruptImage(str(e)) from e
+
+    if im.mode not in ('RGB', 'RGBA'):
+        im = to_rgb(im)
+    # The orientation is applied to the pixels, the rest of the metadata (camera, location) is dropped.
+    im.info = {key: value for key, value in im.info.items() if key == 'icc_profile'}
+    return im
+
+
+def to_rgb(im):
+    """
+    A palette keeps its RGB profile. The profile of any other source describes other channels,
+    those pixels are converted to sRGB with it when it can be read, and it is never carried over.
+    """
+    mode = 'RGBA' if im.mode in ('LA', 'PA') or 'transparency' in im.info else 'RGB'
+    icc_profile = im.info.get('icc_profile')
+    if im.mode in ('P', 'PA'):
+        converted = im.convert(mode)
+        if icc_profile:
+            converted.info['icc_profile'] = icc_profile
+        return converted
+
+    if icc_profile and im.mode in ('CMYK', 'L'):
+        try:
+            return ImageCms.profileToProfile(
+                im, ImageCms.ImageCmsProfile(BytesIO(icc_profile)), SRGB_PROFILE, outputMode='RGB'
+            )
+        except (ImageCms.PyCMSError, OSError):
+            pass
+    converted = im.convert(mode)
+    converted.info.pop('icc_profile', None)
+    return converted
+
+
+def get_derivative_size(source_size, width) -> tuple:
+    """Never upscales, a source narrower than the target keeps its own size."""
+    source_width, source_height = source_size
+    if source_width <= width:
+        return source_width, source_height
+    return width, max(round(source_height * width / source_width), 1)
+
+
+def render_derivatives(image, im) -> list:
+    """
+    One derivative per named width and format, each at the lowest quality that looks like the source.
+    The sizes the source is too narrow for collapse into the widest one.
+    """
+    original_quality, thumbnail_quality = image.get_qualities()
+    derivatives, widths = [], set()
+    for name, width in DERIVATIVES:
+        size = get_derivative_size(im.size, width)
+        if size[0] in widths:
+            continue
+        widths.add(size[0])
+        resized = im if size == im.size else im.resize(size, PILImage.LANCZOS)
+        baseline_quality = thumbnail_quality if name == ImageSize.CARD else original_quality
+        for mimetype in get_formats():
+            encoded = encode_to_target(resized, mimetype, baseline_quality)
+            derivative = ImageDerivative(
+                image=image, name=name, width=size[0], height=size[1], size=len(encoded['content']),
+                mimetype=mimetype, quality=encoded['quality'], baseline_size=encoded['baseline_size'],
+            )
+            derivative.file.save(f'{uuid.uuid4()}.{mimetype}', ContentFile(encoded['content']), save=False)
+            derivative_bytes.labels(mimetype=mimetype, kind='encoded').inc(derivative.size)
+            derivative_bytes.labels(mimetype=mimetype, kind='baseline').inc(derivative.baseline_size)
+            derivatives.append(derivative)
+    return derivatives
+
+
+def render_image(image) -> bool:
+    """
+    Renders the named derivatives from the stored original, which replace the files the image pointed at.
+    ``original`` and ``thumbnail`` keep pointing at the widest and the card derivative for older clients.
+    """
+    stale_names = [name for name in (image.original.name, image.thumbnail.name) if name]
+    with image.original.open('rb') as raw:
+        content = raw.read()
+    im = decode_image(content)
+
+    derivatives = render_derivatives(image, im)
+    webp = [derivative for derivative in derivatives if derivative.mimetype == WEBP]
+    image.original.name = webp[-1].file.name
+    image.thumbnail.name = webp[0].file.name
+    image.width, image.height = im.size
+    image.size = len(content)
+    image.mimetype = WEBP
+    image.status = ImageStatus.READY
+    image.error = None
+    try:
+        with transaction.atomic():
+            image.save(update_fields=[
+                'original', 'thumbnail', 'width', 'height', 'size', 'mimetype', 'status', 'error',
+            ])
+            ImageDerivative.objects.bulk_create(derivatives)
+    except DatabaseError:
+        if Image.objects.filter(pk=image.pk).exists():
+            raise
+        # Deleted while it was processed, the rendered files have nothing to belong to.
+        queue_delete(*(derivative.file.name for derivative in derivatives))
+        return False
+
+    queue_delete(*stale_names)
+    return True
+
+
+def process_image(image_id) -> bool:
+    """
+    Claims a queued image and renders it from the raw upload.
+    Storage errors propagate to be retried, an undecodable upload raises ``CorruptImage``.
+    """
+    if not Image.objects.filter(pk=image_id, status__in=UNPROCESSED).update(status=ImageStatus.PROCESSING):
+        return False
+
+    return render_image(Image.objects.get(pk=image_id))
+
+
+def fail_image(image_id, error) -> None:
+    """The dead letter: the raw upload is kept for inspection and the image never reaches the listings."""
+    Image.objects.filter(pk=image_id, status__in=UNPROCESSED).update(status=ImageStatus.FAILED, error=error)
+
+
+def reprocess_images(queryset) -> int:
+    image_ids = list(queryset.filter(status=ImageStatus.FAILED).values_list('pk', flat=True))
+    Image.objects.filter(pk__in=image_ids).update(status=ImageStatus.PENDING, error=None)
+    for image_id in image_ids:
+        enqueue_image(image_id)
+    return len(image_ids)
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from product.models import Product
+from product.geo import parse_coordinates
+
+BATCH_SIZE = 500
+
+
+class Command(BaseCommand):
+    help = 'Fill numeric product coordinates from the lat/lng strings'
+
+    def handle(self, *args, **options):
+        products, updated, skipped = [], 0, 0
+        for product in Product.objects.only('id', 'lat', 'lng', 'latitude', 'longitude').iterator(BATCH_SIZE):
+            latitude, longitude = parse_coordinates(product.lat, product.lng)
+            if latitude is None and (product.lat or product.lng):
+                skipped += 1
+            if (latitude, longitude) == (product.latitude, product.longitude):
+                continue
+
+            product.latitude, product.longitude = latitude, longitude
+            products.append(product)
+            if len(products) >= BATCH_SIZE:
+                updated += Product.objects.bulk_update(products, ['latitude', 'longitude'])
+                products = []
+
+        updated += Product.objects.bulk_update(products, ['latitude', 'longitude'])
+        self.stdout.write(self.style.SUCCESS(f'Coordinates updated for {updated} products, {skipped} unparsable'))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from product.models import Image
+from product.images import CorruptImage, render_image
+
+
+class Command(BaseCommand):
+    help = 'Render the named derivatives of ready images uploaded before they existed'
+
+    def handle(self, *args, **options):
+        rendered, failed = 0, 0
+        images = Image.objects.ready().filter(derivatives__isnull=True).order_by('pk')
+        for image in images.iterator():
+            try:
+                rendered += render_image(image)
+            except CorruptImage as e:
+                failed += 1
+                self.stderr.write(f'Image {image.pk}: {str(e)}')
+
+        self.stdout.write(self.style.SUCCESS(f'Derivatives rendered for {rendered} images, {failed} unreadable'))
@@ -0,0 +1,69 @@
+import os
+import time
+
+from PIL import Image as PILImage
+from django.core.management.base import BaseCommand, CommandError
+
+from helpers.constants import IMAGE_GALLERY_WIDTH, IMAGE_SSIM_TARGET, ORIGINAL_QUALITY
+from product.encoding import get_formats, probe, encode_to_target
+from product.images import CorruptImage, decode_image, get_derivative_size
+
+EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp', '.gif', '.tif', '.tiff', '.bmp')
+
+
+class Command(BaseCommand):
+    help = 'Compare image encoding settings over a local corpus: bytes, encode time and SSIM per setting'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Directory with the source images')
+        parser.add_argument('--width', type=int, default=IMAGE_GALLERY_WIDTH, help='Derivative width')
+        parser.add_argument('--quality', type=int, action='append', help='Fixed quality, repeatable')
+        parser.add_argument('--target', type=float, action='append', help='SSIM target, repeatable')
+
+    def handle(self, *args, **options):
+        sources = self.load_sources(options['path'], options['width'])
+        if not sources:
+            raise CommandError(f'No readable images in {options["path"]}')
+
+        settings = [('quality', quality) for quality in options['quality'] or [ORIGINAL_QUALITY, 75, 90]]
+        settings += [('ssim', target) for target in options['target'] or [IMAGE_SSIM_TARGET]]
+
+        self.stdout.write(f'{len(sources)} images at {options["width"]}px')
+        self.stdout.write(f'{"format":<6} {"setting":<14} {"bytes":>12} {"ms/image":>10} {"ssim":>7} {"quality":>8}')
+        for mimetype in get_formats():
+            for kind, value in settings:
+                total_bytes, total_seconds, total_ssim, total_quality = 0, 0.0, 0.0, 0
+                for im in sources:
+                    started = time.perf_counter()
+                    if kind == 'quality':
+                        content, similarity = probe(im, mimetype, value)
+                        quality = value
+                    else:
+                        encoded = encode_to_target(im, mimetype, ORIGINAL_QUALITY, target=value)
+                        content, similarity, quality = encoded['content'], encoded['ssim'], encoded['quality']
+                    total_seconds += time.perf_counter() - started
+                    total_bytes += len(content)
+                    total_ssim += similarity
+                    total_quality += quality
+
+                count = len(sources)
+                self.stdout.write(
+                    f'{mimetype:<6} {f"{kind}={value}":<14} {total_bytes:>12} '
+                    f'{total_seconds * 1000 / count:>10.1f} {total_ssim / count:>7.4f} {total_quality / count:>8.1f}'
+                )
+
+    def load_sources(self, path, width) -> list:
+        sources = []
+        for root, _, files in os.walk(path):
+            for file in sorted(files):
+                if not file.lower().endswith(EXTENSIONS):
+                    continue
+                try:
+                    with open(os.path.join(root, file), 'rb') as f:
+                        im = decode_image(f.read())
+                except CorruptImage as e:
+                    self.stderr.write(f'{file}: {str(e)}')
+                    continue
+                size = get_derivative_size(im.size, width)
+                sources.append(im if size == im.size else im.resize(size, PILImage.LANCZOS))
+        return sources
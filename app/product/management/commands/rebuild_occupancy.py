@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from product.models import Booking, Occupancy
+from product.availability import rebuild_occupancy
+
+
+class Command(BaseCommand):
+    help = 'Rebuild products occupancy bitmaps from bookings'
+
+    def handle(self, *args, **options):
+        product_ids = set(Booking.objects.values_list('product_id', flat=True).distinct())
+        Occupancy.objects.exclude(product_id__in=product_ids).delete()
+
+        for product_id in product_ids:
+            rebuild_occupancy(product_id)
+
+        self.stdout.write(self.style.SUCCESS(f'Occupancy rebuilt for {len(product_ids)} products'))
@@ -0,0 +1,29 @@
+# Generated by Django 5.0.3 on 2026-10-18 20:11
+
+import helpers.utils
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0019_alter_like_options_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='shuffle_rank',
+            field=models.PositiveIntegerField(default=helpers.utils.generate_shuffle_rank, verbose_name='Shuffle rank'),
+        ),
+        migrations.RunSQL(
+            sql='UPDATE products SET shuffle_rank = floor(random() * 2147483647)',
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['shuffle_rank', 'id'], name='products_shuffle_d139d2_idx'),
+        ),
+    ]
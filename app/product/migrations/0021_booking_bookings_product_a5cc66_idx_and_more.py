@@ -0,0 +1,23 @@
+# Generated by Django 5.0.3 on 2026-10-18 20:13
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0020_product_shuffle_rank_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['product', 'start_date', 'id'], name='bookings_product_a5cc66_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['-created_at', '-id'], name='products_created_abe05d_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.0.3 on 2026-10-18 20:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0021_booking_bookings_product_a5cc66_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Occupancy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(verbose_name='Месяц')),
+                ('days', models.IntegerField(default=0, verbose_name='Занятые ночи')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='occupancy', to='product.product')),
+            ],
+            options={
+                'verbose_name': 'Занятость',
+                'verbose_name_plural': 'Занятость',
+                'db_table': 'occupancy',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='occupancy',
+            constraint=models.UniqueConstraint(fields=('product', 'month'), name='occupancy_product_month_unique'),
+        ),
+    ]
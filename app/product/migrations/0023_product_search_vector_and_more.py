@@ -0,0 +1,49 @@
+# Generated by Django 5.0.3 on 2026-10-18 20:15
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0022_occupancy_occupancy_occupancy_product_month_unique'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='product',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunSQL(
+            sql="""
+                UPDATE products SET search_vector =
+                    setweight(to_tsvector('russian', coalesce(name, '')), 'A')
+                    || setweight(to_tsvector('russian', coalesce(city, '') || ' ' || coalesce(address, '')), 'B')
+                    || setweight(to_tsvector('russian', coalesce(description, '')), 'C')
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='products_search_vector_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['name'], name='products_name_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['city'], name='products_city_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['address'], name='products_address_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.0.3 on 2026-10-18 20:17
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0023_product_search_vector_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='latitude',
+            field=models.FloatField(blank=True, editable=False, null=True, verbose_name='Latitude'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='longitude',
+            field=models.FloatField(blank=True, editable=False, null=True, verbose_name='Longitude'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['latitude', 'longitude'], name='products_latitud_91f1d1_idx'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.0.3 on 2026-10-18 20:24
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0024_product_latitude_product_longitude_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql='''
+                DELETE FROM likes duplicate USING likes original
+                WHERE duplicate.user_id = original.user_id
+                  AND duplicate.product_id = original.product_id
+                  AND duplicate.id > original.id
+            ''',
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.RemoveField(
+            model_name='favorites',
+            name='like',
+        ),
+        migrations.RemoveField(
+            model_name='favorites',
+            name='product',
+        ),
+        migrations.RemoveField(
+            model_name='favorites',
+            name='user',
+        ),
+        migrations.AlterModelOptions(
+            name='like',
+            options={'verbose_name': 'Избранные', 'verbose_name_plural': 'Избранные'},
+        ),
+        migrations.AddConstraint(
+            model_name='like',
+            constraint=models.UniqueConstraint(fields=('user', 'product'), name='likes_user_product_unique'),
+        ),
+        migrations.DeleteModel(
+            name='Favorites',
+        ),
+    ]
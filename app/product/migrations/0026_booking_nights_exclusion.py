@@ -0,0 +1,44 @@
+# Generated by Django 5.0.3 on 2026-10-18 20:27
+
+import django.contrib.postgres.constraints
+import django.contrib.postgres.fields.ranges
+import django.db.models.expressions
+import django.db.models.functions.comparison
+import product.models.booking
+from django.contrib.postgres.operations import BtreeGistExtension
+from django.db import migrations, models
+
+OVERLAPS_SQL = '''
+    SELECT a.id, b.id FROM bookings a JOIN bookings b
+    ON a.product_id = b.product_id AND a.id < b.id AND a.nights && b.nights
+    LIMIT 20
+'''
+
+
+def check_overlaps(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(OVERLAPS_SQL)
+        overlaps = cursor.fetchall()
+    if overlaps:
+        raise RuntimeError(f'Resolve overlapping bookings before adding the exclusion constraint: {overlaps}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0025_like_unique_drop_favorites'),
+    ]
+
+    operations = [
+        BtreeGistExtension(),
+        migrations.AddField(
+            model_name='booking',
+            name='nights',
+            field=models.GeneratedField(db_persist=True, expression=product.models.booking.DateRange(models.F('start_date'), django.db.models.functions.comparison.Greatest(models.F('end_date'), models.ExpressionWrapper(django.db.models.expressions.CombinedExpression(models.F('start_date'), '+', models.Value(1)), output_field=models.DateField())), models.Value('[)')), output_field=django.contrib.postgres.fields.ranges.DateRangeField(), verbose_name='Ночи'),
+        ),
+        migrations.RunPython(check_overlaps, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='booking',
+            constraint=django.contrib.postgres.constraints.ExclusionConstraint(expressions=[('product', '='), ('nights', '&&')], name='bookings_product_nights_excl', violation_error_message='Даты брони пересекаются с другой бронью'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.0.3 on 2026-10-18 20:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0026_booking_nights_exclusion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='image',
+            name='error',
+            field=models.TextField(blank=True, null=True, verbose_name='Ошибка обработки'),
+        ),
+        # Images uploaded so far were resized in the request, they are ready.
+        migrations.AddField(
+            model_name='image',
+            name='status',
+            field=models.CharField(choices=[('PENDING', 'В очереди'), ('PROCESSING', 'Обрабатывается'), ('READY', 'Готово'), ('FAILED', 'Ошибка')], default='READY', max_length=20, verbose_name='Статус обработки'),
+        ),
+        migrations.AlterField(
+            model_name='image',
+            name='status',
+            field=models.CharField(choices=[('PENDING', 'В очереди'), ('PROCESSING', 'Обрабатывается'), ('READY', 'Готово'), ('FAILED', 'Ошибка')], default='PENDING', max_length=20, verbose_name='Статус обработки'),
+        ),
+    ]
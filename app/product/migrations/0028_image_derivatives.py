@@ -0,0 +1,37 @@
+# Generated by Django 5.0.3 on 2026-10-18 20:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0027_image_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageDerivative',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(choices=[('card', 'Карточка'), ('gallery', 'Галерея'), ('full', 'Полный размер')], max_length=20, verbose_name='Размер')),
+                ('file', models.ImageField(upload_to='images/derivatives/%Y/%m/%d', verbose_name='Файл')),
+                ('width', models.IntegerField(verbose_name='Width')),
+                ('height', models.IntegerField(verbose_name='Height')),
+                ('size', models.IntegerField(verbose_name='Размер файла')),
+                ('mimetype', models.CharField(max_length=50)),
+                ('image', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='derivatives', to='product.image', verbose_name='Картинка')),
+            ],
+            options={
+                'verbose_name': 'Размер картинки',
+                'verbose_name_plural': 'Размеры картинок',
+                'db_table': 'image_derivatives',
+                'ordering': ('width', 'id'),
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='imagederivative',
+            constraint=models.UniqueConstraint(fields=('image', 'name', 'mimetype'), name='image_derivatives_unique'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.3 on 2026-10-18 20:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0028_image_derivatives'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='imagederivative',
+            name='baseline_size',
+            field=models.IntegerField(blank=True, null=True, verbose_name='Размер при прежнем качестве'),
+        ),
+        migrations.AddField(
+            model_name='imagederivative',
+            name='quality',
+            field=models.IntegerField(blank=True, null=True, verbose_name='Качество'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.0.3 on 2026-10-18 21:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0029_image_derivative_quality'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CounterFlush',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('batch', models.CharField(max_length=32, unique=True, verbose_name='Пакет')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Дата применения')),
+            ],
+            options={
+                'verbose_name': 'Применённый пакет счётчиков',
+                'verbose_name_plural': 'Применённые пакеты счётчиков',
+                'db_table': 'counter_flushes',
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.0.3 on 2026-10-19 10:12
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0030_counter_flushes'),
+    ]
+
+    operations = [
+        # The bitmaps of the bookings made before the occupancy table, the same masks rebuild_occupancy writes:
+        # night [start_date, end_date) sets the bit of its day in its month, a same day booking holds one night.
+        migrations.RunSQL(
+            sql='''
+                INSERT INTO occupancy (product_id, month, days)
+                SELECT product_id, date_trunc('month', night)::date, bit_or(1 << (extract(day FROM night)::int - 1))
+                FROM (
+                    SELECT product_id,
+                           generate_series(
+                               start_date, greatest(end_date, start_date + 1) - 1, interval '1 day'
+                           )::date AS night
+                    FROM bookings
+                ) nights
+                GROUP BY product_id, date_trunc('month', night)
+                ON CONFLICT (product_id, month) DO UPDATE SET days = EXCLUDED.days
+            ''',
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -1,6 +1,6 @@
-from product.models.products import Product, Like, Favorites
-from product.models.options import Type, Convenience, Category, Image
-from product.models.booking import Booking
+from product.models.products import Product, Like, CounterFlush
+from product.models.options import Type, Convenience, Category, Image, ImageDerivative
+from product.models.booking import Booking, Occupancy
 from product.models.comments import Comment
 
 
@@ -10,8 +10,10 @@ __all__ = (
     'Category',
     'Product',
     'Image',
+    'ImageDerivative',
     'Booking',
+    'Occupancy',
     'Like',
+    'CounterFlush',
     'Comment',
-    'Favorites',
 )
@@ -1,7 +1,18 @@
 from django.db import models
+from django.db.models import F, Func, Value, ExpressionWrapper
+from django.db.models.functions import Greatest
+from django.db.models.signals import post_save, post_delete
+from django.contrib.postgres.constraints import ExclusionConstraint
+from django.contrib.postgres.fields import DateRangeField, RangeOperators
 from phonenumber_field.modelfields import PhoneNumberField
 
 from product.models.products import Product
+from product.signals import booking_saved, booking_deleted, listing_changed, product_changed
+
+
+class DateRange(Func):
+    function = 'daterange'
+    output_field = DateRangeField()
 
 
 class Booking(models.Model):
@@ -10,6 +21,17 @@ class Booking(models.Model):
     product = models.ForeignKey(to=Product, related_name='booking', on_delete=models.CASCADE, default=1)
     user_name = models.CharField(max_length=255, null=True, blank=True)
     phone = models.CharField(max_length=255, null=True, blank=True)
+    # Occupied nights [start_date, end_date), a same day booking still holds its first night.
+    nights = models.GeneratedField(
+        expression=DateRange(
+            F('start_date'),
+            Greatest(F('end_date'), ExpressionWrapper(F('start_date') + Value(1), output_field=models.DateField())),
+            Value('[)'),
+        ),
+        output_field=DateRangeField(),
+        db_persist=True,
+        verbose_name='Ночи',
+    )
 
     class Meta:
         db_table = 'bookings'
@@ -18,4 +40,43 @@ class Booking(models.Model):
         indexes = [
             models.Index(fields=['start_date']),
             models.Index(fields=['end_date']),
+            models.Index(fields=['product', 'start_date', 'id']),
+        ]
+        constraints = [
+            ExclusionConstraint(
+                name='bookings_product_nights_excl',
+                expressions=[('product', RangeOperators.EQUAL), ('nights', RangeOperators.OVERLAPS)],
+                violation_error_message='Даты брони пересекаются с другой бронью',
+            ),
         ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_occupancy = tuple(
+            instance.__dict__.get(field) for field in ('product_id', 'start_date', 'end_date')
+        )
+        return instance
+
+
+class Occupancy(models.Model):
+    product = models.ForeignKey(to=Product, related_name='occupancy', on_delete=models.CASCADE)
+    month = models.DateField(verbose_name='Месяц')
+    days = models.IntegerField(verbose_name='Занятые ночи', default=0)
+
+    class Meta:
+        db_table = 'occupancy'
+        verbose_name = 'Занятость'
+        verbose_name_plural = 'Занятость'
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'month'], name='occupancy_product_month_unique'),
+        ]
+
+
+# Before booking_saved, which forgets the product the booking was loaded with.
+post_save.connect(product_changed, sender=Booking)
+post_delete.connect(product_changed, sender=Booking)
+post_save.connect(booking_saved, sender=Booking)
+post_delete.connect(booking_deleted, sender=Booking)
+post_save.connect(listing_changed, sender=Booking)
+post_delete.connect(listing_changed, sender=Booking)
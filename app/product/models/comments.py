@@ -1,8 +1,10 @@
 from django.db import models
 from django.utils import timezone
+from django.db.models.signals import post_save, post_delete
 
 from helpers.models import TimestampMixin
 from product.models.products import Product
+from product.signals import product_changed
 
 
 class CommentManager(models.Manager):
@@ -32,3 +34,7 @@ class Comment(
     class Meta:
         db_table = 'comments'
         ordering = ['-id']
+
+
+post_save.connect(product_changed, sender=Comment)
+post_delete.connect(product_changed, sender=Comment)
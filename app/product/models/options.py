@@ -4,13 +4,13 @@ from django.utils.safestring import mark_safe
 from django.core.exceptions import ValidationError
 from django.core.files.storage import default_storage
 from django.dispatch import receiver
-from PIL import Image as PILImage
+from django.db.models.signals import post_save, post_delete
 
 from helpers.models import TimestampMixin, CharNameModel
-from helpers.mixins import ResizeImageMixin
-from helpers.logger import log_exception
-from helpers.utils import delete_file
+from helpers.storage import files_deleted
 from helpers.constants import MB_SIZE, ORIGINAL_QUALITY, THUMBNAIL_QUALITY
+from product import ImageStatus, ImageSize
+from product.signals import listing_changed, product_changed, image_uploaded
 
 
 class Category(CharNameModel, models.Model):
@@ -54,7 +54,15 @@ class Type(CharNameModel, TimestampMixin, models.Model):
         return self.name
 
 
-class Image(models.Model, ResizeImageMixin):
+class ImageQuerySet(models.QuerySet):
+    def ready(self):
+        return self.filter(status=ImageStatus.READY)
+
+    def with_derivatives(self):
+        return self.prefetch_related('derivatives')
+
+
+class Image(models.Model):
     original = models.ImageField(verbose_name=_('Оригинальная картина'), upload_to='images/original/%Y/%m/%d')
     thumbnail = models.ImageField(verbose_name=_('Thumbnail картина'), upload_to='images/thumbnail/%Y/%m/%d', null=True)
     width = models.IntegerField(verbose_name=_('Width'), blank=True, null=True)
@@ -64,6 +72,11 @@ class Image(models.Model, ResizeImageMixin):
     product = models.ForeignKey('product.Product', verbose_name=_('Продукт'), related_name='images',
                                 on_delete=models.CASCADE, null=True, blank=True)
     is_label = models.BooleanField(default=False)
+    status = models.CharField(verbose_name=_('Статус обработки'), max_length=20, choices=ImageStatus.choices,
+                              default=ImageStatus.PENDING)
+    error = models.TextField(verbose_name=_('Ошибка обработки'), blank=True, null=True)
+
+    objects = ImageQuerySet.as_manager()
 
     class Meta:
         db_table = 'images'
@@ -86,26 +99,6 @@ class Image(models.Model, ResizeImageMixin):
         else:
             return ""
 
-    def save(self, *args, **kwargs):
-        if self.pk is None:
-            original_quality, thumbnail_quality = self.get_qualities()
-
-            original_width, original_height, mime_type = self.resize(
-                image_field=self.original,
-                quality=original_quality,
-                resize=0.90
-            )
-            self.resize(
-                image_field=self.thumbnail,
-                quality=thumbnail_quality,
-                resize=0.55
-            )
-
-            self.width = original_width
-            self.height = original_height
-            self.mimetype = mime_type
-        super().save(*args, **kwargs)
-
     def get_qualities(self):
         original_quality, thumbnail_quality = ORIGINAL_QUALITY, THUMBNAIL_QUALITY
         original_image_size = self.original.size
@@ -133,20 +126,35 @@ class Image(models.Model, ResizeImageMixin):
 
         return original_quality, thumbnail_quality
 
-    def delete(self, *args, **kwargs):
-        self.__delete_image_from_minio()
-        super().delete(*args, **kwargs)
-
-    def __delete_image_from_minio(self):
-        if self.original:
-            original_image_name = self.original.name
-            try:
-                delete_file(original_image_name)
-            except Exception as e:
-                log_exception(e, "Error deleting original image from MinIO")
-        if self.thumbnail:
-            thumbnail_image_name = self.thumbnail.name
-            try:
-                delete_file(thumbnail_image_name)
-            except Exception as e:
-                log_exception(e, "Error deleting thumbnail image from MinIO")
+
+class ImageDerivative(models.Model):
+    image = models.ForeignKey(Image, verbose_name=_('Картинка'), related_name='derivatives', on_delete=models.CASCADE)
+    name = models.CharField(verbose_name=_('Размер'), max_length=20, choices=ImageSize.choices)
+    file = models.ImageField(verbose_name=_('Файл'), upload_to='images/derivatives/%Y/%m/%d')
+    width = models.IntegerField(verbose_name=_('Width'))
+    height = models.IntegerField(verbose_name=_('Height'))
+    size = models.IntegerField(verbose_name=_('Размер файла'))
+    mimetype = models.CharField(max_length=50)
+    quality = models.IntegerField(verbose_name=_('Качество'), blank=True, null=True)
+    baseline_size = models.IntegerField(verbose_name=_('Размер при прежнем качестве'), blank=True, null=True)
+
+    class Meta:
+        db_table = 'image_derivatives'
+        ordering = ('width', 'id')
+        verbose_name = _('Размер картинки')
+        verbose_name_plural = _('Размеры картинок')
+        constraints = [
+            models.UniqueConstraint(fields=['image', 'name', 'mimetype'], name='image_derivatives_unique'),
+        ]
+
+    def __str__(self):
+        return f'{self.image_id} {self.name} {self.width}w'
+
+
+post_save.connect(image_uploaded, sender=Image)
+post_delete.connect(files_deleted, sender=Image)
+post_delete.connect(files_deleted, sender=ImageDerivative)
+post_save.connect(listing_changed, sender=Image)
+post_delete.connect(listing_changed, sender=Image)
+post_save.connect(product_changed, sender=Image)
+post_delete.connect(product_changed, sender=Image)
@@ -1,18 +1,27 @@
 from django.db import models
 from django.conf import settings
-from django.db.models import Sum, F, ExpressionWrapper, IntegerField
-from django.db.models.signals import post_save, pre_delete
+from django.db.models import Sum, F, ExpressionWrapper, IntegerField, Prefetch
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.utils.translation import gettext_lazy as _
 from helpers.models import TimestampMixin, CharNameModel
-from product.signals import product_like, product_dislike
+from helpers.utils import generate_shuffle_rank
+from product.signals import (
+    product_like, product_dislike, product_saved, listing_changed, product_changed, product_m2m_changed
+)
 from django.core.validators import MinValueValidator, MaxValueValidator
 from product import Priority
+from product.geo import parse_coordinates
+from product.models.options import Image
 import math
 
 
 class ProductActiveManager(models.Manager):
     def get_queryset(self):
-        return super().get_queryset().select_related('owner').prefetch_related('images', 'like').filter(is_active=True)
+        return super().get_queryset().select_related('owner').prefetch_related(
+            Prefetch('images', queryset=Image.objects.ready().with_derivatives()), 'like'
+        ).filter(is_active=True)
 
 
 class ProductManager(models.Manager):
@@ -21,7 +30,7 @@ class ProductManager(models.Manager):
             .prefetch_related(
             'convenience',
             'booking',
-            'images',
+            'images__derivatives',
         )
 
 
@@ -48,6 +57,8 @@ class Product(CharNameModel, TimestampMixin, models.Model):
                              on_delete=models.PROTECT)
     lng = models.CharField(verbose_name='Координата Longitude', max_length=255, null=True, blank=True)
     lat = models.CharField(verbose_name='Координата Latitude', max_length=255, null=True, blank=True)
+    latitude = models.FloatField(verbose_name='Latitude', null=True, blank=True, editable=False)
+    longitude = models.FloatField(verbose_name='Longitude', null=True, blank=True, editable=False)
     is_active = models.BooleanField(verbose_name=_('Активный'), default=False)
     priority = models.TextField(choices=Priority.choices, default=Priority.MEDIUM, max_length=50)
     like_count = models.PositiveIntegerField(verbose_name='Likes', default=0)
@@ -56,6 +67,8 @@ class Product(CharNameModel, TimestampMixin, models.Model):
     comments = models.TextField(verbose_name='Коментарии', null=True, blank=True)
     best_product = models.BooleanField(default=False)
     promotion = models.BooleanField(default=False)
+    shuffle_rank = models.PositiveIntegerField(verbose_name='Shuffle rank', default=generate_shuffle_rank)
+    search_vector = SearchVectorField(null=True, editable=False)
 
     objects = models.Manager()
     with_related = ProductManager()
@@ -72,11 +85,25 @@ class Product(CharNameModel, TimestampMixin, models.Model):
             models.Index(fields=['rooms_qty']),
             models.Index(fields=['guest_qty']),
             models.Index(fields=['type']),
+            models.Index(fields=['shuffle_rank', 'id']),
+            models.Index(fields=['-created_at', '-id']),
+            models.Index(fields=['latitude', 'longitude']),
+            GinIndex(fields=['search_vector'], name='products_search_vector_idx'),
+            GinIndex(fields=['name'], name='products_name_trgm_idx', opclasses=['gin_trgm_ops']),
+            GinIndex(fields=['city'], name='products_city_trgm_idx', opclasses=['gin_trgm_ops']),
+            GinIndex(fields=['address'], name='products_address_trgm_idx', opclasses=['gin_trgm_ops']),
         ]
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        self.latitude, self.longitude = parse_coordinates(self.lat, self.lng)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'lat', 'lng'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'latitude', 'longitude'}
+        super().save(*args, **kwargs)
+
     def is_favorited_by_user(self, user_id):
         return self.like.filter(user_id=user_id).exists()
 
@@ -88,19 +115,31 @@ class Like(TimestampMixin, models.Model):
 
     class Meta:
         db_table = 'likes'
+        verbose_name = _('Избранные')
+        verbose_name_plural = _('Избранные')
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'product'], name='likes_user_product_unique'),
+        ]
 
 
-class Favorites(TimestampMixin, models.Model):
-    product = models.ForeignKey(Product, related_name='favorites', on_delete=models.CASCADE)
-    user = models.ForeignKey('account.User', related_name='favorites', on_delete=models.CASCADE)
-    like = models.ForeignKey(Like, related_name='favorites', on_delete=models.CASCADE)
+class CounterFlush(models.Model):
+    """A flushed batch of buffered counters, recorded with the update so a retried batch is never applied twice."""
+    batch = models.CharField(verbose_name=_('Пакет'), max_length=32, unique=True)
+    created_at = models.DateTimeField(verbose_name=_('Дата применения'), auto_now_add=True, db_index=True)
 
     class Meta:
-        db_table = 'favorites'
-        ordering = ("-created_at",)
-        verbose_name = _('Избранные')
-        verbose_name_plural = _('Избранные')
+        db_table = 'counter_flushes'
+        verbose_name = _('Применённый пакет счётчиков')
+        verbose_name_plural = _('Применённые пакеты счётчиков')
 
 
+post_save.connect(product_saved, sender=Product)
 post_save.connect(product_like, sender=Like)
-pre_delete.connect(product_dislike, sender=Like)
+post_delete.connect(product_dislike, sender=Like)
+post_save.connect(listing_changed, sender=Product)
+post_delete.connect(listing_changed, sender=Product)
+post_save.connect(product_changed, sender=Product)
+post_delete.connect(product_changed, sender=Product)
+for through in (Product.category.through, Product.convenience.through):
+    m2m_changed.connect(listing_changed, sender=through)
+    m2m_changed.connect(product_m2m_changed, sender=through)
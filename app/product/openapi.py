@@ -17,7 +17,10 @@ min_price = openapi.Parameter('min_price', openapi.IN_QUERY, description="Min pr
 max_price = openapi.Parameter('max_price', openapi.IN_QUERY, description="Max price", type=openapi.TYPE_INTEGER)
 rooms_qty = openapi.Parameter('rooms_qty', openapi.IN_QUERY, description="Rooms total counts, limit 8+",
                               type=openapi.TYPE_INTEGER)
-house_name = openapi.Parameter('house_name', openapi.IN_QUERY, description="House name", type=openapi.TYPE_STRING)
+house_name = openapi.Parameter(
+    'house_name', openapi.IN_QUERY, description="Search by name, city, address and description, sorted by relevance",
+    type=openapi.TYPE_STRING
+)
 house_type = openapi.Parameter('house_type', openapi.IN_QUERY, description="House type", type=openapi.TYPE_STRING)
 bath_qty = openapi.Parameter(
     'bath_qty', openapi.IN_QUERY, description="Bath total counts, limit 4+", type=openapi.TYPE_INTEGER
@@ -28,11 +31,40 @@ bed_qty = openapi.Parameter(
 bedroom_qty = openapi.Parameter(
     'bedroom_qty', openapi.IN_QUERY, description="Bedroom total counts, limit 6+", type=openapi.TYPE_INTEGER
 )
+min_lat = openapi.Parameter('min_lat', openapi.IN_QUERY, description="Map south bound", type=openapi.TYPE_NUMBER)
+max_lat = openapi.Parameter('max_lat', openapi.IN_QUERY, description="Map north bound", type=openapi.TYPE_NUMBER)
+min_lng = openapi.Parameter('min_lng', openapi.IN_QUERY, description="Map west bound", type=openapi.TYPE_NUMBER)
+max_lng = openapi.Parameter('max_lng', openapi.IN_QUERY, description="Map east bound", type=openapi.TYPE_NUMBER)
+near = openapi.Parameter('near', openapi.IN_QUERY, description="Point as lat,lng", type=openapi.TYPE_STRING)
+radius_km = openapi.Parameter(
+    'radius_km', openapi.IN_QUERY, description="Radius around near in km", type=openapi.TYPE_NUMBER
+)
+sort = openapi.Parameter(
+    'sort', openapi.IN_QUERY, description="distance: sort by distance from near", type=openapi.TYPE_STRING
+)
 limit = openapi.Parameter('limit', openapi.IN_QUERY, description="Limit", type=openapi.TYPE_INTEGER)
-offset = openapi.Parameter('offset', openapi.IN_QUERY, description="Offset", type=openapi.TYPE_INTEGER)
+offset = openapi.Parameter(
+    'offset', openapi.IN_QUERY, description="Offset, legacy pagination used when cursor is not passed",
+    type=openapi.TYPE_INTEGER
+)
+cursor = openapi.Parameter(
+    'cursor', openapi.IN_QUERY, description="Cursor from the next/previous link", type=openapi.TYPE_STRING
+)
+count = openapi.Parameter(
+    'count', openapi.IN_QUERY, description="Total count mode: exact, cached, estimate, off", type=openapi.TYPE_STRING
+)
+shuffle_seed = openapi.Parameter(
+    'shuffle_seed', openapi.IN_QUERY, description="Shuffle seed, keeps one random order between pages",
+    type=openapi.TYPE_STRING
+)
+ids = openapi.Parameter(
+    'ids', openapi.IN_QUERY, description="Product ids separated by commas", type=openapi.TYPE_STRING, required=True
+)
 active = openapi.Parameter('active', openapi.IN_QUERY, description="Product active", type=openapi.TYPE_BOOLEAN)
 
-manual_parameters = [
+filter_parameters = [
     house_name, min_price, max_price, start_date, end_date, guest_count, guests_with_babies, guests_with_pets,
-    rooms_qty, bed_qty, bath_qty, bedroom_qty, category, house_type, limit, offset
+    rooms_qty, bed_qty, bath_qty, bedroom_qty, category, house_type, min_lat, max_lat, min_lng, max_lng, near,
+    radius_km
 ]
+manual_parameters = filter_parameters + [sort, shuffle_seed, limit, cursor, count, offset]
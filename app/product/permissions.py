@@ -42,7 +42,7 @@ class ProductPreviewPermissions(permissions.DjangoModelPermissions):
 
 class CommentPermissions(permissions.DjangoModelPermissions):
     def has_object_permission(self, request, view, obj):
-        if request.method == 'DELETE' and obj.user != request.user:
+        if request.method == 'DELETE' and obj.user_id != request.user.pk:
             return False
         if request.method in permissions.SAFE_METHODS:
             return True
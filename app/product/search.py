@@ -0,0 +1,46 @@
+from django.db.models import Q, F, Value, FloatField
+from django.db.models.functions import Cast, Greatest
+from django.contrib.postgres.search import SearchVector, SearchQuery, SearchRank, TrigramWordSimilarity
+
+from helpers.constants import SEARCH_CONFIG
+
+SEARCH_FIELDS = ('name', 'city', 'address', 'description')
+SEARCH_ORDERING = ('-search_rank', 'id')
+
+
+def get_search_vector():
+    return (
+        SearchVector('name', weight='A', config=SEARCH_CONFIG)
+        + SearchVector('city', 'address', weight='B', config=SEARCH_CONFIG)
+        + SearchVector('description', weight='C', config=SEARCH_CONFIG)
+    )
+
+
+def update_search_vector(queryset) -> int:
+    return queryset.update(search_vector=get_search_vector())
+
+
+def get_search_query(text):
+    return SearchQuery(text, config=SEARCH_CONFIG, search_type='websearch')
+
+
+def get_search_filter(text) -> Q:
+    return (
+        Q(search_vector=get_search_query(text))
+        | Q(name__trigram_word_similar=text)
+        | Q(city__trigram_word_similar=text)
+        | Q(address__trigram_word_similar=text)
+    )
+
+
+def annotate_search_rank(queryset, text):
+    """
+    Full text rank plus the best trigram similarity, so misspelled names still sort close to the top.
+    The rank is cast to double precision to survive the round trip through a pagination cursor.
+    """
+    rank = SearchRank(F('search_vector'), get_search_query(text)) + Greatest(
+        TrigramWordSimilarity(Value(text), 'name'),
+        TrigramWordSimilarity(Value(text), 'city'),
+        TrigramWordSimilarity(Value(text), 'address'),
+    )
+    return queryset.annotate(search_rank=Cast(rank, FloatField())).order_by(*SEARCH_ORDERING)
@@ -1,32 +1,52 @@
 from product.serializers.product import (
     ProductCreateSerializer,
     ProductListSerializer,
+    ProductCardSerializer,
     TypeSerializer,
     CategorySerializer,
     ConvenienceSerializer,
     ProductLikeSerializer,
+    ProductLikesSyncSerializer,
     ProductRetrieveSerializer,
     ProductUpdateSerializer,
     ProductPreviewSerializer,
 )
-from product.serializers.booking import BookingSerializer, CreateBookingSerializer
-from product.serializers.image import UploadFilesSerializer, ImageSerializer
+from product.serializers.booking import (
+    BookingSerializer,
+    CreateBookingSerializer,
+    ReserveBookingsSerializer,
+    HoldSerializer,
+    ConfirmHoldSerializer,
+)
+from product.serializers.image import (
+    UploadFilesSerializer,
+    ImageSerializer,
+    ImageUploadsSerializer,
+    ImageUploadsCompleteSerializer,
+)
 from product.serializers.comment import CommentSerializer, CommentListSerializer
 
 __all__ = (
     'ProductCreateSerializer',
     'ProductListSerializer',
+    'ProductCardSerializer',
     'TypeSerializer',
     'CategorySerializer',
     'ConvenienceSerializer',
     'BookingSerializer',
     'ProductLikeSerializer',
+    'ProductLikesSyncSerializer',
     'ProductRetrieveSerializer',
     'UploadFilesSerializer',
     'CommentSerializer',
     'CommentListSerializer',
     'ImageSerializer',
+    'ImageUploadsSerializer',
+    'ImageUploadsCompleteSerializer',
     'ProductUpdateSerializer',
     'ProductPreviewSerializer',
     'CreateBookingSerializer',
+    'ReserveBookingsSerializer',
+    'HoldSerializer',
+    'ConfirmHoldSerializer',
 )
@@ -1,5 +1,7 @@
+from datetime import date
 from rest_framework import serializers
-from product.models import Booking
+from product.models import Booking, Product
+from helpers.constants import BOOKING_RESERVE_MAX
 
 
 class BookingSerializer(serializers.ModelSerializer):
@@ -24,3 +26,39 @@ class CreateBookingSerializer(serializers.ModelSerializer):
             'user_name',
             'phone'
         )
+
+    def validate(self, attrs):
+        start_date = attrs.get('start_date', getattr(self.instance, 'start_date', None))
+        end_date = attrs.get('end_date', getattr(self.instance, 'end_date', None))
+        if start_date and end_date and end_date <= start_date:
+            raise serializers.ValidationError({'end_date': 'Дата выезда должна быть позже даты заезда'})
+        return attrs
+
+
+class ReserveBookingsSerializer(serializers.Serializer):
+    bookings = CreateBookingSerializer(many=True, allow_empty=False, max_length=BOOKING_RESERVE_MAX)
+
+    def validate_bookings(self, bookings):
+        ranges = sorted(bookings, key=lambda item: (item['product'].pk, item['start_date']))
+        for previous, current in zip(ranges, ranges[1:]):
+            if previous['product'] == current['product'] and current['start_date'] < previous['end_date']:
+                raise serializers.ValidationError('Даты броней пересекаются между собой')
+        return bookings
+
+
+class HoldSerializer(serializers.Serializer):
+    product = serializers.PrimaryKeyRelatedField(queryset=Product.objects.filter(is_active=True))
+    start_date = serializers.DateField()
+    end_date = serializers.DateField()
+
+    def validate(self, attrs):
+        if attrs['start_date'] < date.today():
+            raise serializers.ValidationError({'start_date': 'Дата заезда уже прошла'})
+        if attrs['end_date'] <= attrs['start_date']:
+            raise serializers.ValidationError({'end_date': 'Дата выезда должна быть позже даты заезда'})
+        return attrs
+
+
+class ConfirmHoldSerializer(serializers.Serializer):
+    user_name = serializers.CharField(max_length=255, required=False, allow_null=True, allow_blank=True)
+    phone = serializers.CharField(max_length=255, required=False, allow_null=True, allow_blank=True)
@@ -1,11 +1,11 @@
 from rest_framework import serializers
 from product.models import Comment
 
-from helpers.serializers import UserSerializer
+from helpers.serializers import UserSerializer, RequestUserDefault
 
 
 class CommentSerializer(serializers.ModelSerializer):
-    user = serializers.HiddenField(default=serializers.CurrentUserDefault())
+    user = serializers.HiddenField(default=RequestUserDefault())
     content = serializers.CharField(max_length=350)
 
     class Meta:
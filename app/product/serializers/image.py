@@ -3,6 +3,8 @@ from rest_framework import serializers
 
 from product.models import Image
 from helpers.validator import MAX_FILE_SIZE
+from helpers.serializers import UploadFileSerializer
+from helpers.constants import UPLOAD_MAX_FILES
 
 
 class ImageSerializer(serializers.ModelSerializer):
@@ -38,3 +40,13 @@ class ImageCreateSerializer(serializers.ModelSerializer):
             'thumbnail',
             'product',
         )
+
+
+class ImageUploadsSerializer(serializers.Serializer):
+    files = serializers.ListField(child=UploadFileSerializer(), min_length=1, max_length=UPLOAD_MAX_FILES)
+
+
+class ImageUploadsCompleteSerializer(serializers.Serializer):
+    tokens = serializers.ListField(
+        child=serializers.CharField(max_length=32), min_length=1, max_length=UPLOAD_MAX_FILES
+    )
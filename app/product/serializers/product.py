@@ -3,15 +3,18 @@ from django.conf import settings
 from django.db.models import Prefetch, OuterRef
 from rest_framework import serializers
 
-from product.models import Product, Category, Convenience, Type, Like, Favorites
+from product.models import Product, Category, Convenience, Type, Like
 from product.serializers import booking, comment
 from product.tasks import send_email_message
 from django.db.models import Q
 
-from helpers.serializers import ImageSerializer, UserSerializer, ShareItemSerializer, IconSerializer
+from helpers.serializers import (
+    ImageSerializer, UserSerializer, ShareItemSerializer, IconSerializer, RequestUserDefault
+)
 from helpers.logger import log_exception
+from helpers.constants import LIKES_SYNC_MAX
 from helpers.mixins import ImageMinioCorrectPathMixin
-from product.services import get_product_bookings, sort_products_images
+from product.services import sort_products_images
 
 
 class CategorySerializer(IconSerializer, ImageMinioCorrectPathMixin):
@@ -44,8 +47,8 @@ class ProductRetrieveSerializer(serializers.ModelSerializer):
     convenience = ConvenienceSerializer(many=True, read_only=True)
     type = TypeSerializer(read_only=True)
     images = ImageSerializer(many=True, read_only=True)
-    bookings = booking.BookingSerializer(many=True, read_only=True)
-    comments = serializers.SerializerMethodField()
+    bookings = booking.BookingSerializer(source='window_bookings', many=True, read_only=True)
+    comments = comment.CommentListSerializer(source='recent_comments', many=True, read_only=True)
     owner = UserSerializer()
     is_favorite = serializers.SerializerMethodField()
     is_new = serializers.BooleanField(default=False)
@@ -83,16 +86,8 @@ class ProductRetrieveSerializer(serializers.ModelSerializer):
             'promotion'
         )
 
-    def get_comments(self, obj):
-        comments = obj.product_comments.filter(is_active=True)[:6]
-        serializer = comment.CommentListSerializer(comments, many=True)
-        return serializer.data
-
     def to_representation(self, instance):
         representation = super().to_representation(instance)
-        filtered_bookings = get_product_bookings(instance)
-        serialized_bookings = booking.BookingSerializer(filtered_bookings, many=True).data
-        representation['bookings'] = serialized_bookings
         representation['images'] = sort_products_images(representation.pop('images'))
 
         return representation
@@ -106,6 +101,7 @@ class ProductListSerializer(serializers.ModelSerializer):
     owner = UserSerializer()
     is_favorite = serializers.SerializerMethodField()
     is_new = serializers.BooleanField(default=False)
+    distance = serializers.FloatField(read_only=True)
 
     class Meta:
         model = Product
@@ -123,7 +119,10 @@ class ProductListSerializer(serializers.ModelSerializer):
             'is_new',
             'best_product',
             'promotion',
-            'is_active'
+            'is_active',
+            'latitude',
+            'longitude',
+            'distance'
         )
 
     def get_is_favorite(self, obj):
@@ -136,8 +135,12 @@ class ProductListSerializer(serializers.ModelSerializer):
         return representation
 
 
+class ProductCardSerializer(ProductListSerializer):
+    images = ImageSerializer(source='card_images', many=True, read_only=True)
+
+
 class ProductCreateSerializer(serializers.ModelSerializer):
-    owner = serializers.HiddenField(default=serializers.CurrentUserDefault())
+    owner = serializers.HiddenField(default=RequestUserDefault())
     rooms_qty = serializers.IntegerField(max_value=9999)
     guest_qty = serializers.IntegerField(max_value=9999)
     bed_qty = serializers.IntegerField(max_value=9999)
@@ -274,10 +277,19 @@ class ProductPreviewSerializer(serializers.ModelSerializer):
 
 
 class ProductLikeSerializer(serializers.ModelSerializer):
-    user = serializers.HiddenField(default=serializers.CurrentUserDefault())
+    user = serializers.HiddenField(default=RequestUserDefault())
 
     class Meta:
         model = Like
         fields = (
             'user',
         )
+
+
+class LikeStateSerializer(serializers.Serializer):
+    product = serializers.IntegerField(min_value=1)
+    liked = serializers.BooleanField()
+
+
+class ProductLikesSyncSerializer(serializers.Serializer):
+    likes = LikeStateSerializer(many=True, allow_empty=False, max_length=LIKES_SYNC_MAX)
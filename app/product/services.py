@@ -1,22 +1,95 @@
 from datetime import datetime, timedelta
 from rest_framework.pagination import LimitOffsetPagination
-from django.db.models import Q, Exists, OuterRef, Prefetch, Case, When, Value, BooleanField
+from django.db import connection
+from django.db.models import Q, F, Prefetch, Case, When, Value, BooleanField
+
+from product.models import Product, Booking, Image, Category, Comment, Like, Type, Convenience
+from helpers.constants import (
+    ROOM_LIMIT, BED_LIMIT, BATH_LIMIT, BEDROOM_LIMIT, CARD_IMAGES_LIMIT, PRODUCT_COMMENTS_LIMIT
+)
+from helpers.pagination import KeysetPagination
+from helpers.uploads import UploadError, create_upload, complete_upload
+from product.shuffle import SeededShuffle
+from product.availability import get_window, get_available_filter, get_default_booking_window
+from product.search import get_search_filter, annotate_search_rank
+from product.geo import get_bounding_box, get_near, get_bounding_box_filter, get_radius_filter, annotate_distance
+from product.counters import increment_like_count
+from product.favorites import favorite_changed
+from product.holds import get_held_product_ids
+
+PRODUCT_ORDERING = ('-created_at', '-id')
+FAVORITE_ORDERING = ('-liked_at', '-id')
+BOOKING_ORDERING = ('start_date', 'id')
+PRODUCT_CARD_FIELDS = (
+    'id', 'name', 'price_per_night', 'city', 'address', 'rating', 'like_count', 'best_product', 'promotion',
+    'is_active', 'latitude', 'longitude', 'created_at',
+    'owner__id', 'owner__email', 'owner__first_name', 'owner__last_name', 'owner__middle_name',
+    'owner__phone_number', 'owner__avatar',
+)
+CARD_IMAGE_FIELDS = ('id', 'product_id', 'original', 'thumbnail', 'width', 'height', 'mimetype', 'is_label', 'status')
+
+# Raw statements skip the Like signals, like_changed() runs their side effects instead.
+LIKE_TOGGLE_SQL = f'''
+    WITH deleted AS (
+        DELETE FROM {Like._meta.db_table} WHERE user_id = %(user_id)s AND product_id = %(product_id)s RETURNING id
+    ), inserted AS (
+        INSERT INTO {Like._meta.db_table} (user_id, product_id, count, created_at, updated_at)
+        SELECT %(user_id)s, %(product_id)s, 1, now(), now() WHERE NOT EXISTS (SELECT 1 FROM deleted)
+        ON CONFLICT (user_id, product_id) DO NOTHING
+        RETURNING id
+    )
+    SELECT EXISTS (SELECT 1 FROM inserted), EXISTS (SELECT 1 FROM deleted)
+'''
+LIKE_SYNC_SQL = f'''
+    WITH deleted AS (
+        DELETE FROM {Like._meta.db_table}
+        WHERE user_id = %(user_id)s AND product_id = ANY(%(unliked)s::bigint[])
+        RETURNING product_id
+    ), inserted AS (
+        INSERT INTO {Like._meta.db_table} (user_id, product_id, count, created_at, updated_at)
+        SELECT %(user_id)s, id, 1, now(), now() FROM {Product._meta.db_table} WHERE id = ANY(%(liked)s::bigint[])
+        ON CONFLICT (user_id, product_id) DO NOTHING
+        RETURNING product_id
+    )
+    SELECT product_id, false FROM deleted UNION ALL SELECT product_id, true FROM inserted
+'''
 
-from product.models import Product, Booking, Image, Category, Comment, Favorites, Type, Convenience
-from helpers.serializers import UserSerializer, ImageSerializer as ProductImageSerializer
-from helpers.constants import ROOM_LIMIT, BED_LIMIT, BATH_LIMIT, BEDROOM_LIMIT
 
+def like_changed(user_id, product_id, liked) -> None:
+    increment_like_count(product_id, 1 if liked else -1)
+    favorite_changed(user_id, product_id, added=liked)
 
-def like_or_dislike(obj, user) -> dict:
-    likes = user.likes.filter(product=obj)
-    if likes:
-        likes.first().delete()
-        message = {'message': 'Product like removed.'}
-    else:
-        obj.like.create(user=user)
-        message = {'message': 'Product liked.'}
 
-    return message
+def like_or_dislike(product_id, user) -> dict:
+    """Deletes the like or inserts it when there was none, in one statement."""
+    with connection.cursor() as cursor:
+        cursor.execute(LIKE_TOGGLE_SQL, {'user_id': user.id, 'product_id': product_id})
+        liked, removed = cursor.fetchone()
+
+    if liked or removed:
+        like_changed(user.id, product_id, liked)
+    if removed:
+        return {'message': 'Product like removed.'}
+    return {'message': 'Product liked.'}
+
+
+def sync_likes(user, likes) -> dict:
+    """Applies the final liked state of every product, the last entry for a product wins."""
+    states = {item['product']: item['liked'] for item in likes}
+    with connection.cursor() as cursor:
+        cursor.execute(LIKE_SYNC_SQL, {
+            'user_id': user.id,
+            'liked': [product_id for product_id, liked in states.items() if liked],
+            'unliked': [product_id for product_id, liked in states.items() if not liked],
+        })
+        rows = cursor.fetchall()
+
+    for product_id, liked in rows:
+        like_changed(user.id, product_id, liked)
+    return {
+        'liked': sorted(product_id for product_id, liked in rows if liked),
+        'removed': sorted(product_id for product_id, liked in rows if not liked),
+    }
 
 
 def save_image(product, data) -> tuple:
@@ -29,22 +102,46 @@ def save_image(product, data) -> tuple:
         ):
             return False, {'uploaded_files': 'Неверный формат файла'}
 
-    for file in uploaded_files:
-        Image.objects.create(product=product, original=file, thumbnail=file)
-
-    return True, {'message': 'Images saved success'}
-
-
-def get_product_by_id_user_id(product_id, user_id=None):
-    product = Product.with_related
-    if user_id:
-        product = product.annotate(
-            is_favorite=Exists(
-                Favorites.objects.filter(user_id=user_id, product_id=product_id)
-            )
-        )
-
-    return product.annotate(
+    images = [Image.objects.create(product=product, original=file) for file in uploaded_files]
+
+    return True, {
+        'message': 'Images saved success',
+        'images': [{'id': image.id, 'status': image.status} for image in images],
+    }
+
+
+def create_image_uploads(product, user, files) -> list:
+    return [create_upload('image', user.id, product.id, file['content_type']) for file in files]
+
+
+def complete_image_uploads(product, user, tokens) -> tuple:
+    """Registers the uploaded objects as pending images, the processing is queued by the image signal."""
+    images, errors = [], {}
+    for token in tokens:
+        try:
+            session = complete_upload('image', user.id, product.id, token)
+        except UploadError as e:
+            errors[token] = str(e)
+            continue
+        images.append(Image.objects.create(product=product, original=session['key']))
+
+    return [{'id': image.id, 'status': image.status} for image in images], errors
+
+
+def get_product_detail(product_id):
+    """
+    Detail with a fixed plan: bookings of the default window and the latest active comments are limited in
+    the prefetch queries, whatever the product history is.
+    """
+    start_date, end_date = get_default_booking_window()
+    bookings = Booking.objects.filter(get_booking_window_filter(start_date, end_date)).order_by(*BOOKING_ORDERING)
+    comments = Comment.objects.select_related('user').prefetch_related(None).filter(is_active=True).order_by('-id')
+    return Product.objects.select_related('owner', 'type').prefetch_related(
+        'convenience',
+        Prefetch('images', queryset=Image.objects.ready().with_derivatives()),
+        Prefetch('booking', queryset=bookings, to_attr='window_bookings'),
+        Prefetch('product_comments', queryset=comments[:PRODUCT_COMMENTS_LIMIT], to_attr='recent_comments'),
+    ).annotate(
         is_new=Case(
             When(created_at__gte=datetime.now() - timedelta(days=7), then=Value(True)),
             default=Value(False),
@@ -53,34 +150,35 @@ def get_product_by_id_user_id(product_id, user_id=None):
     ).get(pk=product_id)
 
 
-def get_product_queryset(q, user_id):
-    queryset = Product.active_related.filter(q)
-    if user_id:
-        queryset = queryset.annotate(
-            is_favorite=Exists(
-                Favorites.objects.filter(user_id=user_id, product_id=OuterRef('id'))
-            )
-        )
-
-    return queryset.annotate(
+def get_product_queryset(q, seed, search=None, near=None):
+    queryset = Product.active_related.filter(q).annotate(
         is_new=Case(
             When(created_at__gte=datetime.now() - timedelta(days=7), then=Value(True)),
             default=Value(False),
             output_field=BooleanField(),
         ),
-    ).order_by('?')
+    )
+    if near:
+        return annotate_distance(queryset, *near[:2])
+    if search:
+        return annotate_search_rank(queryset, search)
+
+    return SeededShuffle(queryset, seed)
 
 
-def paginate_queryset(queryset, request):
-    offset = request.GET.get('offset', None)
-    paginator = LimitOffsetPagination()
-    paginator.page_size = offset if offset else 25
+def paginate_queryset(queryset, request, ordering=None):
+    if 'offset' in request.GET and 'cursor' not in request.GET:
+        paginator = LimitOffsetPagination()
+        if ordering:
+            queryset = queryset.order_by(*ordering)
+    else:
+        paginator = KeysetPagination(ordering)
 
     return paginator, paginator.paginate_queryset(queryset, request)
 
 
 def get_user_products(user):
-    return user.products.prefetch_related('owner', 'images').annotate(
+    return Product.objects.filter(owner_id=user.pk).prefetch_related('owner', 'images__derivatives').annotate(
         is_new=Case(
             When(created_at__gte=datetime.now() - timedelta(days=7), then=Value(True)),
             default=Value(False),
@@ -90,66 +188,68 @@ def get_user_products(user):
 
 
 def get_favorite_products(user):
-    return Product.active_related.prefetch_related(
-        Prefetch('favorites', queryset=Favorites.objects.filter(user=user)),
-        'owner',
-        'images'
+    """
+    Only the card fields of the liked products, with at most ``CARD_IMAGES_LIMIT`` images each, label first.
+    ``liked_at`` is read from the like the filter joins, for ``FAVORITE_ORDERING``.
+    """
+    images = Image.objects.ready().with_derivatives().only(*CARD_IMAGE_FIELDS).order_by('-is_label', 'id')
+    return Product.objects.filter(is_active=True, like__user_id=user.pk).select_related('owner').only(
+        *PRODUCT_CARD_FIELDS
+    ).prefetch_related(
+        Prefetch('images', queryset=images[:CARD_IMAGES_LIMIT], to_attr='card_images'),
     ).annotate(
+        liked_at=F('like__created_at'),
+        is_favorite=Value(True, output_field=BooleanField()),
         is_new=Case(
             When(created_at__gte=datetime.now() - timedelta(days=7), then=Value(True)),
             default=Value(False),
             output_field=BooleanField(),
-        )
-    ).filter(favorites__user=user)
-
-
-def get_favorite_products_data(products):
-    return [
-        {
-            'id': product.id,
-            'name': product.name,
-            'price_per_night': product.price_per_night,
-            'owner': UserSerializer(product.owner).data,
-            'city': product.city,
-            'address': product.address,
-            'images': product.images,
-            'is_favorite': True,
-            'rating': product.rating,
-            'like_count': product.like_count,
-            'is_new': product.is_new,
-            'best_product': product.best_product,
-        }
-        for product in products
-    ]
+        ),
+    )
 
 
-def get_product_bookings(product, request=None):
-    start_date_param = request.GET.get('start_date', None) if request else None
-    end_date_param = request.GET.get('end_date', None) if request else None
+def get_booking_window_filter(start_date, end_date) -> Q:
+    return Q(start_date__lte=end_date) & Q(end_date__gte=start_date)
 
-    current_date = datetime.now()
-    last_day_of_month = current_date.replace(day=1, month=current_date.month + 2) - timedelta(days=1)
 
-    start_date_param = datetime.now() if start_date_param is None else start_date_param
-    end_date_param = last_day_of_month if end_date_param is None else end_date_param
-
-    start_date = start_date_param
-    end_date = end_date_param
+def get_product_bookings(product, request=None):
+    start_date, end_date = get_default_booking_window()
+    if request:
+        start_date = request.GET.get('start_date', None) or start_date
+        end_date = request.GET.get('end_date', None) or end_date
 
-    return product.booking.filter(
-        Q(start_date__range=(start_date, end_date)) |
-        Q(end_date__range=(start_date, end_date)) |
-        (Q(start_date__lte=end_date) & Q(end_date__gte=start_date))
-    )
+    return product.booking.filter(get_booking_window_filter(start_date, end_date))
 
 
 def sort_products_images(images):
     return sorted(images, key=lambda x: not x['is_label'])
 
 
-def get_query_filter(request):
+def get_sort_near(request):
+    return get_near(request.GET) if request.GET.get('sort') == 'distance' else None
+
+
+def get_request_window(request):
     start_date = request.GET.get('start_date', None)
     end_date = request.GET.get('end_date', None)
+    return get_window(start_date, end_date) if start_date is not None and end_date is not None else None
+
+
+def exclude_held(products, request) -> list:
+    """
+    Live holds are read per request on top of the cached page, so placing or releasing one invalidates nothing
+    and an expired hold shows its product again right away. A page can come out shorter than the limit.
+    """
+    window = get_request_window(request)
+    if window is None:
+        return products
+    held_product_ids = get_held_product_ids(*window)
+    if not held_product_ids:
+        return products
+    return [product for product in products if product['id'] not in held_product_ids]
+
+
+def get_query_filter(request):
     guest_count = request.GET.get('guest_count', 1)
     guests_with_pets = request.GET.get('guests_with_pets', False)
     guests_with_babies = request.GET.get('guests_with_babies', False)
@@ -162,11 +262,19 @@ def get_query_filter(request):
     category = request.GET.get('category', None)
     house_type = request.GET.get('house_type', None)
     house_name = request.GET.get('house_name', None)
+    bounding_box = get_bounding_box(request.GET)
+    near = get_near(request.GET)
 
     q = Q()
 
-    if house_name is not None:
-        q &= Q(name__icontains=house_name)
+    if bounding_box is not None:
+        q &= get_bounding_box_filter(*bounding_box)
+
+    if near is not None:
+        q &= get_radius_filter(*near)
+
+    if house_name:
+        q &= get_search_filter(house_name)
 
     if min_price is not None:
         q &= Q(price_per_night__gte=min_price)
@@ -174,8 +282,9 @@ def get_query_filter(request):
     if max_price is not None:
         q &= Q(price_per_night__lte=max_price)
 
-    if start_date is not None and end_date is not None:
-        q &= ~Q(booking__end_date__range=(start_date, end_date))
+    window = get_request_window(request)
+    if window is not None:
+        q &= get_available_filter(*window)
 
     if guest_count is not None:
         q &= Q(guest_qty__gte=guest_count)
@@ -0,0 +1,90 @@
+import hashlib
+from datetime import date
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import IntegerField
+from django.db.models.expressions import RawSQL
+
+from helpers.constants import SHUFFLE_RANK_MAX
+
+SHUFFLE_GENERATION_KEY = 'product_shuffle:generation'
+
+
+def get_shuffle_seed(request) -> str:
+    seed = request.GET.get('shuffle_seed', None)
+    return seed if seed else date.today().isoformat()
+
+
+def get_shuffle_pivot(seed) -> int:
+    digest = hashlib.sha1(str(seed).encode()).hexdigest()
+    return int(digest[:8], 16) % SHUFFLE_RANK_MAX
+
+
+def get_shuffle_generation() -> int:
+    return cache.get(SHUFFLE_GENERATION_KEY, 0)
+
+
+def refresh_shuffle_ranks(queryset) -> int:
+    """
+    The update sends no signals, the listing cache is invalidated here. The generation moves with it,
+    a cursor holding a rank of the old order is not read against the new one.
+    """
+    from product.cache import bump_version, invalidate_listing
+
+    rank = RawSQL('floor(random() * %s)', (SHUFFLE_RANK_MAX,), output_field=IntegerField())
+    with transaction.atomic():
+        updated = queryset.update(shuffle_rank=rank)
+        transaction.on_commit(lambda: bump_version(SHUFFLE_GENERATION_KEY))
+        invalidate_listing()
+    return updated
+
+
+class SeededShuffle:
+    """
+    Stable random order of a product queryset.
+
+    The seed picks a pivot on the ``shuffle_rank`` axis, products are read from the pivot up and then wrap
+    around from the beginning. Both segments are index range scans on ``(shuffle_rank, id)``, so paging
+    through the same seed never overlaps or skips items. The ranks are redrawn nightly, ``generation`` tells
+    the orders apart.
+    """
+    ordering = ('shuffle_rank', 'id')
+
+    def __init__(self, queryset, seed):
+        self.seed = seed
+        self.generation = get_shuffle_generation()
+        self.pivot = get_shuffle_pivot(seed)
+        self.segments = (
+            queryset.filter(shuffle_rank__gte=self.pivot).order_by(*self.ordering),
+            queryset.filter(shuffle_rank__lt=self.pivot).order_by(*self.ordering),
+        )
+        self._head_count = None
+
+    def head_count(self) -> int:
+        if self._head_count is None:
+            self._head_count = self.segments[0].count()
+        return self._head_count
+
+    def count(self) -> int:
+        return self.head_count() + self.segments[1].count()
+
+    def __getitem__(self, item):
+        if not isinstance(item, slice):
+            result = self[item:item + 1]
+            if not result:
+                raise IndexError('Shuffle index out of range')
+            return result[0]
+
+        start = item.start or 0
+        stop = item.stop if item.stop is not None else self.count()
+        head, tail = self.segments
+        head_count = self.head_count()
+
+        result = []
+        if start < head_count:
+            result += list(head[start:min(stop, head_count)])
+        if stop > head_count:
+            result += list(tail[max(start - head_count, 0):stop - head_count])
+
+        return result
@@ -2,21 +2,95 @@ from helpers.logger import log_exception
 from django.db.models import F
 
 
+def listing_changed(sender, **kwargs):
+    from product.cache import invalidate_listing
+
+    try:
+        invalidate_listing()
+    except Exception as e:
+        log_exception(e, f'Product listing cache error {str(e)}')
+
+
+def product_changed(sender, instance, **kwargs):
+    from product.cache import invalidate_product
+
+    try:
+        product_ids = {instance.product_id if hasattr(instance, 'product_id') else instance.pk}
+        loaded = getattr(instance, '_loaded_occupancy', None)
+        if loaded is not None and loaded[0] is not None:
+            product_ids.add(loaded[0])
+        for product_id in product_ids:
+            invalidate_product(product_id)
+    except Exception as e:
+        log_exception(e, f'Product detail cache error {str(e)}')
+
+
+def product_m2m_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    from product.cache import invalidate_product
+
+    try:
+        if action.startswith('post_'):
+            for product_id in (pk_set or ()) if reverse else (instance.pk,):
+                invalidate_product(product_id)
+    except Exception as e:
+        log_exception(e, f'Product detail cache error {str(e)}')
+
+
+def product_saved(sender, instance, update_fields=None, **kwargs):
+    from product.search import SEARCH_FIELDS, update_search_vector
+
+    if update_fields and not set(update_fields) & set(SEARCH_FIELDS):
+        return
+
+    try:
+        update_search_vector(sender.objects.filter(pk=instance.pk))
+    except Exception as e:
+        log_exception(e, f'Product search vector error {str(e)}')
+
+
 def product_like(sender, instance, created, **kwargs):
+    from product.services import like_changed
+
     try:
         if created:
-            instance.product.like_count = instance.product.like_count + 1
-            instance.product.save()
-            instance.favorites.create(user=instance.user, product=instance.product)
+            like_changed(instance.user_id, instance.product_id, liked=True)
     except Exception as e:
         log_exception(e, f'Product like error {str(e)}')
 
 
 def product_dislike(sender, instance, **kwargs):
+    from product.services import like_changed
+
     try:
-        if instance:
-            instance.product.like_count = instance.product.like_count - 1
-            instance.product.save()
-            instance.favorites.filter(user=instance.user, product=instance.product).delete()
+        like_changed(instance.user_id, instance.product_id, liked=False)
     except Exception as e:
         log_exception(e, f'Remove like error {str(e)}')
+
+
+def booking_saved(sender, instance, created, **kwargs):
+    from product.availability import rebuild_booking_occupancy
+
+    try:
+        rebuild_booking_occupancy(instance, getattr(instance, '_loaded_occupancy', None))
+        instance._loaded_occupancy = (instance.product_id, instance.start_date, instance.end_date)
+    except Exception as e:
+        log_exception(e, f'Booking occupancy error {str(e)}')
+
+
+def booking_deleted(sender, instance, **kwargs):
+    from product.availability import rebuild_booking_occupancy
+
+    try:
+        rebuild_booking_occupancy(instance)
+    except Exception as e:
+        log_exception(e, f'Booking occupancy error {str(e)}')
+
+
+def image_uploaded(sender, instance, created, **kwargs):
+    from product.images import enqueue_image
+
+    try:
+        if created:
+            enqueue_image(instance.pk)
+    except Exception as e:
+        log_exception(e, f'Image processing enqueue error {str(e)}')
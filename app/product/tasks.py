@@ -7,6 +7,14 @@ from django.contrib.sites.shortcuts import get_current_site
 from django.core.mail import send_mail
 import mimetypes
 
+from product.models import Product
+from product.shuffle import refresh_shuffle_ranks
+from product.counters import flush_like_counts
+from product.images import CorruptImage, process_image, fail_image
+from helpers.constants import IMAGE_PROCESS_MAX_RETRIES, IMAGE_PROCESS_RETRY_DELAY
+from helpers.logger import log_exception
+from helpers.storage import flush_deletes, reconcile_orphans
+
 
 @app.task
 def send_email_message(subject: str, message: str, email_from: str, email_to: list):
@@ -17,3 +25,37 @@ def send_email_message(subject: str, message: str, email_from: str, email_to: li
         email_to,
         fail_silently=False,
     )
+
+
+@app.task
+def refresh_products_shuffle_rank():
+    refresh_shuffle_ranks(Product.objects.all())
+
+
+@app.task
+def flush_products_like_count():
+    flush_like_counts()
+
+
+@app.task(bind=True, max_retries=IMAGE_PROCESS_MAX_RETRIES)
+def process_product_image(self, image_id):
+    try:
+        process_image(image_id)
+    except CorruptImage as e:
+        fail_image(image_id, f'Corrupt image: {str(e)}')
+    except Exception as e:
+        if self.request.retries >= self.max_retries:
+            log_exception(e, f'Image processing failed {str(e)}')
+            fail_image(image_id, str(e))
+            return
+        raise self.retry(exc=e, countdown=IMAGE_PROCESS_RETRY_DELAY * 2 ** self.request.retries)
+
+
+@app.task
+def flush_storage_deletes():
+    flush_deletes()
+
+
+@app.task
+def reconcile_storage_orphans():
+    reconcile_orphans()
@@ -0,0 +1,64 @@
+from datetime import date
+from importlib import import_module
+
+import pytest
+from django.db import connection
+
+from product.availability import get_available_filter, get_month_masks, rebuild_occupancy
+from product.models import Booking, Occupancy, Product
+
+backfill = import_module('product.migrations.0031_backfill_occupancy')
+
+
+def book(product, start_date, end_date):
+    # bulk_create sends no signals, the occupancy is left to the test.
+    return Booking.objects.bulk_create([Booking(product=product, start_date=start_date, end_date=end_date)])[0]
+
+
+def get_occupancy(products):
+    return set(Occupancy.objects.filter(product__in=products).values_list('product_id', 'month', 'days'))
+
+
+@pytest.fixture
+def products(redis, make_product):
+    return [make_product(), make_product()]
+
+
+def test_month_masks_split_at_month_ends():
+    assert get_month_masks(date(2026, 1, 30), date(2026, 2, 2)) == {
+        date(2026, 1, 1): 0b11 << 29,
+        date(2026, 2, 1): 0b1,
+    }
+    assert get_month_masks(date(2026, 3, 5), date(2026, 3, 5)) == {date(2026, 3, 1): 1 << 4}
+
+
+@pytest.mark.django_db
+def test_backfill_matches_the_rebuild(products):
+    first, second = products
+    book(first, date(2026, 1, 30), date(2026, 2, 2))
+    book(first, date(2026, 1, 10), date(2026, 1, 12))
+    book(first, date(2026, 3, 5), date(2026, 3, 5))
+    book(second, date(2026, 2, 27), date(2026, 4, 1))
+    for product in products:
+        rebuild_occupancy(product.pk)
+    rebuilt = get_occupancy(products)
+    Occupancy.objects.filter(product__in=products).delete()
+
+    with connection.cursor() as cursor:
+        cursor.execute(backfill.Migration.operations[0].sql)
+
+    assert get_occupancy(products) == rebuilt
+    assert len(rebuilt) == 5
+
+
+@pytest.mark.django_db
+def test_backfilled_products_are_not_available(products):
+    first, second = products
+    book(first, date(2026, 5, 10), date(2026, 5, 15))
+    with connection.cursor() as cursor:
+        cursor.execute(backfill.Migration.operations[0].sql)
+
+    available = Product.objects.filter(pk__in=[first.pk, second.pk]).filter(
+        get_available_filter(date(2026, 5, 12), date(2026, 5, 14))
+    )
+    assert list(available) == [second]
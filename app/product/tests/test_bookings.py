@@ -0,0 +1,57 @@
+from datetime import date
+
+import pytest
+from django.db import IntegrityError, transaction
+
+from product.bookings import BookingConflict, is_overlap_error, reserve_bookings
+from product.models import Booking
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def product(redis, make_product):
+    return make_product()
+
+
+def book(product, start_date, end_date):
+    return Booking.objects.create(product=product, start_date=start_date, end_date=end_date)
+
+
+def test_overlapping_booking_is_rejected(product):
+    book(product, date(2026, 5, 1), date(2026, 5, 5))
+
+    with pytest.raises(IntegrityError) as error, transaction.atomic():
+        book(product, date(2026, 5, 4), date(2026, 5, 8))
+
+    assert is_overlap_error(error.value)
+
+
+def test_checkout_day_can_be_booked_again(product, make_product):
+    book(product, date(2026, 5, 1), date(2026, 5, 5))
+
+    book(product, date(2026, 5, 5), date(2026, 5, 8))
+    book(make_product(), date(2026, 5, 1), date(2026, 5, 5))
+
+    assert Booking.objects.filter(product=product).count() == 2
+
+
+def test_same_day_booking_holds_its_first_night(product):
+    book(product, date(2026, 5, 3), date(2026, 5, 3))
+
+    with pytest.raises(IntegrityError), transaction.atomic():
+        book(product, date(2026, 5, 1), date(2026, 5, 4))
+
+
+def test_reserve_rejects_the_whole_batch(product, make_product):
+    other = make_product()
+    existing = book(product, date(2026, 5, 1), date(2026, 5, 5))
+
+    with pytest.raises(BookingConflict) as error:
+        reserve_bookings([
+            {'product': other, 'start_date': date(2026, 5, 1), 'end_date': date(2026, 5, 5)},
+            {'product': product, 'start_date': date(2026, 5, 4), 'end_date': date(2026, 5, 6)},
+        ])
+
+    assert [conflict['id'] for conflict in error.value.conflicts] == [existing.pk]
+    assert not Booking.objects.filter(product=other).exists()
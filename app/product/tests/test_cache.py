@@ -0,0 +1,74 @@
+import pytest
+from django.core.cache import cache
+from django.test import Client
+
+from product.cache import (
+    LISTING_VERSION_KEY, bump_version, get_versioned, invalidate_listing, set_versioned,
+)
+from product.models import Product
+
+
+@pytest.fixture
+def client(redis, settings):
+    settings.ALLOWED_HOSTS = ['testserver']
+    return Client()
+
+
+def test_entry_of_the_current_version_is_a_hit(redis):
+    version, data = get_versioned('page')
+    assert data is None
+
+    set_versioned('page', version, {'results': []})
+
+    assert get_versioned('page') == (version, {'results': []})
+
+
+def test_bumped_version_turns_entries_into_misses(redis):
+    cache.set(LISTING_VERSION_KEY, 3, timeout=None)
+    set_versioned('page', 3, {'results': []})
+
+    bump_version(LISTING_VERSION_KEY)
+
+    assert get_versioned('page') == (4, None)
+
+
+def test_lost_version_restarts_from_the_clock(redis):
+    cache.set(LISTING_VERSION_KEY, 3, timeout=None)
+    set_versioned('page', 3, {'results': []})
+    cache.delete(LISTING_VERSION_KEY)
+
+    bump_version(LISTING_VERSION_KEY)
+
+    version, data = get_versioned('page')
+    assert version > 3 and data is None
+
+
+@pytest.mark.django_db
+def test_invalidation_waits_for_the_commit(redis, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks() as callbacks:
+        invalidate_listing()
+    assert cache.get(LISTING_VERSION_KEY) is None
+
+    for callback in callbacks:
+        callback()
+    assert cache.get(LISTING_VERSION_KEY) is not None
+
+
+@pytest.mark.django_db
+def test_listing_is_served_from_the_cache_until_a_product_changes(
+        client, make_product, django_capture_on_commit_callbacks):
+    product = make_product(name='Before')
+
+    def get_name():
+        results = client.get('/api/v1/products/get', {'limit': 100}).json()['results']
+        return next(item['name'] for item in results if item['id'] == product.pk)
+
+    assert get_name() == 'Before'
+    # update sends no signals, the cached page stays.
+    Product.objects.filter(pk=product.pk).update(name='Unseen')
+    assert get_name() == 'Before'
+
+    with django_capture_on_commit_callbacks(execute=True):
+        product.name = 'After'
+        product.save()
+    assert get_name() == 'After'
@@ -0,0 +1,62 @@
+import random
+from io import BytesIO
+
+import pytest
+from PIL import Image as PILImage, ImageFilter
+
+from helpers.constants import IMAGE_QUALITY_MIN, IMAGE_QUALITY_MAX
+from product.encoding import WEBP, encode_to_target, ssim
+
+
+def make_noise(size=(96, 64), seed=1):
+    generator = random.Random(seed)
+    im = PILImage.new('RGB', size)
+    im.putdata([tuple(generator.randrange(256) for _ in range(3)) for _ in range(size[0] * size[1])])
+    return im
+
+
+def test_ssim_of_identical_images():
+    im = make_noise()
+    assert ssim(im, im.copy()) == pytest.approx(1.0)
+
+
+def test_ssim_drops_with_distortion():
+    im = make_noise()
+    slightly = im.filter(ImageFilter.GaussianBlur(0.5))
+    heavily = im.filter(ImageFilter.GaussianBlur(3))
+
+    assert -1.0 <= ssim(im, heavily) < ssim(im, slightly) < 1.0
+
+
+def test_ssim_of_images_smaller_than_a_window():
+    im = make_noise(size=(4, 3))
+    assert ssim(im, im.copy()) == pytest.approx(1.0)
+
+
+def test_encode_to_target_stays_within_the_quality_bounds():
+    result = encode_to_target(make_noise(), WEBP, 60)
+
+    assert IMAGE_QUALITY_MIN <= result['quality'] <= IMAGE_QUALITY_MAX
+    assert result['ssim'] >= 0.985 or result['quality'] == IMAGE_QUALITY_MAX
+    assert result['probes'] <= 8
+    assert PILImage.open(BytesIO(result['content'])).format == 'WEBP'
+
+
+def test_encode_to_target_goes_down_to_the_minimum_for_flat_images():
+    result = encode_to_target(PILImage.new('RGB', (96, 64), (120, 80, 40)), WEBP, 60)
+
+    assert result['quality'] == IMAGE_QUALITY_MIN
+
+
+def test_encode_to_target_falls_back_to_the_maximum():
+    result = encode_to_target(make_noise(), WEBP, 60, target=1.01)
+
+    assert result['quality'] == IMAGE_QUALITY_MAX
+
+
+@pytest.mark.parametrize('baseline', [0, 100])
+def test_encode_to_target_clamps_the_baseline(baseline):
+    result = encode_to_target(make_noise(), WEBP, baseline)
+
+    assert IMAGE_QUALITY_MIN <= result['quality'] <= IMAGE_QUALITY_MAX
+    assert result['baseline_size'] > 0
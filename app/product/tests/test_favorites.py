@@ -0,0 +1,35 @@
+from urllib.parse import urlparse, parse_qs
+
+import pytest
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from product.models import Like
+from product.services import FAVORITE_ORDERING, get_favorite_products, paginate_queryset
+
+factory = APIRequestFactory()
+
+
+def get_pages(user, limit):
+    pages, params = [], {'limit': limit}
+    while True:
+        paginator, page = paginate_queryset(
+            get_favorite_products(user), Request(factory.get('/favorites', params)), FAVORITE_ORDERING
+        )
+        pages.append([product.pk for product in page])
+        link = paginator.get_next_link()
+        if link is None:
+            return pages
+        params = {**params, 'cursor': parse_qs(urlparse(link).query)['cursor'][0]}
+
+
+@pytest.mark.django_db
+def test_favorites_are_ordered_by_the_like(redis, owner, make_product):
+    older, newer, tied = make_product(), make_product(), make_product()
+    for product in (newer, older, tied):
+        Like.objects.create(user=owner, product=product)
+    Like.objects.filter(product=tied).update(created_at=Like.objects.get(product=older).created_at)
+
+    # The product liked last comes first whatever its own age, equal like times fall back to the product id.
+    assert get_pages(owner, limit=1) == [[tied.pk], [older.pk], [newer.pk]]
+    assert get_pages(owner, limit=10) == [[tied.pk, older.pk, newer.pk]]
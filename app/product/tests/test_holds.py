@@ -0,0 +1,72 @@
+import time
+from datetime import date
+
+import pytest
+
+from helpers.constants import HOLD_TTL
+from product import holds
+from product.bookings import BookingConflict
+from product.holds import HoldConflict, confirm_hold, get_hold, get_held_product_ids, place_hold, release_hold
+from product.models import Booking
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def product(redis, make_product):
+    return make_product()
+
+
+def test_overlapping_hold_is_rejected(product, owner):
+    place_hold(product.pk, owner.pk, date(2026, 5, 1), date(2026, 5, 5))
+
+    with pytest.raises(HoldConflict) as error:
+        place_hold(product.pk, owner.pk, date(2026, 5, 4), date(2026, 5, 8))
+
+    assert error.value.conflicts == [
+        {'product': product.pk, 'start_date': date(2026, 5, 1), 'end_date': date(2026, 5, 5)},
+    ]
+
+
+def test_adjacent_hold_is_placed(product, owner):
+    place_hold(product.pk, owner.pk, date(2026, 5, 1), date(2026, 5, 5))
+    place_hold(product.pk, owner.pk, date(2026, 5, 5), date(2026, 5, 8))
+
+    assert get_held_product_ids(date(2026, 5, 4), date(2026, 5, 6)) == {product.pk}
+    assert get_held_product_ids(date(2026, 5, 8), date(2026, 5, 9)) == set()
+
+
+def test_released_hold_frees_the_dates(product, owner):
+    hold = get_hold(place_hold(product.pk, owner.pk, date(2026, 5, 1), date(2026, 5, 5))['token'])
+
+    release_hold(hold)
+
+    assert get_hold(hold['token']) is None
+    place_hold(product.pk, owner.pk, date(2026, 5, 1), date(2026, 5, 5))
+
+
+def test_expired_hold_frees_the_dates(product, owner, monkeypatch):
+    place_hold(product.pk, owner.pk, date(2026, 5, 1), date(2026, 5, 5))
+    now = time.time() + HOLD_TTL + 1
+    monkeypatch.setattr(holds.time, 'time', lambda: now)
+
+    assert get_held_product_ids(date(2026, 5, 1), date(2026, 5, 5)) == set()
+    place_hold(product.pk, owner.pk, date(2026, 5, 1), date(2026, 5, 5))
+
+
+def test_booked_dates_cannot_be_held(product, owner):
+    Booking.objects.create(product=product, start_date=date(2026, 5, 1), end_date=date(2026, 5, 5))
+
+    with pytest.raises(BookingConflict):
+        place_hold(product.pk, owner.pk, date(2026, 5, 3), date(2026, 5, 4))
+
+
+def test_confirmed_hold_is_released_on_commit(product, owner, django_capture_on_commit_callbacks):
+    hold = get_hold(place_hold(product.pk, owner.pk, date(2026, 5, 1), date(2026, 5, 5))['token'])
+
+    with django_capture_on_commit_callbacks(execute=True):
+        booking = confirm_hold(hold, user_name='Guest')
+
+    assert (booking.start_date, booking.end_date) == (date(2026, 5, 1), date(2026, 5, 5))
+    assert get_hold(hold['token']) is None
+    assert get_held_product_ids(date(2026, 5, 1), date(2026, 5, 5)) == set()
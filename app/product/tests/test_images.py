@@ -0,0 +1,14 @@
+import pytest
+
+from product.images import get_derivative_size
+
+
+@pytest.mark.parametrize('source_size, width, expected', [
+    ((4000, 3000), 1280, (1280, 960)),
+    ((3000, 4000), 640, (640, 853)),
+    ((1280, 720), 1280, (1280, 720)),
+    ((800, 600), 1280, (800, 600)),
+    ((5000, 1), 320, (320, 1)),
+])
+def test_get_derivative_size(source_size, width, expected):
+    assert get_derivative_size(source_size, width) == expected
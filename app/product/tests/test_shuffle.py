@@ -0,0 +1,70 @@
+from urllib.parse import urlparse, parse_qs
+
+import pytest
+from django.core.cache import cache
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from helpers.pagination import KeysetPagination
+from product.cache import LISTING_VERSION_KEY
+from product.models import Product
+from product.shuffle import SeededShuffle, get_shuffle_generation, refresh_shuffle_ranks
+
+factory = APIRequestFactory()
+
+
+def paginate(queryset, params):
+    paginator = KeysetPagination()
+    page = paginator.paginate_queryset(queryset, Request(factory.get('/products', params)))
+    return paginator, [product.pk for product in page]
+
+
+def get_cursor(link):
+    return parse_qs(urlparse(link).query)['cursor'][0]
+
+
+@pytest.fixture
+def products(redis, owner, make_product):
+    for rank in (10, 200, 3000, 40000, 500000, 6000000):
+        make_product(shuffle_rank=rank)
+    return Product.objects.filter(owner=owner)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('seed', ['2026-01-01', '2026-01-02', 'custom'])
+def test_seeded_shuffle_pages_cover_every_product_once(products, seed):
+    seen, params = [], {'limit': 4}
+    while True:
+        paginator, page = paginate(SeededShuffle(products, seed), params)
+        seen += page
+        link = paginator.get_next_link()
+        if link is None:
+            break
+        params = {**params, 'cursor': get_cursor(link)}
+
+    assert sorted(seen) == sorted(products.values_list('pk', flat=True))
+    assert seen == [product.pk for product in SeededShuffle(products, seed)[0:6]]
+
+
+@pytest.mark.django_db
+def test_refresh_invalidates_the_listing(products, django_capture_on_commit_callbacks):
+    cache.set(LISTING_VERSION_KEY, 5, timeout=None)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        assert refresh_shuffle_ranks(products) == 6
+
+    assert cache.get(LISTING_VERSION_KEY) == 6
+    assert get_shuffle_generation() != 0
+
+
+@pytest.mark.django_db
+def test_cursor_of_the_previous_ranks_starts_over(products, django_capture_on_commit_callbacks):
+    paginator, first = paginate(SeededShuffle(products, 'seed'), {'limit': 2})
+    cursor = get_cursor(paginator.get_next_link())
+
+    with django_capture_on_commit_callbacks(execute=True):
+        refresh_shuffle_ranks(products)
+
+    _, page = paginate(SeededShuffle(products, 'seed'), {'limit': 2, 'cursor': cursor})
+    _, restarted = paginate(SeededShuffle(products, 'seed'), {'limit': 2})
+    assert page == restarted
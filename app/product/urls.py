@@ -3,11 +3,14 @@ from product.views import (
     ProductViewSet,
     ProductRetrieveViewSet,
     BookingViewSet,
+    HoldViewSet,
     CategoryViewSet,
     CommentViewSet,
     ProductPreviewViewSet,
     FavoritesViewSet,
     ProductListByFilterViewSet,
+    ProductFacetsViewSet,
+    ProductCalendarViewSet,
     TypeViewSet,
     ConvenienceViewSet,
     ImageViewSet,
@@ -21,6 +24,7 @@ router = DefaultRouter(trailing_slash=True)
 router.register('products/images', ImageViewSet, basename='images')
 router.register('products', ProductViewSet, basename='products')
 router.register('products/preview', ProductPreviewViewSet, basename='preview')
+router.register('booking/holds', HoldViewSet, basename='holds')
 router.register('booking', BookingViewSet, basename='booking')
 router.register('categories', CategoryViewSet, basename='categories')
 router.register('comments', CommentViewSet, basename='comments')
@@ -30,6 +34,8 @@ router.register('types', TypeViewSet, basename='types')
 urlpatterns = [
     path('', include(router.urls)),
     path('products/get', ProductListByFilterViewSet.as_view()),
+    path('products/facets', ProductFacetsViewSet.as_view()),
+    path('products/calendar', ProductCalendarViewSet.as_view()),
     path('products/<int:pk>', ProductRetrieveViewSet.as_view()),
     path('user/favorite/products', FavoritesViewSet.as_view({"get": "favorite"})),
     path('user/products/<int:pk>/main-image', FavoritesViewSet.as_view({"post": "set_main_image"})),
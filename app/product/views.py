@@ -1,19 +1,26 @@
+import re
 import random
+import hashlib
 from datetime import datetime, timedelta
 from rest_framework import viewsets, mixins, permissions, status, generics
 from rest_framework.response import Response
 from rest_framework.decorators import action
 from django.http import Http404
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
 from drf_yasg.utils import swagger_auto_schema
 from django.shortcuts import get_object_or_404
 from django.db.models import Q, Exists, OuterRef, Prefetch, Case, When, Value, BooleanField
 
 from helpers.logger import log_exception
+from helpers.constants import PRODUCT_DETAIL_CACHE_TIMEOUT, CALENDAR_MAX_PRODUCTS, CALENDAR_CACHE_MAX_AGE
 from product.serializers import (
     ProductListSerializer,
+    ProductCardSerializer,
     ProductCreateSerializer,
     BookingSerializer,
     ProductLikeSerializer,
+    ProductLikesSyncSerializer,
     ProductRetrieveSerializer,
     UploadFilesSerializer,
     CategorySerializer,
@@ -24,25 +31,52 @@ from product.serializers import (
     ProductUpdateSerializer,
     ProductPreviewSerializer,
     CreateBookingSerializer,
+    ReserveBookingsSerializer,
+    HoldSerializer,
+    ConfirmHoldSerializer,
+    ImageUploadsSerializer,
+    ImageUploadsCompleteSerializer,
 )
-from product.models import Product, Booking, Image, Category, Comment, Favorites, Type, Convenience
+from product.models import Product, Booking, Image, Category, Comment, Like, Type, Convenience
 from product.filters import BookingFilterSet
 from product.permissions import ProductPermissions, CommentPermissions, ProductPreviewPermissions
 from helpers.mixins import ProductContextSerializerMixins
 from helpers.services import update_instance
 from product.services import (
     like_or_dislike,
+    sync_likes,
     save_image,
-    get_product_by_id_user_id,
+    create_image_uploads,
+    complete_image_uploads,
+    get_product_detail,
     paginate_queryset,
     get_product_queryset,
     get_query_filter,
-    get_favorite_products_data,
+    exclude_held,
     get_favorite_products,
     get_product_bookings,
     get_user_products,
+    get_sort_near,
+    PRODUCT_ORDERING,
+    FAVORITE_ORDERING,
+    BOOKING_ORDERING,
 )
-from product.openapi import manual_parameters, limit, offset, start_date, end_date, active
+from product.shuffle import get_shuffle_seed
+from product.facets import get_cached_facets
+from product.cache import (
+    get_listing_cache_key, get_cached_listing, get_product_cache_key, get_product_version_key, get_versioned,
+    set_versioned,
+)
+from product.favorites import get_favorite_ids, overlay_favorites
+from product.bookings import BookingConflict, save_booking, reserve_bookings
+from product.availability import get_window, get_default_booking_window, get_calendar
+from product.holds import place_hold, get_hold, release_hold, confirm_hold, merge_held_runs
+from product.counters import merge_like_counts
+from product.openapi import (
+    manual_parameters, filter_parameters, limit, offset, cursor, count, start_date, end_date, active, ids
+)
+
+PRODUCT_ID_RE = re.compile(r'^[0-9]+$')
 
 
 class ProductViewSet(
@@ -61,8 +95,14 @@ class ProductViewSet(
             serializer = ProductCreateSerializer
         elif self.action == 'like':
             serializer = ProductLikeSerializer
+        elif self.action == 'sync_likes':
+            serializer = ProductLikesSyncSerializer
         elif self.action == 'save_image':
             serializer = UploadFilesSerializer
+        elif self.action == 'image_uploads':
+            serializer = ImageUploadsSerializer
+        elif self.action == 'complete_image_uploads':
+            serializer = ImageUploadsCompleteSerializer
         elif self.action == 'get_user_products':
             serializer = UploadFilesSerializer
         if self.action == 'update' or self.action == 'partial_update':
@@ -73,14 +113,18 @@ class ProductViewSet(
     @action(detail=True, methods=['put'], url_path='like')
     def like(self, request, pk):
         try:
-            obj = self.get_object()
-            user = request.user
-            message = like_or_dislike(obj, user)
+            message = like_or_dislike(int(pk), request.user)
             return Response(message, status=status.HTTP_200_OK)
         except Exception as e:
             log_exception(e, f'Product like error {str(e)}')
             raise Http404
 
+    @action(detail=False, methods=['post'], url_path='likes/sync')
+    def sync_likes(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return Response(sync_likes(request.user, serializer.validated_data['likes']), status=status.HTTP_200_OK)
+
     @action(detail=True, methods=['post'], url_path='images')
     def save_image(self, request, pk):
         try:
@@ -94,6 +138,25 @@ class ProductViewSet(
             log_exception(e, f'Save image error {str(e)}')
             raise Http404
 
+    @action(detail=True, methods=['post'], url_path='images/uploads')
+    def image_uploads(self, request, pk):
+        product = self.get_object()
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        uploads = create_image_uploads(product, request.user, serializer.validated_data['files'])
+        return Response({'uploads': uploads}, status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=['post'], url_path='images/uploads/complete')
+    def complete_image_uploads(self, request, pk):
+        product = self.get_object()
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        images, errors = complete_image_uploads(product, request.user, serializer.validated_data['tokens'])
+        return Response(
+            {'images': images, 'errors': errors},
+            status=status.HTTP_201_CREATED if images else status.HTTP_400_BAD_REQUEST,
+        )
+
 
 class ProductRetrieveViewSet(
     ProductContextSerializerMixins,
@@ -106,14 +169,21 @@ class ProductRetrieveViewSet(
 
     def get(self, request, pk):
         try:
-            context = self.get_serializer_context()
-            user_id = context.get('user_id') if context is not None else None
-            obj = get_product_by_id_user_id(pk, user_id)
-            if not obj.is_active:
-                raise Http404
-
-            serializer = self.get_serializer(obj, context={'user_id': user_id})
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            user_id = self.get_user_id()
+            cache_key = get_product_cache_key(pk)
+            version, data = get_versioned(cache_key, get_product_version_key(pk))
+            if data is None:
+                obj = get_product_detail(pk)
+                if not obj.is_active:
+                    raise Http404
+
+                data = self.get_serializer(obj).data
+                set_versioned(cache_key, version, data, PRODUCT_DETAIL_CACHE_TIMEOUT)
+
+            data = merge_like_counts([data])[0]
+            if user_id is not None:
+                data = {**data, 'is_favorite': data['id'] in get_favorite_ids(user_id)}
+            return Response(data, status=status.HTTP_200_OK)
         except Exception as e:
             log_exception(e, f'Product details {str(e)}')
             raise Http404
@@ -132,10 +202,24 @@ class ProductListByFilterViewSet(
 
     @swagger_auto_schema(manual_parameters=manual_parameters)
     def get(self, request):
-        context = self.get_serializer_context()
-        user_id = context.get('user_id') if context is not None else None
+        user_id = self.get_user_id()
+        cache_key = get_listing_cache_key(request)
+        version, data = get_cached_listing(cache_key)
+        if data is None:
+            data = self.get_page_data(request)
+            set_versioned(cache_key, version, data)
+
+        data = {**data, 'results': merge_like_counts(exclude_held(data['results'], request))}
+        if user_id is not None:
+            data = {**data, 'results': overlay_favorites(data['results'], get_favorite_ids(user_id))}
+        return Response(data, status=status.HTTP_200_OK)
+
+    def get_page_data(self, request):
+        """The page is the same for every user, favorites are overlaid on top of it."""
         q = get_query_filter(request)
-        queryset = get_product_queryset(q, user_id)
+        queryset = get_product_queryset(
+            q, get_shuffle_seed(request), request.GET.get('house_name'), get_sort_near(request)
+        )
         paginator, result_page = paginate_queryset(queryset, request)
         try:
             serializer = self.get_serializer(result_page, many=True)
@@ -143,7 +227,62 @@ class ProductListByFilterViewSet(
             log_exception(e, f'Product list error {str(e)}')
             serializer = self.get_serializer(result_page, many=True)
 
-        return paginator.get_paginated_response(serializer.data)
+        return paginator.get_paginated_response(serializer.data).data
+
+
+class ProductFacetsViewSet(generics.GenericAPIView):
+    authentication_classes = []
+    permission_classes = []
+    allowed_methods = ["GET"]
+    queryset = Product.objects.none()
+    pagination_class = None
+
+    @swagger_auto_schema(manual_parameters=filter_parameters)
+    def get(self, request):
+        try:
+            q = get_query_filter(request)
+            return Response(get_cached_facets(q, request), status=status.HTTP_200_OK)
+        except Exception as e:
+            log_exception(e, f'Product facets error {str(e)}')
+            return Response(data={'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+
+class ProductCalendarViewSet(generics.GenericAPIView):
+    authentication_classes = []
+    permission_classes = []
+    allowed_methods = ["GET"]
+    queryset = Product.objects.none()
+    pagination_class = None
+
+    @swagger_auto_schema(manual_parameters=[ids, start_date, end_date])
+    def get(self, request):
+        values = [value.strip() for value in ','.join(request.GET.getlist('ids')).split(',') if value.strip()]
+        if not all(PRODUCT_ID_RE.match(value) for value in values):
+            return Response(data={'ids': 'Product ids must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+
+        product_ids = list(dict.fromkeys(int(value) for value in values))
+        if not product_ids or len(product_ids) > CALENDAR_MAX_PRODUCTS:
+            return Response(
+                data={'ids': f'From 1 to {CALENDAR_MAX_PRODUCTS} product ids'}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        window = get_default_booking_window()
+        if 'start_date' in request.GET or 'end_date' in request.GET:
+            window = get_window(request.GET.get('start_date'), request.GET.get('end_date'))
+            if window is None:
+                return Response(data={'detail': 'Invalid date span'}, status=status.HTTP_400_BAD_REQUEST)
+
+        calendar = merge_held_runs(get_calendar(product_ids, *window), *window)
+        data = {
+            'start_date': window[0],
+            'end_date': window[1],
+            'products': [{'id': product_id, 'occupied': calendar[product_id]} for product_id in product_ids],
+        }
+        etag = quote_etag(hashlib.sha1(repr(data).encode()).hexdigest())
+        response = get_conditional_response(request, etag=etag) or Response(data, status=status.HTTP_200_OK)
+        response['ETag'] = etag
+        patch_cache_control(response, public=True, max_age=CALENDAR_CACHE_MAX_AGE)
+        return response
 
 
 class ProductPreviewViewSet(
@@ -161,11 +300,13 @@ class FavoritesViewSet(
 ):
     serializer_class = ProductListSerializer
     permission_classes = (permissions.IsAuthenticated,)
-    queryset = Favorites.objects.select_related('owner', 'product', 'like').all()
+    queryset = Like.objects.select_related('product').all()
 
     def get_serializer_class(self):
         serializer = self.serializer_class
-        if self.action == 'get_products':
+        if self.action == 'favorite':
+            serializer = ProductCardSerializer
+        elif self.action == 'get_products':
             serializer = ProductListSerializer
         elif self.action == 'get_product_bookings':
             serializer = CreateBookingSerializer
@@ -174,7 +315,7 @@ class FavoritesViewSet(
 
         return serializer
 
-    @swagger_auto_schema(manual_parameters=[limit, offset])
+    @swagger_auto_schema(manual_parameters=[limit, cursor, count, offset])
     @action(detail=False, methods=['get'], url_path='products')
     def favorite(self, request):
         try:
@@ -183,11 +324,10 @@ class FavoritesViewSet(
                 raise Http404
 
             products = get_favorite_products(user)
-            products_data = get_favorite_products_data(products)
-            paginator, result_page = paginate_queryset(products_data, request)
+            paginator, result_page = paginate_queryset(products, request, FAVORITE_ORDERING)
             serializer = self.get_serializer(result_page, many=True)
 
-            return paginator.get_paginated_response(serializer.data)
+            return paginator.get_paginated_response(merge_like_counts(serializer.data))
         except Exception as e:
             log_exception(e, f'Product not found {str(e)}')
             raise Http404
@@ -204,13 +344,13 @@ class FavoritesViewSet(
             log_exception(e, f'Product not found {str(e)}')
             raise Http404
 
-    @swagger_auto_schema(manual_parameters=[limit, offset, start_date, end_date])
+    @swagger_auto_schema(manual_parameters=[limit, cursor, count, offset, start_date, end_date])
     @action(detail=False, methods=['get'], url_path='get_product_bookings')
     def get_product_bookings(self, request, pk):
         try:
             product = get_object_or_404(Product.objects.prefetch_related('booking'), pk=pk)
             bookings = get_product_bookings(product, request)
-            paginator, result_page = paginate_queryset(bookings, request)
+            paginator, result_page = paginate_queryset(bookings, request, BOOKING_ORDERING)
             serializer = self.get_serializer(result_page, many=True)
 
             return paginator.get_paginated_response(serializer.data)
@@ -218,7 +358,7 @@ class FavoritesViewSet(
             log_exception(e, f'Product not found {str(e)}')
             raise Http404
 
-    @swagger_auto_schema(manual_parameters=[active])
+    @swagger_auto_schema(manual_parameters=[active, limit, cursor, count, offset])
     @action(detail=False, methods=['get'], url_path='get_products')
     def get_products(self, request):
         active = request.GET.get('active', True)
@@ -228,10 +368,10 @@ class FavoritesViewSet(
             if active == 'false':
                 products = products.filter(is_active=False)
 
-            paginator, result_page = paginate_queryset(products, request)
+            paginator, result_page = paginate_queryset(products, request, PRODUCT_ORDERING)
             serializer = self.get_serializer(result_page, many=True)
 
-            return paginator.get_paginated_response(serializer.data)
+            return paginator.get_paginated_response(merge_like_counts(serializer.data))
         except Exception as e:
             log_exception(e, f'Product not found {str(e)}')
             raise Http404
@@ -247,7 +387,18 @@ class CommentViewSet(
     permission_classes = (permissions.IsAuthenticatedOrReadOnly, CommentPermissions)
 
 
+class BookingConflictMixin:
+    def handle_exception(self, exc):
+        if isinstance(exc, BookingConflict):
+            return Response(
+                data={'detail': str(exc), 'conflicts': exc.conflicts},
+                status=status.HTTP_409_CONFLICT,
+            )
+        return super().handle_exception(exc)
+
+
 class BookingViewSet(
+    BookingConflictMixin,
     mixins.UpdateModelMixin,
     mixins.DestroyModelMixin,
     mixins.RetrieveModelMixin,
@@ -259,6 +410,64 @@ class BookingViewSet(
     filterset_class = BookingFilterSet
     queryset = Booking.objects.all()
 
+    def get_serializer_class(self):
+        if self.action == 'reserve':
+            return ReserveBookingsSerializer
+        return self.serializer_class
+
+    def perform_create(self, serializer):
+        save_booking(serializer)
+
+    def perform_update(self, serializer):
+        save_booking(serializer)
+
+    @action(detail=False, methods=['post'], url_path='reserve')
+    def reserve(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        bookings = reserve_bookings(serializer.validated_data['bookings'])
+        return Response(CreateBookingSerializer(bookings, many=True).data, status=status.HTTP_201_CREATED)
+
+
+class HoldViewSet(
+    BookingConflictMixin,
+    viewsets.GenericViewSet
+):
+    permission_classes = (permissions.IsAuthenticated,)
+    serializer_class = HoldSerializer
+    queryset = Booking.objects.none()
+    lookup_field = 'token'
+
+    def get_serializer_class(self):
+        if self.action == 'confirm':
+            return ConfirmHoldSerializer
+        return self.serializer_class
+
+    def get_hold(self, token):
+        hold = get_hold(token)
+        if hold is None or hold['user'] != self.request.user.id:
+            raise Http404
+        return hold
+
+    def create(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        hold = place_hold(data['product'].pk, request.user.id, data['start_date'], data['end_date'])
+        return Response(hold, status=status.HTTP_201_CREATED)
+
+    def destroy(self, request, token):
+        release_hold(self.get_hold(token))
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(detail=True, methods=['post'], url_path='confirm')
+    def confirm(self, request, token):
+        hold = self.get_hold(token)
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        booking = confirm_hold(hold, **serializer.validated_data)
+        return Response(CreateBookingSerializer(booking).data, status=status.HTTP_201_CREATED)
+
 
 class CategoryViewSet(
     generics.ListAPIView,
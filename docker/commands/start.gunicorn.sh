@@ -7,4 +7,7 @@ python3 manage.py makemigrations
 python3 manage.py migrate
 python3 manage.py collectstatic --noinput
 
+export PROMETHEUS_MULTIPROC_DIR=${PROMETHEUS_MULTIPROC_DIR:-/tmp/prometheus}
+rm -rf "$PROMETHEUS_MULTIPROC_DIR" && mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+
 gunicorn core.asgi:application --worker-class uvicorn.workers.UvicornWorker --workers 5 --bind 0.0.0.0:8000 --timeout 200